@@ -0,0 +1,198 @@
+"""
+IR Simulator用 ストリーミングBlobアップロード
+受信データを固定サイズのブロックに区切り、Put Block を並列実行した後 Put Block List で確定する
+（メモリ使用量は block_size × (max_concurrency + 1) 程度で一定）
+"""
+
+import asyncio
+import logging
+import time
+import uuid
+from collections import OrderedDict
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Set
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BLOCK_SIZE = 4 * 1024 * 1024
+# Azure Blob Storageの1ブロックの上限（API 2019-12-12以降）
+MAX_BLOCK_SIZE = 4000 * 1024 * 1024
+# 1つのブロックBlobに確定できるブロック数の上限
+MAX_BLOCKS = 50000
+
+
+def plan_block_size(block_size: int, max_concurrency: int, max_buffer_bytes: int,
+                    expected_size: Optional[int] = None, max_block_size: int = MAX_BLOCK_SIZE):
+    """ブロックサイズ・同時ステージ数を決定して (block_size, max_concurrency) を返す
+
+    - サイズが分かっている場合は MAX_BLOCKS 以内に収まるようブロックサイズを拡大する
+    - block_size × (max_concurrency + 1) が max_buffer_bytes を超えないよう同時ステージ数を下げる
+    収まらない場合（拡大後のブロックサイズが上限を超える等）はValueError
+    """
+    if expected_size:
+        block_size = max(block_size, -(-expected_size // MAX_BLOCKS))
+    if block_size > max_block_size:
+        if expected_size:
+            raise ValueError(
+                f"{expected_size} bytes need blocks of {block_size} bytes to fit in {MAX_BLOCKS} blocks, "
+                f"above the limit of {max_block_size} bytes"
+            )
+        raise ValueError(f"block_size {block_size} exceeds the limit of {max_block_size} bytes")
+    if block_size * 2 > max_buffer_bytes:
+        raise ValueError(f"block_size {block_size} does not fit the upload buffer limit of {max_buffer_bytes} bytes")
+    return block_size, max(1, min(max_concurrency, max_buffer_bytes // block_size - 1))
+
+
+class UploadProgressTracker:
+    """アップロード進捗の管理（完了済みの古いエントリから破棄）"""
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._uploads: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+
+    def start(self, upload_id: str, container: str, blob_name: str) -> Dict[str, Any]:
+        progress = {
+            "upload_id": upload_id,
+            "container": container,
+            "blob_name": blob_name,
+            "status": "UPLOADING",
+            "bytes_received": 0,
+            "bytes_uploaded": 0,
+            "blocks_staged": 0,
+            "blocks_total": 0,
+            "started_at": time.time(),
+            "finished_at": None,
+            "error_message": None,
+        }
+        self._uploads[upload_id] = progress
+        self._trim()
+        return progress
+
+    def get(self, upload_id: str) -> Optional[Dict[str, Any]]:
+        progress = self._uploads.get(upload_id)
+        if progress is None:
+            return None
+        result = dict(progress)
+        elapsed = (progress["finished_at"] or time.time()) - progress["started_at"]
+        result["elapsed_seconds"] = round(elapsed, 3)
+        result["bytes_per_second"] = round(progress["bytes_uploaded"] / elapsed, 2) if elapsed > 0 else 0.0
+        return result
+
+    def _trim(self):
+        while len(self._uploads) > self.max_entries:
+            oldest_id = next(
+                (k for k, v in self._uploads.items() if v["status"] != "UPLOADING"), None
+            )
+            if oldest_id is None:
+                return
+            del self._uploads[oldest_id]
+
+
+class BlockBlobStreamUploader:
+    """非同期チャンク列をブロックBlobとしてAzuriteへ書き込む"""
+
+    def __init__(
+        self,
+        blob_client,
+        run_blocking: Callable[..., Awaitable[Any]],
+        block_size: int = DEFAULT_BLOCK_SIZE,
+        max_concurrency: int = 4,
+        progress: Optional[Dict[str, Any]] = None,
+    ):
+        if not 0 < block_size <= MAX_BLOCK_SIZE:
+            raise ValueError(f"block_size must be between 1 and {MAX_BLOCK_SIZE}")
+        if max_concurrency < 1:
+            raise ValueError("max_concurrency must be >= 1")
+        self.blob_client = blob_client
+        self.run_blocking = run_blocking
+        self.block_size = block_size
+        self.max_concurrency = max_concurrency
+        self.progress = progress if progress is not None else {}
+
+    async def upload(self, chunks: AsyncIterator[bytes], **commit_kwargs) -> Dict[str, Any]:
+        """チャンク列をアップロードし、サイズ・ブロック数を返す"""
+        # 同時にステージ中のブロック数を制限し、メモリ使用量を一定に保つ
+        slots = asyncio.Semaphore(self.max_concurrency)
+        block_ids: List[str] = []
+        # ステージ中のタスクのみ保持し、完了したタスクは完了時に取り除く
+        in_flight: Set[asyncio.Task] = set()
+        failures: List[BaseException] = []
+        buffer = bytearray()
+        total_bytes = 0
+
+        def on_staged(task: asyncio.Task):
+            in_flight.discard(task)
+            if not task.cancelled():
+                # 例外はfailuresで扱うため、未取得の警告を出さないよう取得済みにする
+                task.exception()
+
+        async def stage(block_id: str, data: bytes):
+            try:
+                await self.run_blocking(self.blob_client.stage_block, block_id=block_id, data=data)
+                self.progress["bytes_uploaded"] = self.progress.get("bytes_uploaded", 0) + len(data)
+                self.progress["blocks_staged"] = self.progress.get("blocks_staged", 0) + 1
+            except Exception as e:
+                # 枠を解放する前に記録し、枠を待っている次のブロックを送信させない
+                failures.append(e)
+                raise
+            finally:
+                slots.release()
+
+        async def submit(data: bytes):
+            if len(block_ids) >= MAX_BLOCKS:
+                # 確定時ではなく上限を超えた時点で失敗させる
+                raise ValueError(
+                    f"Upload exceeds {MAX_BLOCKS} blocks of {self.block_size} bytes; use a larger block_size"
+                )
+            await slots.acquire()
+            # 失敗済みのブロックがあれば以降の送信を中止
+            if failures:
+                slots.release()
+                raise failures[0]
+            # ブロックIDは全て同じ長さにする（SDK側でbase64エンコードされる）
+            block_id = f"{len(block_ids):08d}"
+            block_ids.append(block_id)
+            self.progress["blocks_total"] = len(block_ids)
+            task = asyncio.create_task(stage(block_id, data))
+            in_flight.add(task)
+            task.add_done_callback(on_staged)
+
+        try:
+            async for chunk in chunks:
+                if not chunk:
+                    continue
+                buffer.extend(chunk)
+                total_bytes += len(chunk)
+                self.progress["bytes_received"] = total_bytes
+                while len(buffer) >= self.block_size:
+                    await submit(bytes(buffer[:self.block_size]))
+                    del buffer[:self.block_size]
+
+            if buffer:
+                await submit(bytes(buffer))
+                buffer.clear()
+
+            await asyncio.gather(*in_flight, return_exceptions=True)
+            if failures:
+                raise failures[0]
+            await self.run_blocking(self.blob_client.commit_block_list, block_ids, **commit_kwargs)
+        except BaseException:
+            remaining = list(in_flight)
+            for task in remaining:
+                task.cancel()
+            await asyncio.gather(*remaining, return_exceptions=True)
+            raise
+
+        return {"size": total_bytes, "blocks": len(block_ids), "block_size": self.block_size}
+
+
+async def iter_upload_file(file, chunk_size: int) -> AsyncIterator[bytes]:
+    """UploadFileをチャンク単位で読み出す（ファイル全体をメモリに載せない）"""
+    while True:
+        chunk = await file.read(chunk_size)
+        if not chunk:
+            return
+        yield chunk
+
+
+def new_upload_id() -> str:
+    return str(uuid.uuid4())
@@ -0,0 +1,320 @@
+"""
+IR Simulator用 Copy Activity エンジン
+ソースクエリの結果をバッチ単位でストリーミングし、SQLテーブルまたはAzurite Blobへ書き込む
+（メモリ使用量はテーブルサイズに依存せず、バッチサイズとブロックサイズで上限が決まる）
+"""
+
+import base64
+import csv
+import io
+import logging
+import threading
+import time
+import uuid
+import zlib
+from dataclasses import dataclass, asdict
+from datetime import date, datetime
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+from sql_pool import SQLPoolTimeoutError
+
+logger = logging.getLogger(__name__)
+
+# Blobシンクで判定に使うtype値（ADFのデータセット種別名も受け付ける）
+BLOB_SINK_TYPES = {"blob", "azureblob", "azureblobstorage", "delimitedtext", "azurite"}
+
+DEFAULT_BLOCK_SIZE = 4 * 1024 * 1024
+
+
+class CopyConfigurationError(ValueError):
+    """source/sink設定が不正な場合の例外"""
+    pass
+
+
+@dataclass
+class CopyResult:
+    """Copy Activityの実行結果"""
+    rows_copied: int
+    bytes_copied: int
+    batches: int
+    duration_seconds: float
+    sink_type: str
+    sink_target: str
+
+    @property
+    def rows_per_second(self) -> float:
+        return self.rows_copied / self.duration_seconds if self.duration_seconds > 0 else 0.0
+
+    @property
+    def bytes_per_second(self) -> float:
+        return self.bytes_copied / self.duration_seconds if self.duration_seconds > 0 else 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        result = asdict(self)
+        result["rows_per_second"] = round(self.rows_per_second, 2)
+        result["bytes_per_second"] = round(self.bytes_per_second, 2)
+        return result
+
+
+def quote_identifier(name: str) -> str:
+    """[schema].[table] 形式の識別子に変換（既に角括弧付きならそのまま）"""
+    parts = [p.strip() for p in name.split(".") if p.strip()]
+    return ".".join(p if p.startswith("[") else f"[{p.replace(']', ']]')}]" for p in parts)
+
+
+def has_copy_source(source: Dict[str, Any]) -> bool:
+    """実データコピーが可能なsource設定か（クエリまたはテーブル指定があるか）"""
+    return bool(
+        source.get("query")
+        or source.get("sqlReaderQuery")
+        or source.get("table_name")
+        or source.get("table")
+    )
+
+
+def resolve_source_query(source: Dict[str, Any]) -> str:
+    """source設定から読み取りクエリを決定"""
+    query = source.get("query") or source.get("sqlReaderQuery")
+    if query:
+        return query
+    table = source.get("table_name") or source.get("table")
+    if not table:
+        raise CopyConfigurationError("source must specify 'query' or 'table_name'")
+    schema = source.get("schema", "dbo")
+    return f"SELECT * FROM {quote_identifier(f'{schema}.{table}')}"
+
+
+def is_blob_sink(sink: Dict[str, Any]) -> bool:
+    """sink設定がBlob出力か"""
+    return str(sink.get("type", "")).lower() in BLOB_SINK_TYPES or "container" in sink
+
+
+def estimate_row_bytes(row: Sequence[Any]) -> int:
+    """行データのおおよそのバイト数（スループット計測用）"""
+    size = 0
+    for value in row:
+        if value is None:
+            continue
+        if isinstance(value, (bytes, bytearray)):
+            size += len(value)
+        elif isinstance(value, str):
+            size += len(value.encode("utf-8"))
+        elif isinstance(value, (int, float, Decimal)):
+            size += 8
+        elif isinstance(value, (datetime, date)):
+            size += 8
+        else:
+            size += len(str(value))
+    return size
+
+
+def _format_csv_value(value: Any) -> Any:
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ")
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, (bytes, bytearray)):
+        return base64.b64encode(value).decode("ascii")
+    return value
+
+
+class CopyEngine:
+    """SQLソースからテーブル/Blobへのストリーミングコピー"""
+
+    def __init__(
+        self,
+        sql_pool,
+        blob_service_factory: Callable[[], Any],
+        default_batch_size: int = 1000,
+        block_size: int = DEFAULT_BLOCK_SIZE,
+    ):
+        self.sql_pool = sql_pool
+        self.blob_service_factory = blob_service_factory
+        self.default_batch_size = default_batch_size
+        self.block_size = block_size
+        # テーブルシンクはソースとシンクで2本の接続を保持するため、同時実行数をプール上限の半分に抑える
+        # （全接続をソース側が保持し、全てのシンクが接続待ちになるデッドロックを防ぐ）
+        self.table_copy_slots = max(1, sql_pool.max_size // 2)
+        self._table_copy_semaphore = threading.BoundedSemaphore(self.table_copy_slots)
+
+    def run(self, source: Dict[str, Any], sink: Dict[str, Any], batch_size: Optional[int] = None) -> CopyResult:
+        """コピーを実行（ブロッキング処理のためエグゼキューター上から呼び出す）"""
+        batch_size = batch_size or sink.get("writeBatchSize") or self.default_batch_size
+        if batch_size < 1:
+            raise CopyConfigurationError("batch_size must be >= 1")
+
+        query = resolve_source_query(source)
+        started = time.perf_counter()
+
+        if is_blob_sink(sink):
+            return self._copy(source, sink, query, batch_size, started)
+
+        if self.sql_pool.max_size < 2:
+            raise CopyConfigurationError("table sinks need a SQL connection pool with max_size >= 2")
+        if not self._table_copy_semaphore.acquire(timeout=self.sql_pool.acquire_timeout):
+            raise SQLPoolTimeoutError(
+                f"Timed out after {self.sql_pool.acquire_timeout}s waiting for a table copy slot "
+                f"({self.table_copy_slots} concurrent table copies)"
+            )
+        try:
+            return self._copy(source, sink, query, batch_size, started)
+        finally:
+            self._table_copy_semaphore.release()
+
+    def _copy(self, source: Dict[str, Any], sink: Dict[str, Any], query: str, batch_size: int,
+              started: float) -> CopyResult:
+        with self.sql_pool.connection() as source_conn:
+            cursor = source_conn.cursor()
+            cursor.arraysize = batch_size
+            params = source.get("parameters") or []
+            if params:
+                cursor.execute(query, *params)
+            else:
+                cursor.execute(query)
+            if cursor.description is None:
+                raise CopyConfigurationError("source query did not return a result set")
+            columns = [column[0] for column in cursor.description]
+            batches = self._iter_batches(cursor, batch_size)
+
+            if is_blob_sink(sink):
+                rows, size, count, target = self._write_blob(sink, columns, batches)
+                sink_type = "blob"
+            else:
+                rows, size, count, target = self._write_table(sink, columns, batches)
+                sink_type = "table"
+
+        result = CopyResult(
+            rows_copied=rows,
+            bytes_copied=size,
+            batches=count,
+            duration_seconds=time.perf_counter() - started,
+            sink_type=sink_type,
+            sink_target=target,
+        )
+        logger.info(
+            f"Copied {result.rows_copied} rows ({result.bytes_copied} bytes) to {sink_type} {target} "
+            f"in {result.duration_seconds:.3f}s ({result.rows_per_second:.1f} rows/s)"
+        )
+        return result
+
+    @staticmethod
+    def _iter_batches(cursor, batch_size: int) -> Iterator[List[Any]]:
+        """fetchmanyでバッチ単位に行を取り出す（全件をメモリに載せない）"""
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return
+            yield rows
+
+    # ------------------------------------------------------------------
+    # テーブルシンク
+    # ------------------------------------------------------------------
+
+    def _write_table(self, sink: Dict[str, Any], columns: List[str], batches: Iterator[List[Any]]):
+        table = sink.get("table_name") or sink.get("table")
+        if not table:
+            raise CopyConfigurationError("sink must specify 'table_name' or a blob 'container'")
+        target = quote_identifier(f"{sink.get('schema', 'dbo')}.{table}")
+
+        # 列マッピング（source列名 -> sink列名）が指定されていれば適用
+        mapping = sink.get("column_mapping") or {}
+        sink_columns = [mapping.get(col, col) for col in columns]
+        unnamed = [str(i + 1) for i, col in enumerate(sink_columns) if not col]
+        if unnamed:
+            raise CopyConfigurationError(
+                f"source query returned unnamed columns at position(s) {', '.join(unnamed)}; "
+                "alias every column (e.g. SELECT 1 AS id) to copy into a table"
+            )
+        column_list = ", ".join(quote_identifier(col) for col in sink_columns)
+        placeholders = ", ".join("?" for _ in sink_columns)
+        insert_sql = f"INSERT INTO {target} ({column_list}) VALUES ({placeholders})"
+
+        rows_written = 0
+        bytes_written = 0
+        batch_count = 0
+
+        with self.sql_pool.connection() as sink_conn:
+            cursor = sink_conn.cursor()
+            pre_copy_script = sink.get("preCopyScript") or sink.get("pre_copy_script")
+            if pre_copy_script:
+                cursor.execute(pre_copy_script)
+                sink_conn.commit()
+
+            cursor.fast_executemany = True
+            for batch in batches:
+                cursor.executemany(insert_sql, [tuple(row) for row in batch])
+                # バッチ毎にコミットしてトランザクションログを小さく保つ
+                sink_conn.commit()
+                rows_written += len(batch)
+                bytes_written += sum(estimate_row_bytes(row) for row in batch)
+                batch_count += 1
+
+        return rows_written, bytes_written, batch_count, target
+
+    # ------------------------------------------------------------------
+    # Blobシンク
+    # ------------------------------------------------------------------
+
+    def _write_blob(self, sink: Dict[str, Any], columns: List[str], batches: Iterator[List[Any]]):
+        container = sink.get("container") or sink.get("container_name") or "test-data"
+        blob_name = sink.get("blob_name") or sink.get("path") or f"copy/{uuid.uuid4()}.csv"
+        compression = str(sink.get("compression", "gzip" if blob_name.endswith(".gz") else "")).lower()
+        delimiter = sink.get("delimiter", ",")
+        header = sink.get("firstRowAsHeader", sink.get("header", True))
+
+        blob_service = self.blob_service_factory()
+        try:
+            blob_service.create_container(container)
+        except Exception:
+            pass  # コンテナが既に存在する場合
+        blob_client = blob_service.get_blob_client(container=container, blob=blob_name)
+
+        # gzipはwbits=31でストリーム圧縮（バッチ毎にcompressし最後にflush）
+        compressor = zlib.compressobj(level=6, wbits=31) if compression == "gzip" else None
+        text_buffer = io.StringIO()
+        writer = csv.writer(text_buffer, delimiter=delimiter, lineterminator="\n")
+        pending = bytearray()
+        block_ids: List[str] = []
+
+        rows_written = 0
+        bytes_written = 0
+        batch_count = 0
+
+        def stage(data: bytes):
+            # ブロックIDは全て同じ長さにする（SDK側でbase64エンコードされる）
+            block_id = f"{len(block_ids):08d}"
+            blob_client.stage_block(block_id=block_id, data=data)
+            block_ids.append(block_id)
+
+        def take_text() -> bytes:
+            data = text_buffer.getvalue().encode("utf-8")
+            text_buffer.seek(0)
+            text_buffer.truncate(0)
+            return compressor.compress(data) if compressor else data
+
+        if header:
+            writer.writerow(columns)
+
+        for batch in batches:
+            for row in batch:
+                writer.writerow([_format_csv_value(v) for v in row])
+            encoded = take_text()
+            bytes_written += len(encoded)
+            pending.extend(encoded)
+            rows_written += len(batch)
+            batch_count += 1
+            while len(pending) >= self.block_size:
+                stage(bytes(pending[:self.block_size]))
+                del pending[:self.block_size]
+
+        tail = take_text()
+        if compressor:
+            tail += compressor.flush()
+        bytes_written += len(tail)
+        pending.extend(tail)
+        for offset in range(0, len(pending), self.block_size):
+            stage(bytes(pending[offset:offset + self.block_size]))
+
+        blob_client.commit_block_list(block_ids)
+        return rows_written, bytes_written, batch_count, f"{container}/{blob_name}"
@@ -0,0 +1,627 @@
+"""
+IR Simulator用 実行履歴ストア
+件数上限（LRU）・TTLによる破棄と、パイプライン名・ステータス・開始時刻のインデックスを持つ
+SQLiteファイルを指定した場合は履歴を永続化し、再起動後も参照できる（書き込みはバックグラウンドでまとめて行う）
+"""
+
+import bisect
+import json
+import logging
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+# 実行中のレコードは件数上限・TTLによる破棄の対象外
+ACTIVE_STATUSES = {"QUEUED", "RUNNING"}
+
+
+def _to_timestamp(value: Any) -> float:
+    """ISO形式の日時文字列をUNIX時刻に変換（変換できなければ現在時刻）"""
+    if isinstance(value, datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value).timestamp()
+        except ValueError:
+            pass
+    return time.time()
+
+
+def parse_time_filter(name: str, value: str) -> float:
+    """検索条件（since/until）の日時をUNIX時刻に変換（ISO形式でなければValueError）"""
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an ISO 8601 datetime: {value!r}") from None
+
+
+class ExecutionStore:
+    """上限付き・インデックス付きの実行履歴ストア"""
+
+    def __init__(
+        self,
+        max_entries: int = 10000,
+        ttl_seconds: float = 0,
+        sqlite_path: Optional[str] = None,
+        persist_interval: float = 0.5,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.sqlite_path = sqlite_path
+        self.persist_interval = persist_interval
+
+        self._lock = threading.RLock()
+        # execution_id -> レコード（末尾が最近使用されたもの）
+        self._records: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._touched: Dict[str, float] = {}
+        self._by_pipeline: Dict[str, Set[str]] = {}
+        self._by_status: Dict[str, Set[str]] = {}
+        # (開始時刻, execution_id) の昇順リスト
+        self._by_time: List[Tuple[float, str]] = []
+        self._time_key: Dict[str, float] = {}
+        self._evicted = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        # 未書き込みの変更（execution_id -> レコード、削除はNone）
+        self._pending: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._flush_lock = threading.Lock()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_stop = threading.Event()
+        if sqlite_path:
+            self._open_sqlite(sqlite_path)
+            self._writer = threading.Thread(target=self._write_loop, name="execution-store-writer", daemon=True)
+            self._writer.start()
+
+    # ------------------------------------------------------------------
+    # 書き込み
+    # ------------------------------------------------------------------
+
+    def put(self, record: Dict[str, Any]):
+        """レコードを登録（同じexecution_idがあれば置き換え）"""
+        execution_id = record["execution_id"]
+        with self._lock:
+            if execution_id in self._records:
+                self._unindex(execution_id)
+            self._records[execution_id] = dict(record)
+            self._records.move_to_end(execution_id)
+            self._index(execution_id)
+            self._persist(execution_id)
+            self._evict_locked()
+
+    def add(self, record: Dict[str, Any]) -> bool:
+        """新しいレコードを登録（同じexecution_idが既にあれば登録せずFalseを返す）"""
+        with self._lock:
+            if record["execution_id"] in self._records:
+                return False
+            self.put(record)
+            return True
+
+    def update(self, execution_id: str, **changes) -> Dict[str, Any]:
+        """レコードの一部を更新してコピーを返す"""
+        with self._lock:
+            if execution_id not in self._records:
+                raise KeyError(execution_id)
+            self._unindex(execution_id)
+            self._records[execution_id].update(changes)
+            self._records.move_to_end(execution_id)
+            self._index(execution_id)
+            self._persist(execution_id)
+            return dict(self._records[execution_id])
+
+    def append(self, execution_id: str, field: str, value: Any) -> Dict[str, Any]:
+        """リスト型フィールドに要素を追加"""
+        with self._lock:
+            values = list(self._records[execution_id].get(field) or [])
+            values.append(value)
+            return self.update(execution_id, **{field: values})
+
+    def delete(self, execution_id: str):
+        with self._lock:
+            if execution_id in self._records:
+                self._unindex(execution_id)
+                del self._records[execution_id]
+                if self._db is not None:
+                    self._pending[execution_id] = None
+
+    # ------------------------------------------------------------------
+    # 読み取り
+    # ------------------------------------------------------------------
+
+    def get(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        """レコードのコピーを取得（存在しない・TTL切れの場合はNone）"""
+        with self._lock:
+            record = self._records.get(execution_id)
+            if record is None or self._expire_locked(execution_id):
+                return None
+            # LRU順とTTLの基準時刻は常に一緒に更新する（破棄処理はLRU順に古いものから判定するため）
+            self._records.move_to_end(execution_id)
+            self._touched[execution_id] = time.monotonic()
+            return dict(record)
+
+    def __contains__(self, execution_id: str) -> bool:
+        with self._lock:
+            return execution_id in self._records
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._records)
+
+    def query(
+        self,
+        pipeline_name: Optional[str] = None,
+        status: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """条件に一致するレコードを開始時刻の降順で取得し、(ページ, 総件数) を返す
+
+        since/untilがISO形式の日時でなければValueErrorを送出する
+        """
+        since_ts = parse_time_filter("since", since) if since is not None else None
+        until_ts = parse_time_filter("until", until) if until is not None else None
+        with self._lock:
+            self._evict_locked()
+
+            candidates: Optional[Set[str]] = None
+            if pipeline_name is not None:
+                candidates = set(self._by_pipeline.get(pipeline_name, ()))
+            if status is not None:
+                ids = self._by_status.get(status.upper(), set())
+                candidates = set(ids) if candidates is None else candidates & ids
+
+            lo = 0
+            hi = len(self._by_time)
+            if since_ts is not None:
+                lo = bisect.bisect_left(self._by_time, (since_ts, ""))
+            if until_ts is not None:
+                hi = bisect.bisect_right(self._by_time, (until_ts, "\uffff"))
+
+            matched = [
+                execution_id
+                for _, execution_id in reversed(self._by_time[lo:hi])
+                if candidates is None or execution_id in candidates
+            ]
+            page = [dict(self._records[i]) for i in matched[offset:offset + limit]]
+            return page, len(matched)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "entries": len(self._records),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "evicted": self._evicted,
+                "by_status": {k: len(v) for k, v in self._by_status.items() if v},
+                "persistent": self._db is not None,
+                "pending_writes": len(self._pending),
+            }
+
+    def flush(self):
+        """未書き込みの変更をSQLiteへ1トランザクションでまとめて書き込む"""
+        if self._db is None:
+            return
+        with self._flush_lock:
+            with self._lock:
+                pending, self._pending = self._pending, {}
+                # レコードは更新され続けるため、ロック内でシリアライズしておく
+                upserts = [
+                    (
+                        execution_id,
+                        record.get("pipeline_name"),
+                        record.get("status"),
+                        record.get("start_time"),
+                        json.dumps(record, default=str),
+                    )
+                    for execution_id, record in pending.items()
+                    if record is not None
+                ]
+                deletes = [(execution_id,) for execution_id, record in pending.items() if record is None]
+            if not upserts and not deletes:
+                return
+            try:
+                self._db.execute("BEGIN")
+                if deletes:
+                    self._db.executemany("DELETE FROM executions WHERE execution_id = ?", deletes)
+                if upserts:
+                    self._db.executemany(
+                        "INSERT OR REPLACE INTO executions (execution_id, pipeline_name, status, start_time, record) "
+                        "VALUES (?, ?, ?, ?, ?)",
+                        upserts,
+                    )
+                self._db.execute("COMMIT")
+            except sqlite3.Error as e:
+                if self._db.in_transaction:
+                    self._db.execute("ROLLBACK")
+                logger.warning(f"Failed to persist {len(upserts) + len(deletes)} execution changes: {e}")
+
+    def close(self):
+        """書き込みスレッドを停止し、残りの変更を書き込んでSQLiteを閉じる"""
+        if self._writer is not None:
+            self._writer_stop.set()
+            self._writer.join()
+            self._writer = None
+        if self._db is not None:
+            self.flush()
+            self._db.close()
+            self._db = None
+
+    # ------------------------------------------------------------------
+    # インデックス・破棄
+    # ------------------------------------------------------------------
+
+    def _index(self, execution_id: str):
+        record = self._records[execution_id]
+        self._touched[execution_id] = time.monotonic()
+        self._by_pipeline.setdefault(record.get("pipeline_name") or "", set()).add(execution_id)
+        self._by_status.setdefault(str(record.get("status") or "").upper(), set()).add(execution_id)
+        key = _to_timestamp(record.get("start_time"))
+        self._time_key[execution_id] = key
+        bisect.insort(self._by_time, (key, execution_id))
+
+    def _unindex(self, execution_id: str):
+        record = self._records[execution_id]
+        self._touched.pop(execution_id, None)
+        self._discard(self._by_pipeline, record.get("pipeline_name") or "", execution_id)
+        self._discard(self._by_status, str(record.get("status") or "").upper(), execution_id)
+        key = self._time_key.pop(execution_id, None)
+        if key is not None:
+            position = bisect.bisect_left(self._by_time, (key, execution_id))
+            if position < len(self._by_time) and self._by_time[position] == (key, execution_id):
+                del self._by_time[position]
+
+    @staticmethod
+    def _discard(index: Dict[str, Set[str]], key: str, execution_id: str):
+        ids = index.get(key)
+        if ids is not None:
+            ids.discard(execution_id)
+            if not ids:
+                del index[key]
+
+    def _expire_locked(self, execution_id: str) -> bool:
+        """TTLを過ぎた完了済みレコードなら破棄してTrueを返す（書き込みを待たずに読み取り時に判定する）"""
+        if self.ttl_seconds <= 0:
+            return False
+        if str(self._records[execution_id].get("status", "")).upper() in ACTIVE_STATUSES:
+            return False
+        if time.monotonic() - self._touched.get(execution_id, time.monotonic()) <= self.ttl_seconds:
+            return False
+        self._unindex(execution_id)
+        del self._records[execution_id]
+        self._evicted += 1
+        if self._db is not None:
+            self._pending[execution_id] = None
+        return True
+
+    def _evict_locked(self):
+        """上限超過・TTL切れの完了済みレコードをLRU順に破棄（新しいレコードに達したら打ち切る）"""
+        now = time.monotonic()
+        excess = len(self._records) - self.max_entries if self.max_entries > 0 else 0
+        victims = []
+        for execution_id, record in self._records.items():
+            expired = self.ttl_seconds > 0 and now - self._touched.get(execution_id, now) > self.ttl_seconds
+            if len(victims) >= excess and not expired:
+                break
+            if str(record.get("status", "")).upper() in ACTIVE_STATUSES:
+                continue
+            victims.append(execution_id)
+        for execution_id in victims:
+            self._unindex(execution_id)
+            del self._records[execution_id]
+        self._evicted += len(victims)
+        if victims and self._db is not None:
+            for execution_id in victims:
+                self._pending[execution_id] = None
+
+    # ------------------------------------------------------------------
+    # SQLite永続化
+    # ------------------------------------------------------------------
+
+    def _open_sqlite(self, path: str):
+        self._db = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS executions (
+                execution_id TEXT PRIMARY KEY,
+                pipeline_name TEXT,
+                status TEXT,
+                start_time TEXT,
+                record TEXT NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_executions_start ON executions (start_time)")
+
+        # 直近のレコードをメモリへ復元
+        limit = self.max_entries if self.max_entries > 0 else -1
+        rows = self._db.execute(
+            "SELECT record FROM executions ORDER BY start_time DESC LIMIT ?", (limit,)
+        ).fetchall()
+        for (payload,) in reversed(rows):
+            record = json.loads(payload)
+            # 前回プロセスで実行中だったレコードは再開できないため失敗扱いにする
+            if str(record.get("status", "")).upper() in ACTIVE_STATUSES:
+                record["status"] = "FAILED"
+                record["error_message"] = "Simulator restarted before the execution finished"
+            self._records[record["execution_id"]] = record
+            self._index(record["execution_id"])
+        logger.info(f"Loaded {len(rows)} executions from {path}")
+
+    def _persist(self, execution_id: str):
+        """（ロック取得済み前提）変更を書き込み待ちにする（リクエスト処理中にSQLiteへ書き込まない）"""
+        if self._db is None:
+            return
+        self._pending[execution_id] = self._records[execution_id]
+
+    def _write_loop(self):
+        while not self._writer_stop.wait(self.persist_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.warning(f"Execution store writer failed: {e}")
+
+
+class SharedExecutionStore:
+    """複数ワーカープロセスで共有する実行履歴ストア（SQLite WALファイルを直接読み書き）
+
+    ExecutionStoreと同じインターフェースを持ち、どのワーカーからでも全実行を参照・更新できる。
+    各メソッドはSQLiteのロック待ち（最大30秒）でブロックするため、イベントループ外から呼び出す
+    """
+
+    # 件数上限・TTLの適用間隔（put回数）
+    MAINTENANCE_INTERVAL = 100
+
+    def __init__(self, sqlite_path: str, max_entries: int = 10000, ttl_seconds: float = 0):
+        self.sqlite_path = sqlite_path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._puts = 0
+        self._evicted = 0
+
+        self._db = sqlite3.connect(sqlite_path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS shared_executions (
+                execution_id TEXT PRIMARY KEY,
+                pipeline_name TEXT,
+                status TEXT,
+                start_ts REAL,
+                updated_at REAL,
+                record TEXT NOT NULL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_shared_executions_start ON shared_executions (start_ts)")
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS ix_shared_executions_pipeline ON shared_executions (pipeline_name, start_ts)"
+        )
+        self._db.execute(
+            "CREATE INDEX IF NOT EXISTS ix_shared_executions_status ON shared_executions (status, start_ts)"
+        )
+
+    # ------------------------------------------------------------------
+    # 書き込み
+    # ------------------------------------------------------------------
+
+    def put(self, record: Dict[str, Any]):
+        with self._lock:
+            self._write(record)
+            self._puts += 1
+            if self._puts % self.MAINTENANCE_INTERVAL == 0:
+                self._evict_locked()
+
+    def add(self, record: Dict[str, Any]) -> bool:
+        """新しいレコードを登録（同じexecution_idが既にあれば登録せずFalseを返す）"""
+        with self._lock:
+            try:
+                self._write(record, replace=False)
+            except sqlite3.IntegrityError:
+                return False
+            self._puts += 1
+            if self._puts % self.MAINTENANCE_INTERVAL == 0:
+                self._evict_locked()
+            return True
+
+    def update(self, execution_id: str, **changes) -> Dict[str, Any]:
+        """レコードの一部を更新してコピーを返す（他ワーカーの更新と競合しないよう排他トランザクションで実行）"""
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                record = self._read(execution_id)
+                if record is None:
+                    raise KeyError(execution_id)
+                record.update(changes)
+                self._write(record)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            return record
+
+    def append(self, execution_id: str, field: str, value: Any) -> Dict[str, Any]:
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                record = self._read(execution_id)
+                if record is None:
+                    raise KeyError(execution_id)
+                record[field] = list(record.get(field) or []) + [value]
+                self._write(record)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+            return record
+
+    def delete(self, execution_id: str):
+        with self._lock:
+            self._db.execute("DELETE FROM shared_executions WHERE execution_id = ?", (execution_id,))
+
+    # ------------------------------------------------------------------
+    # 読み取り
+    # ------------------------------------------------------------------
+
+    def get(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        """レコードを取得（存在しない・TTL切れの場合はNone）"""
+        with self._lock:
+            row = self._db.execute(
+                "SELECT record, status, updated_at FROM shared_executions WHERE execution_id = ?", (execution_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            payload, status, updated_at = row
+            if self.ttl_seconds > 0 and status not in ACTIVE_STATUSES and updated_at < time.time() - self.ttl_seconds:
+                deleted = self._db.execute(
+                    "DELETE FROM shared_executions WHERE execution_id = ? AND updated_at = ?",
+                    (execution_id, updated_at),
+                ).rowcount
+                self._evicted += deleted
+                return None
+            return json.loads(payload)
+
+    def __contains__(self, execution_id: str) -> bool:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT 1 FROM shared_executions WHERE execution_id = ?", (execution_id,)
+            ).fetchone()
+            return row is not None
+
+    def __len__(self) -> int:
+        with self._lock:
+            return self._db.execute("SELECT COUNT(*) FROM shared_executions").fetchone()[0]
+
+    def query(
+        self,
+        pipeline_name: Optional[str] = None,
+        status: Optional[str] = None,
+        since: Optional[str] = None,
+        until: Optional[str] = None,
+        limit: int = 100,
+        offset: int = 0,
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        """条件に一致するレコードを開始時刻の降順で取得し、(ページ, 総件数) を返す"""
+        conditions = []
+        params: List[Any] = []
+        if pipeline_name is not None:
+            conditions.append("pipeline_name = ?")
+            params.append(pipeline_name)
+        if status is not None:
+            conditions.append("status = ?")
+            params.append(status.upper())
+        if since is not None:
+            conditions.append("start_ts >= ?")
+            params.append(parse_time_filter("since", since))
+        if until is not None:
+            conditions.append("start_ts <= ?")
+            params.append(parse_time_filter("until", until))
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+        with self._lock:
+            total = self._db.execute(f"SELECT COUNT(*) FROM shared_executions {where}", params).fetchone()[0]
+            rows = self._db.execute(
+                f"SELECT record FROM shared_executions {where} "
+                "ORDER BY start_ts DESC, execution_id DESC LIMIT ? OFFSET ?",
+                params + [limit, offset],
+            ).fetchall()
+        return [json.loads(payload) for (payload,) in rows], total
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            by_status = dict(self._db.execute(
+                "SELECT status, COUNT(*) FROM shared_executions GROUP BY status"
+            ).fetchall())
+        return {
+            "entries": sum(by_status.values()),
+            "max_entries": self.max_entries,
+            "ttl_seconds": self.ttl_seconds,
+            "evicted": self._evicted,
+            "by_status": by_status,
+            "persistent": True,
+            "shared": True,
+        }
+
+    def close(self):
+        with self._lock:
+            self._db.close()
+
+    # ------------------------------------------------------------------
+    # 内部処理
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def apply_lease_expiry(db: sqlite3.Connection, requeued: List[str], abandoned: List[Tuple[str, str]]):
+        """ジョブキューのリース切れを実行履歴へ反映（SharedPipelineJobQueueのon_lease_expiredに指定する）
+
+        ジョブテーブルと同じファイル・同じトランザクション内で呼び出され、再投入したジョブはQUEUEDへ、
+        試行回数の上限に達したジョブはエラーメッセージ付きのFAILEDへ更新する
+        """
+        interrupted = {"current_activity": None, "activities_running": []}
+        changes = [(job_id, {**interrupted, "status": "QUEUED"}) for job_id in requeued]
+        end_time = datetime.now().isoformat()
+        changes += [
+            (job_id, {**interrupted, "status": "FAILED", "end_time": end_time, "error_message": error})
+            for job_id, error in abandoned
+        ]
+        for execution_id, change in changes:
+            record = SharedExecutionStore._read_from(db, execution_id)
+            if record is not None:
+                record.update(change)
+                SharedExecutionStore._write_to(db, record)
+
+    def _read(self, execution_id: str) -> Optional[Dict[str, Any]]:
+        return self._read_from(self._db, execution_id)
+
+    def _write(self, record: Dict[str, Any], replace: bool = True):
+        self._write_to(self._db, record, replace)
+
+    @staticmethod
+    def _read_from(db: sqlite3.Connection, execution_id: str) -> Optional[Dict[str, Any]]:
+        row = db.execute(
+            "SELECT record FROM shared_executions WHERE execution_id = ?", (execution_id,)
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    @staticmethod
+    def _write_to(db: sqlite3.Connection, record: Dict[str, Any], replace: bool = True):
+        db.execute(
+            f"INSERT {'OR REPLACE ' if replace else ''}INTO shared_executions "
+            "(execution_id, pipeline_name, status, start_ts, updated_at, record) VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                record["execution_id"],
+                record.get("pipeline_name") or "",
+                str(record.get("status") or "").upper(),
+                _to_timestamp(record.get("start_time")),
+                time.time(),
+                json.dumps(record, default=str),
+            ),
+        )
+
+    def _evict_locked(self):
+        """完了済みレコードに件数上限・TTLを適用（実行中のレコードは対象外）"""
+        active = tuple(ACTIVE_STATUSES)
+        placeholders = ",".join("?" * len(active))
+        evicted = 0
+        if self.ttl_seconds > 0:
+            evicted += self._db.execute(
+                f"DELETE FROM shared_executions WHERE status NOT IN ({placeholders}) AND updated_at < ?",
+                active + (time.time() - self.ttl_seconds,),
+            ).rowcount
+        if self.max_entries > 0:
+            evicted += self._db.execute(
+                f"""
+                DELETE FROM shared_executions WHERE execution_id IN (
+                    SELECT execution_id FROM shared_executions
+                    WHERE status NOT IN ({placeholders})
+                    ORDER BY updated_at DESC LIMIT -1 OFFSET ?
+                )
+                """,
+                active + (self.max_entries,),
+            ).rowcount
+        self._evicted += evicted
@@ -0,0 +1,432 @@
+"""
+IR Simulator用 パイプライン実行ジョブキュー
+投入されたジョブをバックグラウンドのワーカーで実行する（同時実行数は設定で制限）
+
+PipelineJobQueue       - プロセス内のasyncio.Queue（単一ワーカープロセス向け）
+SharedPipelineJobQueue - SQLite WALファイルを介して複数ワーカープロセスでジョブを分配
+"""
+
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# ジョブハンドラー: (job_id, payload) -> 結果（JSONシリアライズ可能な値）
+JobHandler = Callable[[str, Dict[str, Any]], Awaitable[Any]]
+
+# リース切れの通知: (SQLite接続, 再投入したjob_id, [(失敗としたjob_id, エラーメッセージ)])
+# ジョブテーブルの更新と同じトランザクション内で呼び出される
+LeaseExpiredHook = Callable[[sqlite3.Connection, List[str], List[Tuple[str, str]]], None]
+
+
+class DuplicateJobError(ValueError):
+    """同じjob_idのジョブが既にジョブテーブルに存在する"""
+
+
+class PipelineJobQueue:
+    """asyncio.Queueと固定数のワーカータスクによるジョブキュー"""
+
+    def __init__(self, handler: JobHandler, concurrency: int = 4, max_queue_size: int = 0):
+        if concurrency < 1:
+            raise ValueError("concurrency must be >= 1")
+        self.handler = handler
+        self.concurrency = concurrency
+        self.max_queue_size = max_queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers = []
+        self._running = 0
+        self._metrics = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "total_queue_wait_seconds": 0.0,
+        }
+
+    async def start(self):
+        """ワーカーを起動（アプリ起動時に呼び出す）"""
+        if self._workers:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._workers = [
+            asyncio.create_task(self._worker(i), name=f"pipeline-worker-{i}")
+            for i in range(self.concurrency)
+        ]
+        logger.info(f"Pipeline job queue started with {self.concurrency} workers")
+
+    async def stop(self):
+        """ワーカーを停止"""
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+    async def submit(self, job_id: str, payload: Dict[str, Any]) -> asyncio.Future:
+        """ジョブを投入し、完了時に結果が設定されるFutureを返す
+
+        キューが上限に達している場合はasyncio.QueueFullを送出する
+        """
+        if self._queue is None:
+            raise RuntimeError("Job queue is not started")
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((job_id, payload, future, time.monotonic()))
+        self._metrics["submitted"] += 1
+        return future
+
+    def stats(self) -> Dict[str, Any]:
+        """キューのメトリクスを取得"""
+        stats = dict(self._metrics)
+        stats.update({
+            "concurrency": self.concurrency,
+            "queued": self._queue.qsize() if self._queue else 0,
+            "running": self._running,
+        })
+        stats["total_queue_wait_seconds"] = round(stats["total_queue_wait_seconds"], 4)
+        return stats
+
+    async def _worker(self, index: int):
+        while True:
+            job_id, payload, future, enqueued_at = await self._queue.get()
+            self._metrics["total_queue_wait_seconds"] += time.monotonic() - enqueued_at
+            self._running += 1
+            try:
+                result = await self.handler(job_id, payload)
+                self._metrics["completed"] += 1
+                if not future.done():
+                    future.set_result(result)
+            except asyncio.CancelledError:
+                if not future.done():
+                    future.cancel()
+                raise
+            except Exception as e:
+                self._metrics["failed"] += 1
+                logger.error(f"Pipeline job {job_id} failed in worker {index}: {e}")
+                if not future.done():
+                    future.set_exception(e)
+            finally:
+                self._running -= 1
+                self._queue.task_done()
+
+
+class SharedPipelineJobQueue:
+    """SQLiteのジョブテーブルを共有キューとする複数プロセス対応のジョブキュー
+
+    各プロセスのディスパッチャーが空きスロット分のジョブを排他トランザクションで取得して実行する。
+    投入元と実行プロセスが異なる場合、投入元のFutureはジョブテーブルの結果をポーリングして完了させる。
+    実行中のジョブはlease_seconds毎に更新するリースを持ち、リースが切れたジョブ（ワーカーの異常終了）は
+    max_attempts回まで再投入する。on_lease_expiredを指定すると、同じトランザクション内で再投入・失敗を
+    通知する（実行履歴の更新用）。SQLiteへのアクセスはイベントループを止めないようスレッド上で行う
+    """
+
+    # 完了済みジョブの保持期間（秒）
+    RETENTION_SECONDS = 300
+
+    def __init__(
+        self,
+        sqlite_path: str,
+        handler: JobHandler,
+        concurrency: int = 4,
+        max_queue_size: int = 0,
+        poll_interval: float = 0.05,
+        lease_seconds: float = 30.0,
+        max_attempts: int = 3,
+        on_lease_expired: Optional[LeaseExpiredHook] = None,
+    ):
+        if concurrency < 1:
+            raise ValueError("concurrency must be >= 1")
+        self.sqlite_path = sqlite_path
+        self.handler = handler
+        self.concurrency = concurrency
+        self.max_queue_size = max_queue_size
+        self.poll_interval = poll_interval
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        self.on_lease_expired = on_lease_expired
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(sqlite_path, check_same_thread=False, isolation_level=None, timeout=30)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS pipeline_jobs (
+                job_id TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL,
+                enqueued_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL,
+                worker TEXT,
+                heartbeat_at REAL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                result TEXT,
+                error TEXT
+            )
+        """)
+        # リース列の無い既存ファイルを移行
+        columns = {row[1] for row in self._db.execute("PRAGMA table_info(pipeline_jobs)")}
+        if "heartbeat_at" not in columns:
+            self._db.execute("ALTER TABLE pipeline_jobs ADD COLUMN heartbeat_at REAL")
+        if "attempts" not in columns:
+            self._db.execute("ALTER TABLE pipeline_jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+        self._db.execute("CREATE INDEX IF NOT EXISTS ix_pipeline_jobs_status ON pipeline_jobs (status, enqueued_at)")
+
+        self._futures: Dict[str, asyncio.Future] = {}
+        self._tasks: Dict[str, asyncio.Task] = {}
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._last_cleanup = 0.0
+        self._last_lease_check = 0.0
+        self._metrics = {
+            "submitted": 0,
+            "completed": 0,
+            "failed": 0,
+            "requeued": 0,
+            "abandoned": 0,
+            "total_queue_wait_seconds": 0.0,
+        }
+
+    async def start(self):
+        if self._dispatcher is not None:
+            return
+        self._wakeup = asyncio.Event()
+        self._dispatcher = asyncio.create_task(self._dispatch(), name="pipeline-dispatcher")
+        logger.info(f"Shared pipeline job queue started on {self.sqlite_path} "
+                    f"(worker={self.worker_id}, concurrency={self.concurrency})")
+
+    async def stop(self):
+        tasks = list(self._tasks.values())
+        if self._dispatcher is not None:
+            tasks.append(self._dispatcher)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self._dispatcher = None
+        self._tasks.clear()
+
+    async def submit(self, job_id: str, payload: Dict[str, Any]) -> asyncio.Future:
+        """ジョブをジョブテーブルへ登録
+
+        キューが上限に達している場合はasyncio.QueueFull、job_idが重複する場合はDuplicateJobErrorを送出する
+        """
+        if self._dispatcher is None:
+            raise RuntimeError("Job queue is not started")
+        await asyncio.to_thread(self._enqueue, job_id, json.dumps(payload, default=str))
+        future = asyncio.get_running_loop().create_future()
+        self._futures[job_id] = future
+        self._metrics["submitted"] += 1
+        self._wakeup.set()
+        return future
+
+    def stats(self) -> Dict[str, Any]:
+        """キューのメトリクスを取得（SQLiteを参照するため、イベントループ外から呼び出す）"""
+        with self._lock:
+            counts = dict(self._db.execute(
+                "SELECT status, COUNT(*) FROM pipeline_jobs WHERE status IN ('QUEUED', 'RUNNING') GROUP BY status"
+            ).fetchall())
+        stats = dict(self._metrics)
+        stats.update({
+            "concurrency": self.concurrency,
+            "queued": counts.get("QUEUED", 0),
+            "running": len(self._tasks),
+            "running_all_workers": counts.get("RUNNING", 0),
+            "worker": self.worker_id,
+            "lease_seconds": self.lease_seconds,
+            "shared": True,
+        })
+        stats["total_queue_wait_seconds"] = round(stats["total_queue_wait_seconds"], 4)
+        return stats
+
+    # ------------------------------------------------------------------
+    # ディスパッチ
+    # ------------------------------------------------------------------
+
+    async def _dispatch(self):
+        while True:
+            claimed = []
+            try:
+                if time.monotonic() - self._last_lease_check >= self.lease_seconds / 3:
+                    requeued, abandoned = await asyncio.to_thread(self._renew_leases, list(self._tasks))
+                    self._metrics["requeued"] += requeued
+                    self._metrics["abandoned"] += abandoned
+                    self._last_lease_check = time.monotonic()
+
+                free = self.concurrency - len(self._tasks)
+                if free > 0:
+                    claimed = await asyncio.to_thread(self._claim, free)
+                for job_id, payload, enqueued_at in claimed:
+                    self._metrics["total_queue_wait_seconds"] += max(time.time() - enqueued_at, 0.0)
+                    self._tasks[job_id] = asyncio.create_task(self._run(job_id, payload))
+
+                # 他ワーカーで実行されたジョブの完了を投入元のFutureへ反映
+                waiting = [job_id for job_id in self._futures if job_id not in self._tasks]
+                for job_id, status, result, error in await asyncio.to_thread(self._poll_finished, waiting):
+                    if status == "DONE":
+                        self._resolve(job_id, result=json.loads(result) if result else None)
+                    else:
+                        self._resolve(job_id, error=RuntimeError(error or "Pipeline job failed"))
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.warning(f"Shared job dispatcher error: {e}")
+            if not claimed:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def _run(self, job_id: str, payload: Dict[str, Any]):
+        try:
+            result = await self.handler(job_id, payload)
+            self._metrics["completed"] += 1
+            await asyncio.to_thread(self._finish, job_id, "DONE", json.dumps(result, default=str), None)
+            self._resolve(job_id, result=result)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            self._metrics["failed"] += 1
+            logger.error(f"Pipeline job {job_id} failed on {self.worker_id}: {e}")
+            await asyncio.to_thread(self._finish, job_id, "FAILED", None, str(e))
+            self._resolve(job_id, error=e)
+        finally:
+            self._tasks.pop(job_id, None)
+            # 空いたスロットで次のジョブを取得
+            self._wakeup.set()
+
+    def _resolve(self, job_id: str, result: Any = None, error: Optional[BaseException] = None):
+        future = self._futures.pop(job_id, None)
+        if future is None or future.done():
+            return
+        if error is not None:
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+
+    def _enqueue(self, job_id: str, payload: str):
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                if self.max_queue_size > 0:
+                    queued = self._db.execute(
+                        "SELECT COUNT(*) FROM pipeline_jobs WHERE status = 'QUEUED'"
+                    ).fetchone()[0]
+                    if queued >= self.max_queue_size:
+                        raise asyncio.QueueFull()
+                self._db.execute(
+                    "INSERT INTO pipeline_jobs (job_id, payload, status, enqueued_at) VALUES (?, ?, 'QUEUED', ?)",
+                    (job_id, payload, time.time()),
+                )
+                self._db.execute("COMMIT")
+            except sqlite3.IntegrityError:
+                self._db.execute("ROLLBACK")
+                raise DuplicateJobError(f"Job {job_id} already exists") from None
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+
+    def _claim(self, limit: int) -> List[tuple]:
+        """QUEUEDのジョブを最大limit件、このワーカーの実行中として取得"""
+        with self._lock:
+            # 待機中のジョブが無ければ書き込みロックを取得しない（アイドル時のロック競合を避ける）
+            if self._db.execute("SELECT 1 FROM pipeline_jobs WHERE status = 'QUEUED' LIMIT 1").fetchone() is None:
+                return []
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._db.execute(
+                    "SELECT job_id, payload, enqueued_at FROM pipeline_jobs "
+                    "WHERE status = 'QUEUED' ORDER BY enqueued_at LIMIT ?",
+                    (limit,),
+                ).fetchall()
+                now = time.time()
+                self._db.executemany(
+                    "UPDATE pipeline_jobs SET status = 'RUNNING', worker = ?, started_at = ?, heartbeat_at = ?, "
+                    "attempts = attempts + 1 WHERE job_id = ?",
+                    [(self.worker_id, now, now, job_id) for job_id, _, _ in rows],
+                )
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        return [(job_id, json.loads(payload), enqueued_at) for job_id, payload, enqueued_at in rows]
+
+    def _finish(self, job_id: str, status: str, result: Optional[str], error: Optional[str]):
+        """（リースを失って他ワーカーへ再投入されたジョブは更新しない）"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE pipeline_jobs SET status = ?, finished_at = ?, result = ?, error = ? "
+                "WHERE job_id = ? AND status = 'RUNNING' AND worker = ?",
+                (status, time.time(), result, error, job_id, self.worker_id),
+            )
+
+    def _renew_leases(self, running: List[str]) -> Tuple[int, int]:
+        """このワーカーで実行中のジョブのリースを更新し、リースの切れたジョブを再投入
+
+        試行回数がmax_attemptsに達したジョブは失敗とする。(再投入件数, 失敗件数) を返す
+        """
+        now = time.time()
+        expired_before = now - self.lease_seconds
+        with self._lock:
+            self._db.execute("BEGIN IMMEDIATE")
+            try:
+                for start in range(0, len(running), 500):
+                    chunk = running[start:start + 500]
+                    self._db.execute(
+                        f"UPDATE pipeline_jobs SET heartbeat_at = ? "
+                        f"WHERE status = 'RUNNING' AND worker = ? AND job_id IN ({','.join('?' * len(chunk))})",
+                        [now, self.worker_id] + chunk,
+                    )
+                expired = self._db.execute(
+                    "SELECT job_id, worker, attempts FROM pipeline_jobs "
+                    "WHERE status = 'RUNNING' AND COALESCE(heartbeat_at, started_at) < ?",
+                    (expired_before,),
+                ).fetchall()
+                abandoned = [
+                    (job_id, f"Worker {worker or '?'} stopped while running the job")
+                    for job_id, worker, attempts in expired
+                    if attempts >= self.max_attempts
+                ]
+                requeued = [job_id for job_id, _, attempts in expired if attempts < self.max_attempts]
+                self._db.executemany(
+                    "UPDATE pipeline_jobs SET status = 'FAILED', finished_at = ?, error = ? WHERE job_id = ?",
+                    [(now, error, job_id) for job_id, error in abandoned],
+                )
+                self._db.executemany(
+                    "UPDATE pipeline_jobs SET status = 'QUEUED', worker = NULL, started_at = NULL WHERE job_id = ?",
+                    [(job_id,) for job_id in requeued],
+                )
+                if expired and self.on_lease_expired is not None:
+                    self.on_lease_expired(self._db, requeued, abandoned)
+                self._db.execute("COMMIT")
+            except BaseException:
+                self._db.execute("ROLLBACK")
+                raise
+        if expired:
+            logger.warning(f"Re-queued {len(requeued)} and failed {len(abandoned)} pipeline jobs with expired leases")
+        return len(requeued), len(abandoned)
+
+    def _poll_finished(self, waiting: List[str]) -> List[tuple]:
+        """指定ジョブのうち完了済みのものを取得し、保持期間を過ぎた完了済みジョブを削除"""
+        now = time.time()
+        finished = []
+        with self._lock:
+            for start in range(0, len(waiting), 500):
+                chunk = waiting[start:start + 500]
+                finished += self._db.execute(
+                    f"SELECT job_id, status, result, error FROM pipeline_jobs "
+                    f"WHERE job_id IN ({','.join('?' * len(chunk))}) AND status IN ('DONE', 'FAILED')",
+                    chunk,
+                ).fetchall()
+            if now - self._last_cleanup > self.RETENTION_SECONDS:
+                self._db.execute(
+                    "DELETE FROM pipeline_jobs WHERE status IN ('DONE', 'FAILED') AND finished_at < ?",
+                    (now - self.RETENTION_SECONDS,),
+                )
+                self._last_cleanup = now
+        return finished
@@ -3,19 +3,32 @@ Integration Runtime Simulator for E2E Testing
 Azure Data Factory活動をシミュレートするFastAPIアプリケーション
 """
 
-from fastapi import FastAPI, HTTPException, UploadFile, File, BackgroundTasks
+from fastapi import FastAPI, HTTPException, UploadFile, File, BackgroundTasks, Query, Request, Response
+from fastapi.responses import JSONResponse, PlainTextResponse
 from pydantic import BaseModel
 from typing import Dict, List, Optional, Any
 import json
 import uuid
 import asyncio
+import functools
 import os
+import time
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 import pandas as pd
 import pyodbc
 from azure.storage.blob import BlobServiceClient
 
+from blob_upload import BlockBlobStreamUploader, UploadProgressTracker, iter_upload_file, new_upload_id, plan_block_size
+from copy_engine import CopyEngine, has_copy_source
+from execution_store import ExecutionStore, SharedExecutionStore
+from job_queue import DuplicateJobError, PipelineJobQueue, SharedPipelineJobQueue
+from metrics import MetricsRegistry
+from pipeline_graph import load_pipeline_graphs, run_activity_graph, FAILED
+from timing_model import TimingModel
+from sql_pool import SQLConnectionPool, SQLPoolTimeoutError
+
 # ログ設定
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -29,6 +42,37 @@ SQL_SERVER_USER = os.getenv("SQL_SERVER_USER", "sa")
 SQL_SERVER_PASSWORD = os.getenv("SQL_SERVER_PASSWORD", "YourStrong!Passw0rd123")
 AZURITE_HOST = os.getenv("AZURITE_HOST", "azurite-test")
 AZURITE_PORT = os.getenv("AZURITE_PORT", "10000")
+SQL_POOL_MAX_SIZE = int(os.getenv("SQL_POOL_MAX_SIZE", "20"))
+SQL_POOL_MIN_SIZE = int(os.getenv("SQL_POOL_MIN_SIZE", "0"))
+SQL_POOL_ACQUIRE_TIMEOUT = float(os.getenv("SQL_POOL_ACQUIRE_TIMEOUT", "10"))
+SQL_POOL_MAX_IDLE_SECONDS = float(os.getenv("SQL_POOL_MAX_IDLE_SECONDS", "300"))
+SQL_POOL_HEALTH_CHECK_SECONDS = float(os.getenv("SQL_POOL_HEALTH_CHECK_SECONDS", "30"))
+PIPELINE_WORKER_CONCURRENCY = int(os.getenv("PIPELINE_WORKER_CONCURRENCY", "4"))
+PIPELINE_QUEUE_MAX_SIZE = int(os.getenv("PIPELINE_QUEUE_MAX_SIZE", "0"))
+EXECUTION_HISTORY_MAX_ENTRIES = int(os.getenv("EXECUTION_HISTORY_MAX_ENTRIES", "10000"))
+EXECUTION_HISTORY_TTL_SECONDS = float(os.getenv("EXECUTION_HISTORY_TTL_SECONDS", "0"))
+EXECUTION_HISTORY_SQLITE_PATH = os.getenv("EXECUTION_HISTORY_SQLITE_PATH") or None
+SIMULATOR_TIMING_MODE = os.getenv("SIMULATOR_TIMING_MODE") or None
+TIMING_PROFILE_PATH = os.getenv(
+    "TIMING_PROFILE_PATH",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "config", "timing_profile.json"),
+)
+PIPELINE_DEFINITIONS_DIR = os.getenv("PIPELINE_DEFINITIONS_DIR", "/app/src/dev/pipeline")
+COPY_BATCH_SIZE = int(os.getenv("COPY_BATCH_SIZE", "1000"))
+IO_EXECUTOR_WORKERS = int(os.getenv("IO_EXECUTOR_WORKERS", str(SQL_POOL_MAX_SIZE + 4)))
+COPY_BATCH_MAX_CONCURRENCY = int(os.getenv("COPY_BATCH_MAX_CONCURRENCY", "8"))
+COPY_BATCH_MAX_ITEMS = int(os.getenv("COPY_BATCH_MAX_ITEMS", "500"))
+# 複数ワーカープロセスで起動する場合は実行状態・ジョブキューをSQLiteファイルで共有
+SIMULATOR_WORKERS = int(os.getenv("SIMULATOR_WORKERS", "1"))
+SHARED_STATE_PATH = os.getenv("SHARED_STATE_PATH") or (
+    "/tmp/ir-simulator-shared.db" if SIMULATOR_WORKERS > 1 else None
+)
+HEALTH_PROBE_INTERVAL_SECONDS = float(os.getenv("HEALTH_PROBE_INTERVAL_SECONDS", "10"))
+UPLOAD_BLOCK_SIZE = int(os.getenv("UPLOAD_BLOCK_SIZE", str(4 * 1024 * 1024)))
+UPLOAD_MAX_CONCURRENCY = int(os.getenv("UPLOAD_MAX_CONCURRENCY", "4"))
+# 1アップロードあたりのバッファ上限（block_size × (concurrency + 1)）とブロックサイズの上限
+UPLOAD_MAX_BUFFER_BYTES = int(os.getenv("UPLOAD_MAX_BUFFER_BYTES", str(256 * 1024 * 1024)))
+UPLOAD_MAX_BLOCK_SIZE = int(os.getenv("UPLOAD_MAX_BLOCK_SIZE", str(100 * 1024 * 1024)))
 
 # データモデル
 class CopyActivityRequest(BaseModel):
@@ -37,6 +81,7 @@ class CopyActivityRequest(BaseModel):
     pipeline_name: str
     activity_name: str
     execution_id: Optional[str] = None
+    batch_size: Optional[int] = None
 
 class CopyActivityResponse(BaseModel):
     execution_id: str
@@ -45,6 +90,23 @@ class CopyActivityResponse(BaseModel):
     start_time: str
     end_time: Optional[str] = None
     error_message: Optional[str] = None
+    bytes_copied: Optional[int] = None
+    batches: Optional[int] = None
+    duration_seconds: Optional[float] = None
+    rows_per_second: Optional[float] = None
+    bytes_per_second: Optional[float] = None
+    sink_target: Optional[str] = None
+
+class CopyActivityBatchRequest(BaseModel):
+    activities: List[CopyActivityRequest]
+    max_concurrency: Optional[int] = None
+
+class CopyActivityBatchResponse(BaseModel):
+    results: List[CopyActivityResponse]
+    total: int
+    succeeded: int
+    failed: int
+    duration_seconds: float
 
 class PipelineExecutionRequest(BaseModel):
     pipeline_name: str
@@ -59,75 +121,510 @@ class PipelineExecutionResponse(BaseModel):
     end_time: Optional[str] = None
     activities_executed: List[str] = []
     error_message: Optional[str] = None
+    submitted_at: Optional[str] = None
+    activities_total: Optional[int] = None
+    current_activity: Optional[str] = None
+    activities_running: List[str] = []
+    activities_skipped: List[str] = []
+
+# パイプライン定義のアクティビティ依存グラフ（起動時に1回だけ解析し、タイミングモデルと共有）
+pipeline_graphs = load_pipeline_graphs(PIPELINE_DEFINITIONS_DIR)
+
+# 処理時間モデル（fixed / zero / realistic）
+timing_model = TimingModel.from_files(TIMING_PROFILE_PATH, pipeline_graphs, SIMULATOR_TIMING_MODE)
+
+# 実行状態の管理（件数上限・TTL付き、パイプライン名/ステータス/開始時刻でインデックス）
+if SHARED_STATE_PATH:
+    # どのワーカーでも/execution-statusに応答できるよう共有ファイルを直接参照
+    execution_store = SharedExecutionStore(
+        SHARED_STATE_PATH,
+        max_entries=EXECUTION_HISTORY_MAX_ENTRIES,
+        ttl_seconds=EXECUTION_HISTORY_TTL_SECONDS,
+    )
+else:
+    execution_store = ExecutionStore(
+        max_entries=EXECUTION_HISTORY_MAX_ENTRIES,
+        ttl_seconds=EXECUTION_HISTORY_TTL_SECONDS,
+        sqlite_path=EXECUTION_HISTORY_SQLITE_PATH,
+    )
+
+def _create_sql_connection():
+    """SQL Server接続を新規作成（プールの接続ファクトリ）"""
+    connection_string = f"""
+    DRIVER={{ODBC Driver 18 for SQL Server}};
+    SERVER={SQL_SERVER_HOST},{SQL_SERVER_PORT};
+    DATABASE=TGMATestDB;
+    UID={SQL_SERVER_USER};
+    PWD={SQL_SERVER_PASSWORD};
+    TrustServerCertificate=yes;
+    Encrypt=no;
+    """
+    return pyodbc.connect(connection_string)
 
-# 実行状態の管理
-execution_status: Dict[str, Dict] = {}
+# SQL Server接続プール（リクエスト毎のpyodbc.connectを避ける）
+sql_pool = SQLConnectionPool(
+    _create_sql_connection,
+    max_size=SQL_POOL_MAX_SIZE,
+    min_size=SQL_POOL_MIN_SIZE,
+    acquire_timeout=SQL_POOL_ACQUIRE_TIMEOUT,
+    max_idle_seconds=SQL_POOL_MAX_IDLE_SECONDS,
+    health_check_interval=SQL_POOL_HEALTH_CHECK_SECONDS,
+)
 
 def get_sql_connection():
-    """SQL Server接続を取得"""
+    """プールからSQL Server接続を取得（使用後はrelease_sql_connectionで返却）
+
+    SQL Serverが構成されていない（ホスト未指定・ODBCドライバー未導入）場合のみNoneを返す。
+    プールの取得タイムアウト（SQLPoolTimeoutError）や接続エラーは呼び出し元へ送出する
+    """
+    if not SQL_SERVER_HOST:
+        return None
     try:
-        connection_string = f"""
-        DRIVER={{ODBC Driver 18 for SQL Server}};
-        SERVER={SQL_SERVER_HOST},{SQL_SERVER_PORT};
-        DATABASE=TGMATestDB;
-        UID={SQL_SERVER_USER};
-        PWD={SQL_SERVER_PASSWORD};
-        TrustServerCertificate=yes;
-        Encrypt=no;
-        """
-        return pyodbc.connect(connection_string)
-    except Exception as e:
-        logger.error(f"SQL Server connection failed: {e}")
+        return sql_pool.acquire()
+    except pyodbc.InterfaceError as e:
+        # ドライバー・DSNが見つからない
+        logger.error(f"SQL Server is not configured: {e}")
         return None
 
+def release_sql_connection(conn, discard: bool = False):
+    """SQL Server接続をプールへ返却"""
+    if conn is not None:
+        sql_pool.release(conn, discard=discard)
+
+@functools.lru_cache(maxsize=1)
 def get_azurite_client():
-    """Azurite Blob Service Clientを取得"""
+    """Azurite Blob Service Clientを取得（スレッドセーフなため1インスタンスを共有）"""
     connection_string = f"DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;AccountKey=Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw==;BlobEndpoint=http://{AZURITE_HOST}:{AZURITE_PORT}/devstoreaccount1;"
     return BlobServiceClient.from_connection_string(connection_string)
 
+# ブロッキングI/O（pyodbc・Azurite SDK）専用のスレッドプール
+# イベントループ上で直接実行すると1件の遅いクエリが全リクエストを停止させるため
+io_executor = ThreadPoolExecutor(max_workers=IO_EXECUTOR_WORKERS, thread_name_prefix="ir-io")
+
+async def run_blocking(func, *args, **kwargs):
+    """ブロッキング処理をI/O専用エグゼキューターで実行して結果を待機"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(io_executor, functools.partial(func, *args, **kwargs))
+
+async def run_shared_state(func, *args, **kwargs):
+    """実行履歴ストア・ジョブキューの操作を実行
+
+    共有モードではSQLiteのロック待ち（最大30秒）でブロックするため、I/O専用エグゼキューター上で実行する
+    """
+    if SHARED_STATE_PATH:
+        return await run_blocking(func, *args, **kwargs)
+    return func(*args, **kwargs)
+
+# source/sink設定に従って実データをストリーミングコピーするエンジン
+copy_engine = CopyEngine(sql_pool, get_azurite_client, default_batch_size=COPY_BATCH_SIZE)
+
+# パイプライン実行ジョブキュー（同時実行数をPIPELINE_WORKER_CONCURRENCYで制限、共有モードではワーカー毎）
+if SHARED_STATE_PATH:
+    pipeline_queue = SharedPipelineJobQueue(
+        SHARED_STATE_PATH,
+        lambda job_id, payload: _run_pipeline_job(job_id, payload),
+        concurrency=PIPELINE_WORKER_CONCURRENCY,
+        max_queue_size=PIPELINE_QUEUE_MAX_SIZE,
+        # リースが切れたジョブの実行履歴も同じトランザクションでQUEUED/FAILEDへ更新する
+        on_lease_expired=SharedExecutionStore.apply_lease_expiry,
+    )
+else:
+    pipeline_queue = PipelineJobQueue(
+        lambda job_id, payload: _run_pipeline_job(job_id, payload),
+        concurrency=PIPELINE_WORKER_CONCURRENCY,
+        max_queue_size=PIPELINE_QUEUE_MAX_SIZE,
+    )
+
+# アップロード進捗（/upload-progress/{upload_id} で参照、ワーカープロセス毎に保持）
+upload_progress = UploadProgressTracker()
+
+# メトリクス（/metrics でPrometheusテキスト形式として出力）
+metrics = MetricsRegistry()
+http_requests_total = metrics.counter(
+    "ir_simulator_http_requests_total", "HTTP requests by endpoint and status code",
+    ("method", "endpoint", "status"))
+http_request_duration = metrics.histogram(
+    "ir_simulator_http_request_duration_seconds", "HTTP request latency by endpoint",
+    ("method", "endpoint"))
+copy_activity_duration = metrics.histogram(
+    "ir_simulator_copy_activity_duration_seconds", "Copy activity duration by pipeline",
+    ("pipeline", "status"))
+pipeline_duration = metrics.histogram(
+    "ir_simulator_pipeline_duration_seconds", "Pipeline execution duration by pipeline",
+    ("pipeline", "status"), buckets=(0.1, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0))
+rows_copied_total = metrics.counter(
+    "ir_simulator_rows_copied_total", "Rows copied by copy activities", ("pipeline",))
+bytes_copied_total = metrics.counter(
+    "ir_simulator_bytes_copied_total", "Bytes copied by copy activities (real data copies only)", ("pipeline",))
+copy_rows_per_second = metrics.gauge(
+    "ir_simulator_copy_rows_per_second", "Throughput of the most recent real data copy", ("pipeline",))
+azurite_call_duration = metrics.histogram(
+    "ir_simulator_azurite_call_duration_seconds", "Azurite Blob API call latency by operation",
+    ("operation",))
+metrics.gauge(
+    "ir_simulator_pipeline_runs", "Pipeline runs waiting in the queue or running", ("state",),
+    callback=lambda: [({"state": "queued"}, pipeline_queue.stats()["queued"]),
+                      ({"state": "running"}, pipeline_queue.stats()["running"])])
+metrics.gauge(
+    "ir_simulator_sql_pool_connections", "SQL connection pool usage", ("state",),
+    callback=lambda: [({"state": k}, sql_pool.stats()[k]) for k in ("in_use", "idle", "size", "max_size")])
+metrics.counter(
+    "ir_simulator_sql_pool_events_total", "SQL connection pool events", ("event",),
+    callback=lambda: [({"event": k}, sql_pool.stats()[k]) for k in (
+        "checkouts", "pool_hits", "pool_misses", "waits", "acquire_timeouts",
+        "connections_created", "connections_closed", "connections_evicted",
+        "health_check_failures", "connect_failures")])
+metrics.counter(
+    "ir_simulator_sql_pool_wait_seconds_total", "Total time spent waiting for a pooled SQL connection",
+    callback=lambda: [({}, sql_pool.stats()["total_wait_seconds"])])
+metrics.counter(
+    "ir_simulator_pipeline_queue_wait_seconds_total", "Total time pipeline runs spent queued",
+    callback=lambda: [({}, pipeline_queue.stats()["total_queue_wait_seconds"])])
+
+def _record_copy_metrics(pipeline_name: str, status: str, duration: float, rows_copied: int, copy_result):
+    """Copy Activityの処理時間・転送量を記録"""
+    copy_activity_duration.observe(duration, pipeline=pipeline_name, status=status)
+    rows_copied_total.inc(rows_copied or 0, pipeline=pipeline_name)
+    if copy_result:
+        bytes_copied_total.inc(copy_result.bytes_copied, pipeline=pipeline_name)
+        copy_rows_per_second.set(round(copy_result.rows_per_second, 2), pipeline=pipeline_name)
+
+def _timed_azurite_call(func, *args, **kwargs):
+    with azurite_call_duration.time(operation=getattr(func, "__name__", "call")):
+        return func(*args, **kwargs)
+
+async def run_azurite(func, *args, **kwargs):
+    """Azurite SDKの呼び出しをエグゼキューター上で実行し、処理時間を記録"""
+    return await run_blocking(_timed_azurite_call, func, *args, **kwargs)
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """エンドポイント別のリクエスト数・レイテンシを記録（ラベルはパスではなくルート定義を使用）"""
+    started = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        route = request.scope.get("route")
+        endpoint = getattr(route, "path", "unmatched")
+        http_requests_total.inc(method=request.method, endpoint=endpoint, status=status)
+        http_request_duration.observe(time.perf_counter() - started, method=request.method, endpoint=endpoint)
+
+# 依存サービスの最新プローブ結果（/healthはこれを即座に返す、ワーカープロセス毎に保持）
+health_cache: Dict[str, Any] = {}
+health_probe_task: Optional[asyncio.Task] = None
+
+@app.on_event("startup")
+async def start_background_workers():
+    """接続の事前作成・アイドル接続の定期破棄・パイプライン実行ワーカー・ヘルスプローブを開始"""
+    global health_probe_task
+    # SQL Serverの起動待ちで起動処理を止めないよう、min_sizeまでの接続作成は待たずにバックグラウンドで行う
+    if SQL_SERVER_HOST and SQL_POOL_MIN_SIZE:
+        asyncio.get_running_loop().run_in_executor(io_executor, sql_pool.prefill)
+    sql_pool.start_reaper(interval=max(SQL_POOL_MAX_IDLE_SECONDS / 2, 5.0))
+    await pipeline_queue.start()
+    health_probe_task = asyncio.create_task(_health_probe_loop(), name="health-probe")
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    """ワーカーを停止し、プール内の接続を全て閉じる"""
+    if health_probe_task is not None:
+        health_probe_task.cancel()
+        await asyncio.gather(health_probe_task, return_exceptions=True)
+    await pipeline_queue.stop()
+    execution_store.close()
+    sql_pool.close_all()
+    io_executor.shutdown(wait=False)
+
+# ---------------------------------------------------------------------------
+# ブロッキングI/O処理（run_blocking経由でエグゼキューター上から呼び出す）
+# ---------------------------------------------------------------------------
+
+def _probe_sql_server() -> str:
+    """SQL Serverの疎通確認"""
+    conn = None
+    try:
+        conn = get_sql_connection()
+        if not conn:
+            return "unavailable: SQL Server is not configured"
+        cursor = conn.cursor()
+        cursor.execute("SELECT 1")
+        cursor.fetchone()
+        release_sql_connection(conn)
+        return "healthy"
+    except Exception as e:
+        release_sql_connection(conn, discard=True)
+        return f"unhealthy: {str(e)}"
+
+def _probe_azurite() -> str:
+    """Azuriteの疎通確認"""
+    try:
+        blob_client = get_azurite_client()
+        # コンテナリストを試行
+        with azurite_call_duration.time(operation="list_containers"):
+            list(blob_client.list_containers())
+        return "healthy"
+    except Exception as e:
+        return f"unhealthy: {str(e)}"
+
+def _log_copy_activity_start(pipeline_name: str, start_time: datetime) -> bool:
+    """ETLログにRUNNINGレコードを記録（SQL接続が利用可能だったかを返す）"""
+    conn = get_sql_connection()
+    if not conn:
+        logger.warning("SQL connection not available - skipping database logging")
+        return False
+    try:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO [dbo].[pipeline_execution_log] 
+            (pipeline_name, execution_start, status, records_processed)
+            VALUES (?, ?, ?, ?)
+        """, pipeline_name, start_time, "RUNNING", 0)
+        conn.commit()
+        return True
+    finally:
+        release_sql_connection(conn)
+
+def _count_simulated_rows(cursor, pipeline_name: str) -> int:
+    """シミュレーションモードのrows_copied（パイプライン名から対象テーブルの件数を算出）"""
+    if "client_dm" in pipeline_name.lower():
+        cursor.execute("SELECT COUNT(*) FROM [dbo].[client_dm]")
+    elif "clientdmbx" in pipeline_name.lower():
+        cursor.execute("SELECT COUNT(*) FROM [dbo].[ClientDmBx]")
+    elif "point_grant" in pipeline_name.lower():
+        cursor.execute("SELECT COUNT(*) FROM [dbo].[point_grant_email]")
+    else:
+        return 100
+    return cursor.fetchone()[0]
+
+def _complete_copy_activity(pipeline_name: str, start_time: datetime, sql_available: bool,
+                            rows_copied: Optional[int] = None):
+    """ETLログをSUCCESSに更新（rows_copied, end_timeを返す）
+
+    rows_copied未指定（シミュレーションモード）の場合はパイプライン名から対象テーブルの件数を算出
+    """
+    conn = get_sql_connection() if sql_available else None
+    if not conn:
+        # SQL接続が無い場合はダミー値を返す
+        return (100 if rows_copied is None else rows_copied), datetime.now()
+    try:
+        cursor = conn.cursor()
+        
+        # 成功ケースでのrows_copiedの計算
+        if rows_copied is None:
+            rows_copied = _count_simulated_rows(cursor, pipeline_name)
+        
+        end_time = datetime.now()
+        
+        # ログの更新
+        cursor.execute("""
+            UPDATE [dbo].[pipeline_execution_log] 
+            SET execution_end = ?, status = ?, records_processed = ?
+            WHERE pipeline_name = ? AND execution_start = ?
+        """, end_time, "SUCCESS", rows_copied, pipeline_name, start_time)
+        conn.commit()
+        return rows_copied, end_time
+    finally:
+        release_sql_connection(conn)
+
+def _log_copy_activity_failure(pipeline_name: str, start_time: datetime, error_message: str):
+    """ETLログをFAILEDに更新（ログ記録自体の失敗は無視）"""
+    conn = None
+    try:
+        conn = get_sql_connection()
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE [dbo].[pipeline_execution_log] 
+            SET execution_end = ?, status = ?, error_message = ?
+            WHERE pipeline_name = ? AND execution_start = ?
+        """, datetime.now(), "FAILED", error_message, pipeline_name, start_time)
+        conn.commit()
+    except:
+        pass
+    finally:
+        release_sql_connection(conn)
+
+def _log_copy_activity_batch(outcomes: List[Dict[str, Any]]):
+    """バッチ実行したCopy Activityの結果をETLログへ一括INSERT
+
+    シミュレーションモード（rows_copied未確定）の件数もここで算出する（同じパイプライン名は1回のみ集計）
+    """
+    try:
+        conn = get_sql_connection()
+    except SQLPoolTimeoutError:
+        raise
+    except Exception as e:
+        logger.warning(f"Failed to connect for batch copy activity log: {e}")
+        conn = None
+    if conn is None:
+        # SQL接続が無い場合はダミー値
+        for outcome in outcomes:
+            if outcome["rows_copied"] is None:
+                outcome["rows_copied"] = 100
+        return
+    try:
+        cursor = conn.cursor()
+        simulated_rows: Dict[str, int] = {}
+        for outcome in outcomes:
+            if outcome["status"] == "SUCCESS" and outcome["rows_copied"] is None:
+                pipeline_name = outcome["request"].pipeline_name
+                if pipeline_name not in simulated_rows:
+                    simulated_rows[pipeline_name] = _count_simulated_rows(cursor, pipeline_name)
+                outcome["rows_copied"] = simulated_rows[pipeline_name]
+
+        cursor.fast_executemany = True
+        cursor.executemany("""
+            INSERT INTO [dbo].[pipeline_execution_log] 
+            (pipeline_name, execution_start, execution_end, status, records_processed, error_message)
+            VALUES (?, ?, ?, ?, ?, ?)
+        """, [
+            (o["request"].pipeline_name, o["start_time"], o["end_time"], o["status"],
+             o["rows_copied"] or 0, o["error_message"])
+            for o in outcomes
+        ])
+        conn.commit()
+    except Exception as e:
+        # ログ記録の失敗でバッチ全体を失敗扱いにはしない
+        logger.warning(f"Failed to write batch copy activity log: {e}")
+        for outcome in outcomes:
+            if outcome["rows_copied"] is None:
+                outcome["rows_copied"] = 100
+    finally:
+        release_sql_connection(conn)
+
+def _get_upload_blob_client(container_name: str, blob_name: str):
+    """アップロード先のBlobクライアントを取得（コンテナが無ければ作成）"""
+    blob_client = get_azurite_client()
+    
+    # コンテナが存在しない場合は作成
+    try:
+        with azurite_call_duration.time(operation="create_container"):
+            blob_client.create_container(container_name)
+    except:
+        pass  # コンテナが既に存在する場合
+    
+    return blob_client.get_blob_client(
+        container=container_name, 
+        blob=blob_name
+    )
+
+def _fetch_test_data_summary() -> List[Dict[str, Any]]:
+    """テストデータサマリービューを取得"""
+    conn = get_sql_connection()
+    if conn is None:
+        raise RuntimeError("SQL Server connection is not available")
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT * FROM [dbo].[v_test_data_summary]")
+        return [
+            {
+                "table_name": row[0],
+                "record_count": row[1],
+                "last_updated": row[2].isoformat() if row[2] else None
+            }
+            for row in cursor.fetchall()
+        ]
+    finally:
+        release_sql_connection(conn)
+
+@app.exception_handler(SQLPoolTimeoutError)
+async def sql_pool_timeout_handler(request: Request, exc: SQLPoolTimeoutError):
+    """プール枯渇は成功・失敗として扱わず、503で再試行を促す"""
+    logger.warning(f"SQL connection pool exhausted: {exc}")
+    return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
 @app.get("/")
 async def root():
     """ヘルスチェックエンドポイント"""
     return {"message": "ADF Integration Runtime Simulator is running"}
 
+async def _probe_dependencies() -> Dict[str, Any]:
+    """SQL Server・Azuriteの接続チェックをエグゼキューター上で並行実行し、結果をキャッシュ"""
+    sql_state, azurite_state = await asyncio.gather(
+        run_blocking(_probe_sql_server),
+        run_blocking(_probe_azurite),
+    )
+    status = "healthy"
+    if sql_state.startswith("unhealthy") or azurite_state.startswith("unhealthy"):
+        status = "degraded"
+    health_cache.update({
+        "status": status,
+        "services": {"sql_server": sql_state, "azurite": azurite_state},
+        "checked_at": datetime.now().isoformat(),
+        "checked_monotonic": time.monotonic(),
+    })
+    return health_cache
+
+async def _health_probe_loop():
+    """HEALTH_PROBE_INTERVAL_SECONDS毎に依存サービスをプローブ"""
+    while True:
+        try:
+            await _probe_dependencies()
+        except Exception as e:
+            logger.warning(f"Background health probe failed: {e}")
+        await asyncio.sleep(HEALTH_PROBE_INTERVAL_SECONDS)
+
 @app.get("/health")
-async def health_check():
-    """詳細ヘルスチェック"""
+async def health_check(
+    deep: bool = Query(False, description="Trueの場合はキャッシュを使わず依存サービスを直接プローブ"),
+):
+    """詳細ヘルスチェック
+
+    依存サービスの状態はバックグラウンドで定期取得した結果を返す（未取得時・deep=true時のみ同期プローブ）
+    """
+    probe = health_cache
+    if deep or not probe:
+        probe = await _probe_dependencies()
+    
     health_status = {
-        "status": "healthy",
+        "status": probe["status"],
         "timestamp": datetime.now().isoformat(),
-        "services": {}
+        "services": dict(probe["services"]),
+        "checked_at": probe["checked_at"],
+        "probe_age_seconds": round(time.monotonic() - probe["checked_monotonic"], 3),
     }
-      # SQL Server接続チェック
-    try:
-        conn = get_sql_connection()
-        if conn:
-            cursor = conn.cursor()
-            cursor.execute("SELECT 1")
-            cursor.fetchone()
-            conn.close()
-            health_status["services"]["sql_server"] = "healthy"
-        else:
-            health_status["services"]["sql_server"] = "unavailable: pyodbc not installed"
-    except Exception as e:
-        health_status["services"]["sql_server"] = f"unhealthy: {str(e)}"
-        health_status["status"] = "degraded"
     
-    # Azurite接続チェック
-    try:
-        blob_client = get_azurite_client()
-        # コンテナリストを試行
-        list(blob_client.list_containers())
-        health_status["services"]["azurite"] = "healthy"
-    except Exception as e:
-        health_status["services"]["azurite"] = f"unhealthy: {str(e)}"
-        health_status["status"] = "degraded"
+    # SQL接続プール・パイプラインキューのメトリクス
+    health_status["sql_pool"] = sql_pool.stats()
+    health_status["pipeline_queue"] = await run_shared_state(pipeline_queue.stats)
+    health_status["execution_store"] = await run_shared_state(execution_store.stats)
+    health_status["timing"] = timing_model.describe()
     
     return health_status
 
+def _apply_copy_metrics(response: CopyActivityResponse, copy_result):
+    """実データコピーの転送量・スループットをレスポンスへ設定"""
+    if copy_result:
+        response.bytes_copied = copy_result.bytes_copied
+        response.batches = copy_result.batches
+        response.duration_seconds = round(copy_result.duration_seconds, 3)
+        response.rows_per_second = round(copy_result.rows_per_second, 2)
+        response.bytes_per_second = round(copy_result.bytes_per_second, 2)
+        response.sink_target = copy_result.sink_target
+
+async def _run_copy(request: CopyActivityRequest):
+    """コピー本体（実データコピーの結果、シミュレーションならNoneを返す）"""
+    if has_copy_source(request.source):
+        # 実データのストリーミングコピー
+        return await run_blocking(copy_engine.run, request.source, request.sink, request.batch_size)
+    # データ転送のシミュレーション（処理時間はタイミングモデルで決定）
+    await asyncio.sleep(timing_model.copy_duration(request.pipeline_name, request.activity_name))
+    return None
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """Prometheusテキスト形式のメトリクス"""
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 @app.post("/copy-activity", response_model=CopyActivityResponse)
 async def execute_copy_activity(request: CopyActivityRequest):
-    """Copy Activity の実行をシミュレート"""
+    """Copy Activity の実行
+
+    sourceにクエリ（query / sqlReaderQuery）またはテーブル（table_name）が指定されていれば
+    実データをバッチ単位でsinkテーブル/Blobへコピーし、無ければ従来のシミュレーションを行う
+    """
     execution_id = request.execution_id or str(uuid.uuid4())
     start_time = datetime.now()
     
@@ -135,48 +632,14 @@ async def execute_copy_activity(request: CopyActivityRequest):
     
     try:
         # ETLログの記録
-        conn = get_sql_connection()
-        if conn:
-            cursor = conn.cursor()
-            
-            cursor.execute("""
-                INSERT INTO [dbo].[pipeline_execution_log] 
-                (pipeline_name, execution_start, status, records_processed)
-                VALUES (?, ?, ?, ?)
-            """, request.pipeline_name, start_time, "RUNNING", 0)
-            conn.commit()
-        else:
-            logger.warning("SQL connection not available - skipping database logging")
+        sql_available = await run_blocking(_log_copy_activity_start, request.pipeline_name, start_time)
         
-        # データ転送のシミュレーション
-        await asyncio.sleep(2)  # 処理時間をシミュレート
+        copy_result = await _run_copy(request)
         
-        # 成功ケースでのrows_copiedの計算
-        rows_copied = 0
-        if conn and "client_dm" in request.pipeline_name.lower():
-            cursor.execute("SELECT COUNT(*) FROM [dbo].[client_dm]")
-            rows_copied = cursor.fetchone()[0]
-        elif conn and "clientdmbx" in request.pipeline_name.lower():
-            cursor.execute("SELECT COUNT(*) FROM [dbo].[ClientDmBx]")
-            rows_copied = cursor.fetchone()[0]
-        elif conn and "point_grant" in request.pipeline_name.lower():
-            cursor.execute("SELECT COUNT(*) FROM [dbo].[point_grant_email]")
-            rows_copied = cursor.fetchone()[0]
-        else:
-            # SQL接続が無い場合はダミー値を返す
-            rows_copied = 100
-        
-        end_time = datetime.now()
-        
-        # ログの更新
-        if conn:
-            cursor.execute("""
-                UPDATE [dbo].[pipeline_execution_log] 
-                SET execution_end = ?, status = ?, records_processed = ?
-                WHERE pipeline_name = ? AND execution_start = ?
-            """, end_time, "SUCCESS", rows_copied, request.pipeline_name, start_time)
-            conn.commit()
-            conn.close()
+        rows_copied, end_time = await run_blocking(
+            _complete_copy_activity, request.pipeline_name, start_time, sql_available,
+            copy_result.rows_copied if copy_result else None
+        )
         
         response = CopyActivityResponse(
             execution_id=execution_id,
@@ -185,28 +648,27 @@ async def execute_copy_activity(request: CopyActivityRequest):
             start_time=start_time.isoformat(),
             end_time=end_time.isoformat()
         )
+        _apply_copy_metrics(response, copy_result)
+        _record_copy_metrics(request.pipeline_name, "SUCCESS",
+                             (end_time - start_time).total_seconds(), rows_copied, copy_result)
         
         # 実行状態を保存
-        execution_status[execution_id] = response.dict()
+        await run_shared_state(execution_store.put, {**response.dict(), "pipeline_name": request.pipeline_name,
+                                                     "activity_name": request.activity_name})
         
         logger.info(f"Copy activity completed successfully: {execution_id}")
         return response
         
+    except SQLPoolTimeoutError:
+        raise
     except Exception as e:
         error_message = str(e)
         logger.error(f"Copy activity failed: {error_message}")
         
         # エラーログの記録
-        try:
-            cursor.execute("""
-                UPDATE [dbo].[pipeline_execution_log] 
-                SET execution_end = ?, status = ?, error_message = ?
-                WHERE pipeline_name = ? AND execution_start = ?
-            """, datetime.now(), "FAILED", error_message, request.pipeline_name, start_time)
-            conn.commit()
-            conn.close()
-        except:
-            pass
+        await run_blocking(_log_copy_activity_failure, request.pipeline_name, start_time, error_message)
+        _record_copy_metrics(request.pipeline_name, "FAILED",
+                             (datetime.now() - start_time).total_seconds(), 0, None)
         
         response = CopyActivityResponse(
             execution_id=execution_id,
@@ -216,132 +678,390 @@ async def execute_copy_activity(request: CopyActivityRequest):
             error_message=error_message
         )
         
-        execution_status[execution_id] = response.dict()
+        await run_shared_state(execution_store.put, {**response.dict(), "pipeline_name": request.pipeline_name,
+                                                     "activity_name": request.activity_name})
         return response
 
-@app.post("/pipeline-execution", response_model=PipelineExecutionResponse)
-async def execute_pipeline(request: PipelineExecutionRequest):
-    """パイプライン実行をシミュレート"""
-    execution_id = request.execution_id or str(uuid.uuid4())
+@app.post("/copy-activity/batch", response_model=CopyActivityBatchResponse)
+async def execute_copy_activity_batch(request: CopyActivityBatchRequest):
+    """複数のCopy Activityを同時実行数を制限して実行
+
+    ETLログは全件の完了後に1回の一括INSERTで記録し、結果はリクエストの順序で返す
+    """
+    if len(request.activities) > COPY_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"Too many activities in batch (max {COPY_BATCH_MAX_ITEMS})"
+        )
+    concurrency = max(1, min(request.max_concurrency or COPY_BATCH_MAX_CONCURRENCY, COPY_BATCH_MAX_CONCURRENCY))
+    semaphore = asyncio.Semaphore(concurrency)
+    batch_start = datetime.now()
+    logger.info(f"Starting copy activity batch: {len(request.activities)} activities, concurrency={concurrency}")
+
+    async def run_item(item: CopyActivityRequest) -> Dict[str, Any]:
+        async with semaphore:
+            outcome = {
+                "request": item,
+                "execution_id": item.execution_id or str(uuid.uuid4()),
+                "start_time": datetime.now(),
+                "copy_result": None,
+                "rows_copied": None,
+                "error_message": None,
+            }
+            try:
+                outcome["copy_result"] = await _run_copy(item)
+                if outcome["copy_result"]:
+                    outcome["rows_copied"] = outcome["copy_result"].rows_copied
+                outcome["status"] = "SUCCESS"
+            except Exception as e:
+                logger.error(f"Copy activity {item.activity_name} in batch failed: {e}")
+                outcome["status"] = "FAILED"
+                outcome["rows_copied"] = 0
+                outcome["error_message"] = str(e)
+            outcome["end_time"] = datetime.now()
+            return outcome
+
+    outcomes = await asyncio.gather(*(run_item(item) for item in request.activities))
+    await run_blocking(_log_copy_activity_batch, outcomes)
+
+    results = []
+    for outcome in outcomes:
+        item = outcome["request"]
+        succeeded = outcome["status"] == "SUCCESS"
+        response = CopyActivityResponse(
+            execution_id=outcome["execution_id"],
+            status=outcome["status"],
+            rows_copied=outcome["rows_copied"] or 0,
+            start_time=outcome["start_time"].isoformat(),
+            end_time=outcome["end_time"].isoformat() if succeeded else None,
+            error_message=outcome["error_message"]
+        )
+        _apply_copy_metrics(response, outcome["copy_result"])
+        _record_copy_metrics(item.pipeline_name, outcome["status"],
+                             (outcome["end_time"] - outcome["start_time"]).total_seconds(),
+                             response.rows_copied, outcome["copy_result"])
+        await run_shared_state(execution_store.put, {**response.dict(), "pipeline_name": item.pipeline_name,
+                                                     "activity_name": item.activity_name})
+        results.append(response)
+
+    failed = sum(1 for r in results if r.status != "SUCCESS")
+    return CopyActivityBatchResponse(
+        results=results,
+        total=len(results),
+        succeeded=len(results) - failed,
+        failed=failed,
+        duration_seconds=round((datetime.now() - batch_start).total_seconds(), 3),
+    )
+
+def _resolve_pipeline_activities(pipeline_name: str) -> List[str]:
+    """パイプライン定義が無い場合・fixedモードの活動一覧（パイプライン名から推定）"""
+    if "client_dm" in pipeline_name.lower():
+        return ["CopyActivity", "DataTransformation", "Validation"]
+    elif "point_grant" in pipeline_name.lower():
+        return ["DataExtraction", "EmailPreparation", "EmailSending"]
+    return ["DefaultActivity"]
+
+async def _run_pipeline_graph(execution_id: str, request: PipelineExecutionRequest, graph) -> bool:
+    """パイプライン定義のアクティビティを依存順に実行（独立した分岐は並行実行）、成功したかを返す
+
+    IfConditionの分岐はparameters.if_conditions（{アクティビティ名: bool}）で指定でき、既定はifTrueActivities。
+    parameters.fail_activities（アクティビティ名のリスト）に含まれるアクティビティは失敗させる
+    """
+    if_conditions = (request.parameters or {}).get("if_conditions") or {}
+    fail_activities = set((request.parameters or {}).get("fail_activities") or [])
+    running: List[str] = []
+
+    async def run_activity(node):
+        running.append(node.name)
+        await run_shared_state(execution_store.update, execution_id,
+                               current_activity=node.name, activities_running=list(running))
+        try:
+            if node.type == "Copy":
+                duration = timing_model.copy_duration(request.pipeline_name, node.name)
+            else:
+                duration = timing_model.activity_duration(request.pipeline_name, node.name, node.type)
+            await asyncio.sleep(duration)
+            if node.name in fail_activities:
+                raise RuntimeError(f"Activity {node.name} failed (parameters.fail_activities)")
+        except Exception:
+            running.remove(node.name)
+            await run_shared_state(execution_store.update, execution_id, activities_running=list(running))
+            await run_shared_state(execution_store.append, execution_id, "activities_failed", node.name)
+            raise
+        running.remove(node.name)
+        await run_shared_state(execution_store.update, execution_id, activities_running=list(running))
+        await run_shared_state(execution_store.append, execution_id, "activities_executed", node.name)
+        logger.info(f"Executed activity: {node.name} ({node.type})")
+
+    async def on_skipped(node):
+        await run_shared_state(execution_store.append, execution_id, "activities_skipped", node.name)
+
+    outcomes = await run_activity_graph(
+        graph,
+        run_activity,
+        on_skipped=on_skipped,
+        choose_branch=lambda node: bool(if_conditions.get(node.name, True)),
+    )
+    return FAILED not in outcomes.values()
+
+async def _run_pipeline(execution_id: str, request: PipelineExecutionRequest) -> Dict[str, Any]:
+    """パイプラインの各活動を実行し、進捗をexecution_storeへ反映"""
     start_time = datetime.now()
+    # リース切れで再投入されたジョブは前回の試行の進捗を持つため、開始時にリセットする
+    await run_shared_state(
+        execution_store.update,
+        execution_id,
+        status="RUNNING",
+        start_time=start_time.isoformat(),
+        end_time=None,
+        error_message=None,
+        current_activity=None,
+        activities_executed=[],
+        activities_running=[],
+        activities_skipped=[],
+        activities_failed=[],
+    )
     
     logger.info(f"Starting pipeline execution: {request.pipeline_name}")
     
     try:
-        # パイプライン別の活動をシミュレート
-        activities_executed = []
-        
-        if "client_dm" in request.pipeline_name.lower():
-            activities_executed = ["CopyActivity", "DataTransformation", "Validation"]
-        elif "point_grant" in request.pipeline_name.lower():
-            activities_executed = ["DataExtraction", "EmailPreparation", "EmailSending"]
-        else:
-            activities_executed = ["DefaultActivity"]
+        # fixedモードは従来互換のため、定義があってもパイプライン名から推定した活動を実行する
+        graph = pipeline_graphs.get(request.pipeline_name) if timing_model.uses_pipeline_definitions else None
+        await run_shared_state(
+            execution_store.update,
+            execution_id,
+            activities_total=graph.count() if graph else len(_resolve_pipeline_activities(request.pipeline_name)),
+        )
         
-        # 各活動の実行をシミュレート
-        for activity in activities_executed:
-            await asyncio.sleep(1)  # 活動実行時間をシミュレート
-            logger.info(f"Executed activity: {activity}")
+        # パイプライン起動オーバーヘッド（realisticモードのみ）
+        await asyncio.sleep(timing_model.pipeline_overhead(request.pipeline_name))
         
-        end_time = datetime.now()
+        succeeded = True
+        if graph is not None:
+            succeeded = await _run_pipeline_graph(execution_id, request, graph)
+        else:
+            # 定義の無いパイプラインは推定した活動を順に実行
+            for activity in _resolve_pipeline_activities(request.pipeline_name):
+                await run_shared_state(execution_store.update, execution_id, current_activity=activity)
+                await asyncio.sleep(timing_model.activity_duration(request.pipeline_name, activity))
+                await run_shared_state(execution_store.append, execution_id, "activities_executed", activity)
+                logger.info(f"Executed activity: {activity}")
         
-        response = PipelineExecutionResponse(
-            execution_id=execution_id,
-            pipeline_name=request.pipeline_name,
-            status="SUCCESS",
-            start_time=start_time.isoformat(),
-            end_time=end_time.isoformat(),
-            activities_executed=activities_executed
+        state = await run_shared_state(
+            execution_store.update,
+            execution_id,
+            status="SUCCESS" if succeeded else "FAILED",
+            end_time=datetime.now().isoformat(),
+            current_activity=None,
         )
         
-        execution_status[execution_id] = response.dict()
-        
         logger.info(f"Pipeline execution completed successfully: {execution_id}")
-        return response
         
     except Exception as e:
         error_message = str(e)
         logger.error(f"Pipeline execution failed: {error_message}")
         
-        response = PipelineExecutionResponse(
-            execution_id=execution_id,
-            pipeline_name=request.pipeline_name,
+        state = await run_shared_state(
+            execution_store.update,
+            execution_id,
             status="FAILED",
-            start_time=start_time.isoformat(),
-            activities_executed=activities_executed if 'activities_executed' in locals() else [],
-            error_message=error_message
+            end_time=datetime.now().isoformat(),
+            error_message=error_message,
         )
-        
-        execution_status[execution_id] = response.dict()
-        return response
+    
+    pipeline_duration.observe((datetime.now() - start_time).total_seconds(),
+                              pipeline=request.pipeline_name, status=state["status"])
+    return state
+
+async def _run_pipeline_job(execution_id: str, payload: Dict[str, Any]) -> Dict[str, Any]:
+    """ジョブキューのハンドラー（共有モードでは他ワーカーが投入したジョブも実行する）"""
+    return await _run_pipeline(execution_id, PipelineExecutionRequest(**payload))
+
+@app.post("/pipeline-execution", response_model=PipelineExecutionResponse)
+async def execute_pipeline(
+    request: PipelineExecutionRequest,
+    response: Response,
+    wait: bool = Query(False, description="Trueの場合はパイプラインの完了まで待機して最終状態を返す"),
+):
+    """パイプライン実行をシミュレート
+
+    実行はジョブキューのワーカーで行われる。既定では202とQUEUED状態（実行ID）を即座に返し、
+    進捗は/execution-status/{id}で取得する。wait=trueの場合は完了まで待機する。
+    同じexecution_idの実行が既に存在する場合は409を返す
+    """
+    execution_id = request.execution_id or str(uuid.uuid4())
+    submitted_at = datetime.now().isoformat()
+    
+    queued = PipelineExecutionResponse(
+        execution_id=execution_id,
+        pipeline_name=request.pipeline_name,
+        status="QUEUED",
+        start_time=submitted_at,
+        submitted_at=submitted_at,
+    ).dict()
+    if not await run_shared_state(execution_store.add, queued):
+        raise HTTPException(status_code=409, detail=f"Execution {execution_id} already exists")
+    
+    try:
+        future = await pipeline_queue.submit(execution_id, request.dict())
+    except asyncio.QueueFull:
+        await run_shared_state(execution_store.delete, execution_id)
+        raise HTTPException(status_code=429, detail="Pipeline queue is full")
+    except DuplicateJobError:
+        # 実行履歴からは破棄済みだが、ジョブテーブルに同じIDのジョブが残っている
+        await run_shared_state(execution_store.delete, execution_id)
+        raise HTTPException(status_code=409, detail=f"Execution {execution_id} already exists")
+    
+    if wait:
+        return await future
+    
+    response.status_code = 202
+    return queued
 
 @app.get("/execution-status/{execution_id}")
 async def get_execution_status(execution_id: str):
     """実行状態の取得"""
-    if execution_id in execution_status:
-        return execution_status[execution_id]
+    record = await run_shared_state(execution_store.get, execution_id)
+    if record is not None:
+        return record
     else:
         raise HTTPException(status_code=404, detail="Execution not found")
 
 @app.get("/executions")
-async def list_executions():
-    """全実行履歴の取得"""
-    return {"executions": list(execution_status.values())}
+async def list_executions(
+    pipeline_name: Optional[str] = None,
+    status: Optional[str] = None,
+    since: Optional[str] = Query(None, description="開始時刻の下限（ISO 8601）"),
+    until: Optional[str] = Query(None, description="開始時刻の上限（ISO 8601）"),
+    limit: int = Query(100, ge=1, le=1000),
+    offset: int = Query(0, ge=0),
+):
+    """実行履歴の取得（開始時刻の降順、フィルタ・ページング対応）"""
+    try:
+        executions, total = await run_shared_state(execution_store.query, 
+            pipeline_name=pipeline_name,
+            status=status,
+            since=since,
+            until=until,
+            limit=limit,
+            offset=offset,
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    return {
+        "executions": executions,
+        "total": total,
+        "limit": limit,
+        "offset": offset,
+    }
+
+def _plan_upload(block_size: int, concurrency: int, expected_size: Optional[int]):
+    """ブロックサイズ・同時ステージ数を決定（バッファ上限・ブロック数上限に収まらなければ422）"""
+    try:
+        return plan_block_size(block_size, concurrency, UPLOAD_MAX_BUFFER_BYTES, expected_size, UPLOAD_MAX_BLOCK_SIZE)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+async def _stream_upload(container_name: str, blob_name: str, chunks,
+                         upload_id: Optional[str], block_size: int, concurrency: int) -> Dict[str, Any]:
+    """チャンク列をブロック単位でAzuriteへ並列アップロードし、進捗を記録"""
+    upload_id = upload_id or new_upload_id()
+    progress = upload_progress.start(upload_id, container_name, blob_name)
+    try:
+        blob_client_instance = await run_blocking(_get_upload_blob_client, container_name, blob_name)
+        uploader = BlockBlobStreamUploader(
+            blob_client_instance,
+            run_azurite,
+            block_size=block_size,
+            max_concurrency=concurrency,
+            progress=progress,
+        )
+        result = await uploader.upload(chunks)
+        progress["status"] = "SUCCESS"
+    except Exception as e:
+        progress["status"] = "FAILED"
+        progress["error_message"] = str(e)
+        raise
+    finally:
+        progress["finished_at"] = datetime.now().timestamp()
+
+    return {
+        "message": "File uploaded successfully",
+        "upload_id": upload_id,
+        "container": container_name,
+        "blob_name": blob_name,
+        **result,
+    }
 
 @app.post("/upload-test-data")
-async def upload_test_data(file: UploadFile = File(...)):
-    """テストデータのアップロード"""
+async def upload_test_data(
+    file: UploadFile = File(...),
+    upload_id: Optional[str] = None,
+    block_size: int = Query(UPLOAD_BLOCK_SIZE, ge=1, le=UPLOAD_MAX_BLOCK_SIZE),
+    concurrency: int = Query(UPLOAD_MAX_CONCURRENCY, ge=1, le=64),
+):
+    """テストデータのアップロード（ファイル全体を読み込まず、ブロック単位で転送）
+
+    multipart/form-dataのボディはハンドラー実行前にStarletteが一時ファイルへ全て受信するため、
+    Azuriteへの転送が始まるのは受信完了後になる。大容量ファイルは PUT /upload-test-data/stream を使用する
+    """
+    block_size, concurrency = _plan_upload(block_size, concurrency, getattr(file, "size", None))
     try:
         # Azuriteにファイルをアップロード
-        blob_client = get_azurite_client()
-        
-        # コンテナが存在しない場合は作成
         container_name = "test-data"
-        try:
-            blob_client.create_container(container_name)
-        except:
-            pass  # コンテナが既に存在する場合
-        
-        # ファイルをアップロード
         blob_name = f"uploaded/{file.filename}"
-        blob_client_instance = blob_client.get_blob_client(
-            container=container_name, 
-            blob=blob_name
-        )
-        
-        content = await file.read()
-        blob_client_instance.upload_blob(content, overwrite=True)
         
-        return {
-            "message": "File uploaded successfully",
-            "container": container_name,
-            "blob_name": blob_name,
-            "size": len(content)
-        }
+        return await _stream_upload(
+            container_name, blob_name, iter_upload_file(file, block_size),
+            upload_id, block_size, concurrency,
+        )
         
     except Exception as e:
         logger.error(f"File upload failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
 
+@app.put("/upload-test-data/stream/{blob_name:path}")
+async def upload_test_data_stream(
+    blob_name: str,
+    request: Request,
+    container: str = "test-data",
+    upload_id: Optional[str] = None,
+    block_size: int = Query(UPLOAD_BLOCK_SIZE, ge=1, le=UPLOAD_MAX_BLOCK_SIZE),
+    concurrency: int = Query(UPLOAD_MAX_CONCURRENCY, ge=1, le=64),
+):
+    """リクエストボディをそのままBlobへストリーミング（multipartを経由しない大容量向け）
+
+    Content-Lengthが指定されていれば、ブロック数の上限に収まるようブロックサイズを拡大する
+    """
+    content_length = request.headers.get("content-length")
+    expected_size = int(content_length) if content_length and content_length.isdigit() else None
+    block_size, concurrency = _plan_upload(block_size, concurrency, expected_size)
+    try:
+        return await _stream_upload(
+            container, blob_name, request.stream(), upload_id, block_size, concurrency,
+        )
+    except Exception as e:
+        logger.error(f"Streaming upload failed: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Upload failed: {str(e)}")
+
+@app.get("/upload-progress/{upload_id}")
+async def get_upload_progress(upload_id: str):
+    """アップロードの進捗（受信・転送済みバイト数、ブロック数）
+
+    進捗はワーカープロセス毎に保持するため、SIMULATOR_WORKERS > 1 では
+    アップロードを処理したワーカー以外に振り分けられた場合に404となる
+    """
+    progress = upload_progress.get(upload_id)
+    if progress is None:
+        raise HTTPException(status_code=404, detail="Upload not found")
+    return progress
+
 @app.get("/test-database-status")
 async def get_database_status():
     """テストデータベースの状態確認"""
     try:
-        conn = get_sql_connection()
-        cursor = conn.cursor()
-        
         # データサマリーの取得
-        cursor.execute("SELECT * FROM [dbo].[v_test_data_summary]")
-        data_summary = [
-            {
-                "table_name": row[0],
-                "record_count": row[1],
-                "last_updated": row[2].isoformat() if row[2] else None
-            }
-            for row in cursor.fetchall()
-        ]
-        
-        conn.close()
+        data_summary = await run_blocking(_fetch_test_data_summary)
         
         return {
             "status": "connected",
@@ -349,10 +1069,16 @@ async def get_database_status():
             "data_summary": data_summary
         }
         
+    except SQLPoolTimeoutError:
+        raise
     except Exception as e:
         logger.error(f"Database status check failed: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8080)
+    if SIMULATOR_WORKERS > 1:
+        # ワーカープロセス毎にアプリを読み込むためインポート文字列で指定
+        uvicorn.run("main:app", host="0.0.0.0", port=8080, workers=SIMULATOR_WORKERS)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=8080)
@@ -0,0 +1,184 @@
+"""
+IR Simulator用 パイプライン定義のアクティビティグラフ
+src/dev/pipeline/*.json を起動時に解析し、dependsOn に従った依存グラフとして実行する
+（依存関係の無いアクティビティは並行実行）
+
+依存条件（Succeeded / Failed / Skipped / Completed）はADFと同じく、いずれかの依存先が
+条件を満たさなければそのアクティビティはSkippedとなる
+"""
+
+import asyncio
+import glob
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SUCCEEDED = "Succeeded"
+FAILED = "Failed"
+SKIPPED = "Skipped"
+
+# 入れ子のアクティビティを持つコンテナ型（ForEach/Untilは1回分の反復として実行）
+CONTAINER_TYPES = ("ForEach", "Until")
+
+
+@dataclass
+class ActivityNode:
+    name: str
+    type: str
+    depends_on: List[Tuple[str, Tuple[str, ...]]] = field(default_factory=list)
+    # Copyのスループット算出に使う定義値（dataIntegrationUnits / parallelCopies）
+    diu: Optional[float] = None
+    parallel_copies: Optional[float] = None
+    if_true: Optional["ActivityGraph"] = None
+    if_false: Optional["ActivityGraph"] = None
+    inner: Optional["ActivityGraph"] = None
+
+
+class ActivityGraph:
+    """1階層分のアクティビティと依存関係（トポロジカル順序を事前計算）"""
+
+    def __init__(self, nodes: List[ActivityNode]):
+        self.nodes: Dict[str, ActivityNode] = {node.name: node for node in nodes}
+        for node in nodes:
+            for dependency, _ in node.depends_on:
+                if dependency not in self.nodes:
+                    raise ValueError(f"Activity '{node.name}' depends on unknown activity '{dependency}'")
+        self.order: List[str] = self._topological_order()
+
+    @classmethod
+    def from_activities(cls, activities: List[Dict[str, Any]]) -> "ActivityGraph":
+        nodes = []
+        for activity in activities or []:
+            props = activity.get("typeProperties", {}) or {}
+            node = ActivityNode(
+                name=activity["name"],
+                type=activity.get("type", "default"),
+                depends_on=[
+                    (d["activity"], tuple(d.get("dependencyConditions") or [SUCCEEDED]))
+                    for d in activity.get("dependsOn", []) or []
+                ],
+                diu=props.get("dataIntegrationUnits"),
+                parallel_copies=props.get("parallelCopies"),
+            )
+            if node.type == "IfCondition":
+                node.if_true = cls.from_activities(props.get("ifTrueActivities"))
+                node.if_false = cls.from_activities(props.get("ifFalseActivities"))
+            elif node.type in CONTAINER_TYPES:
+                node.inner = cls.from_activities(props.get("activities"))
+            nodes.append(node)
+        return cls(nodes)
+
+    def count(self) -> int:
+        """入れ子を含むアクティビティ数"""
+        return sum(1 for _ in self.iter_nodes())
+
+    def iter_nodes(self) -> Iterator[ActivityNode]:
+        """入れ子を含む全アクティビティを返す"""
+        for node in self.nodes.values():
+            yield node
+            for child in (node.if_true, node.if_false, node.inner):
+                if child is not None:
+                    yield from child.iter_nodes()
+
+    def _topological_order(self) -> List[str]:
+        remaining = {name: {d for d, _ in node.depends_on} for name, node in self.nodes.items()}
+        order = []
+        ready = [name for name, deps in remaining.items() if not deps]
+        while ready:
+            name = ready.pop(0)
+            order.append(name)
+            for other, deps in remaining.items():
+                if name in deps:
+                    deps.discard(name)
+                    if not deps and other not in order and other not in ready:
+                        ready.append(other)
+        if len(order) != len(self.nodes):
+            cyclic = sorted(set(self.nodes) - set(order))
+            raise ValueError(f"Dependency cycle between activities: {cyclic}")
+        return order
+
+
+def load_pipeline_graphs(pipeline_dir: str) -> Dict[str, ActivityGraph]:
+    """パイプライン定義ディレクトリを解析して {パイプライン名: ActivityGraph} を返す"""
+    graphs: Dict[str, ActivityGraph] = {}
+    if not pipeline_dir or not os.path.isdir(pipeline_dir):
+        return graphs
+    for path in sorted(glob.glob(os.path.join(pipeline_dir, "*.json"))):
+        try:
+            with open(path, encoding="utf-8") as f:
+                definition = json.load(f)
+            name = definition.get("name") or os.path.splitext(os.path.basename(path))[0]
+            graphs[name] = ActivityGraph.from_activities(definition.get("properties", {}).get("activities"))
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Skipping pipeline definition {path}: {e}")
+    logger.info(f"Loaded {len(graphs)} pipeline activity graphs from {pipeline_dir}")
+    return graphs
+
+
+def _dependency_met(outcome: str, conditions: Tuple[str, ...]) -> bool:
+    if outcome in conditions:
+        return True
+    return "Completed" in conditions and outcome in (SUCCEEDED, FAILED)
+
+
+async def run_activity_graph(
+    graph: ActivityGraph,
+    run_activity: Callable[[ActivityNode], Awaitable[None]],
+    on_skipped: Optional[Callable[[ActivityNode], Awaitable[None]]] = None,
+    choose_branch: Optional[Callable[[ActivityNode], bool]] = None,
+) -> Dict[str, str]:
+    """グラフを依存順に実行し、{アクティビティ名: Succeeded/Failed/Skipped} を返す
+
+    run_activity   - アクティビティ1件の実行（例外で失敗扱い）
+    on_skipped     - スキップしたアクティビティの通知（例外は全アクティビティの完了後に送出）
+    choose_branch  - IfConditionの分岐（未指定時はifTrueActivities）
+    """
+    loop = asyncio.get_running_loop()
+    done: Dict[str, asyncio.Future] = {name: loop.create_future() for name in graph.nodes}
+    outcomes: Dict[str, str] = {}
+
+    async def execute(node: ActivityNode):
+        outcome = FAILED
+        try:
+            for dependency, conditions in node.depends_on:
+                if not _dependency_met(await done[dependency], conditions):
+                    outcome = SKIPPED
+                    break
+            else:
+                try:
+                    await run_activity(node)
+                    branch = None
+                    if node.type == "IfCondition":
+                        take_true = choose_branch(node) if choose_branch else True
+                        branch = node.if_true if take_true else node.if_false
+                    elif node.inner is not None:
+                        branch = node.inner
+                    outcome = SUCCEEDED
+                    if branch is not None:
+                        inner = await run_activity_graph(branch, run_activity, on_skipped, choose_branch)
+                        outcomes.update(inner)
+                        if FAILED in inner.values():
+                            outcome = FAILED
+                except Exception as e:
+                    logger.warning(f"Activity {node.name} failed: {e}")
+                    outcome = FAILED
+        finally:
+            # 後続のアクティビティが待ち続けないよう、on_skippedの呼び出しより先に結果を確定する
+            outcomes[node.name] = outcome
+            if not done[node.name].done():
+                done[node.name].set_result(outcome)
+        if outcome == SKIPPED and on_skipped is not None:
+            await on_skipped(node)
+
+    # on_skippedの例外は全アクティビティの完了を待ってから送出する（実行中のアクティビティを残さない）
+    results = await asyncio.gather(
+        *(execute(graph.nodes[name]) for name in graph.order), return_exceptions=True
+    )
+    for result in results:
+        if isinstance(result, BaseException):
+            raise result
+    return outcomes
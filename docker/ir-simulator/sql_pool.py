@@ -0,0 +1,340 @@
+"""
+IR Simulator用 SQL Server コネクションプール
+スレッドセーフな上限付きプール（ヘルスチェック・アイドル接続の破棄・メトリクス付き）
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Deque, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class SQLPoolTimeoutError(Exception):
+    """プールから接続を取得できずにタイムアウトした場合の例外"""
+    pass
+
+
+class SQLConnectionPool:
+    """上限付きのSQL Server接続プール
+
+    - acquire()/release() による接続の貸し出し・返却（connection()はコンテキストマネージャ版）
+    - 一定時間使われていない接続は再利用前に `SELECT 1` で疎通確認
+    - max_idle_seconds を超えてアイドル状態の接続は破棄
+    - prefill() で min_size 本の接続を事前に作成（初回の同時リクエストで接続待ちを発生させない）
+    - stats() でプールのメトリクスを返却
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        max_size: int = 20,
+        min_size: int = 0,
+        acquire_timeout: float = 10.0,
+        max_idle_seconds: float = 300.0,
+        health_check_interval: float = 30.0,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be >= 1")
+        if min_size < 0 or min_size > max_size:
+            raise ValueError("min_size must be between 0 and max_size")
+
+        self._connect = connect
+        self.max_size = max_size
+        self.min_size = min_size
+        self.acquire_timeout = acquire_timeout
+        self.max_idle_seconds = max_idle_seconds
+        self.health_check_interval = health_check_interval
+
+        self._cond = threading.Condition(threading.Lock())
+        # (接続, 最終利用時刻) - 右端が最も新しい（LIFOで再利用し、古い接続を自然に失効させる）
+        self._idle: Deque[Tuple[Any, float]] = deque()
+        self._size = 0
+        self._in_use = 0
+        self._closed = False
+
+        self._reaper: Optional[threading.Thread] = None
+        self._reaper_stop = threading.Event()
+
+        self._metrics = {
+            "connections_created": 0,
+            "connections_closed": 0,
+            "connections_evicted": 0,
+            "checkouts": 0,
+            "pool_hits": 0,
+            "pool_misses": 0,
+            "health_check_failures": 0,
+            "connect_failures": 0,
+            "acquire_timeouts": 0,
+            "waits": 0,
+            "total_wait_seconds": 0.0,
+        }
+
+    # ------------------------------------------------------------------
+    # 貸し出し・返却
+    # ------------------------------------------------------------------
+
+    def acquire(self, timeout: Optional[float] = None) -> Any:
+        """プールから接続を取得（空きが無い場合は上限までは新規作成、上限到達時は待機）"""
+        timeout = self.acquire_timeout if timeout is None else timeout
+        deadline = time.monotonic() + timeout
+        waited = False
+
+        while True:
+            wait_start = time.monotonic()
+            conn = None
+            last_used = 0.0
+            create = False
+
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError("SQL connection pool is closed")
+
+                expired = self._evict_expired_locked()
+
+                while not self._idle and self._size >= self.max_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._metrics["acquire_timeouts"] += 1
+                        raise SQLPoolTimeoutError(
+                            f"Timed out after {timeout}s waiting for a SQL connection "
+                            f"(max_size={self.max_size})"
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+                    if self._closed:
+                        raise RuntimeError("SQL connection pool is closed")
+
+                if waited:
+                    self._metrics["waits"] += 1
+                    self._metrics["total_wait_seconds"] += time.monotonic() - wait_start
+                    waited = False
+
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                else:
+                    # 枠だけ先に確保し、接続自体はロック外で作成する
+                    self._size += 1
+                    create = True
+                self._in_use += 1
+
+            for stale in expired:
+                self._close_quietly(stale)
+
+            if create:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._in_use -= 1
+                        self._metrics["connect_failures"] += 1
+                        self._cond.notify()
+                    raise
+                with self._cond:
+                    self._metrics["connections_created"] += 1
+                    self._metrics["pool_misses"] += 1
+                    self._metrics["checkouts"] += 1
+                return conn
+
+            # 一定時間アイドルだった接続は疎通確認してから貸し出す
+            if time.monotonic() - last_used >= self.health_check_interval and not self._is_healthy(conn):
+                with self._cond:
+                    self._metrics["health_check_failures"] += 1
+                self._discard(conn)
+                continue
+
+            with self._cond:
+                self._metrics["pool_hits"] += 1
+                self._metrics["checkouts"] += 1
+            return conn
+
+    def release(self, conn: Any, discard: bool = False):
+        """接続をプールへ返却（discard=True、またはロールバックに失敗した場合は破棄）"""
+        if conn is None:
+            return
+
+        if not discard:
+            try:
+                # 未コミットのトランザクションを次の利用者に持ち越さない
+                conn.rollback()
+            except Exception as e:
+                logger.warning(f"Discarding SQL connection that failed to reset: {e}")
+                discard = True
+
+        if discard:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            self._in_use -= 1
+            if self._closed:
+                self._size -= 1
+                self._metrics["connections_closed"] += 1
+                close_now = True
+            else:
+                self._idle.append((conn, time.monotonic()))
+                close_now = False
+            self._cond.notify()
+
+        if close_now:
+            self._close_quietly(conn)
+
+    @contextmanager
+    def connection(self, timeout: Optional[float] = None):
+        """with文で接続を借用（例外発生時もプールへ返却）"""
+        conn = self.acquire(timeout)
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    # ------------------------------------------------------------------
+    # 保守
+    # ------------------------------------------------------------------
+
+    def prefill(self) -> int:
+        """min_sizeまで接続を事前に作成してアイドル接続として保持し、作成した数を返す
+
+        接続に失敗した場合はそこで打ち切る（残りは通常どおり貸し出し時に作成される）
+        """
+        created = 0
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return created
+                self._size += 1
+
+            try:
+                conn = self._connect()
+            except Exception as e:
+                with self._cond:
+                    self._size -= 1
+                    self._metrics["connect_failures"] += 1
+                    self._cond.notify()
+                logger.warning(f"Failed to pre-open SQL connection ({created}/{self.min_size} opened): {e}")
+                return created
+
+            with self._cond:
+                self._metrics["connections_created"] += 1
+                if self._closed:
+                    self._size -= 1
+                    self._metrics["connections_closed"] += 1
+                    close_now = True
+                else:
+                    self._idle.append((conn, time.monotonic()))
+                    close_now = False
+                self._cond.notify()
+            if close_now:
+                self._close_quietly(conn)
+                return created
+            created += 1
+
+    def evict_idle(self) -> int:
+        """max_idle_secondsを超えたアイドル接続を破棄し、破棄した数を返す"""
+        with self._cond:
+            expired = self._evict_expired_locked()
+        for conn in expired:
+            self._close_quietly(conn)
+        return len(expired)
+
+    def start_reaper(self, interval: float = 30.0):
+        """アイドル接続を定期的に破棄するデーモンスレッドを開始"""
+        if self._reaper is not None:
+            return
+
+        def _run():
+            while not self._reaper_stop.wait(interval):
+                try:
+                    evicted = self.evict_idle()
+                    if evicted:
+                        logger.info(f"Evicted {evicted} idle SQL connections")
+                except Exception as e:
+                    logger.warning(f"SQL pool reaper failed: {e}")
+
+        self._reaper_stop.clear()
+        self._reaper = threading.Thread(target=_run, name="sql-pool-reaper", daemon=True)
+        self._reaper.start()
+
+    def close_all(self):
+        """全てのアイドル接続を閉じ、以降の貸し出しを停止"""
+        self._reaper_stop.set()
+        with self._cond:
+            self._closed = True
+            idle = [conn for conn, _ in self._idle]
+            self._idle.clear()
+            self._size -= len(idle)
+            self._metrics["connections_closed"] += len(idle)
+            self._cond.notify_all()
+        for conn in idle:
+            self._close_quietly(conn)
+
+    def stats(self) -> Dict[str, Any]:
+        """プールのメトリクスを取得"""
+        with self._cond:
+            stats = dict(self._metrics)
+            stats.update({
+                "size": self._size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "max_size": self.max_size,
+                "min_size": self.min_size,
+            })
+        checkouts = stats["checkouts"]
+        stats["hit_ratio"] = round(stats["pool_hits"] / checkouts, 4) if checkouts else 0.0
+        stats["total_wait_seconds"] = round(stats["total_wait_seconds"], 4)
+        return stats
+
+    # ------------------------------------------------------------------
+    # 内部処理
+    # ------------------------------------------------------------------
+
+    def _evict_expired_locked(self):
+        """（ロック取得済み前提）期限切れのアイドル接続をプールから外して返す"""
+        expired = []
+        now = time.monotonic()
+        # 左端ほど古い。min_sizeは下回らないようにする
+        while (
+            self._idle
+            and self._size - len(expired) > self.min_size
+            and now - self._idle[0][1] > self.max_idle_seconds
+        ):
+            conn, _ = self._idle.popleft()
+            expired.append(conn)
+        if expired:
+            self._size -= len(expired)
+            self._metrics["connections_evicted"] += len(expired)
+            self._metrics["connections_closed"] += len(expired)
+            self._cond.notify(len(expired))
+        return expired
+
+    def _discard(self, conn: Any):
+        """貸し出し中の接続を破棄して枠を解放"""
+        with self._cond:
+            self._size -= 1
+            self._in_use -= 1
+            self._metrics["connections_closed"] += 1
+            self._cond.notify()
+        self._close_quietly(conn)
+
+    @staticmethod
+    def _is_healthy(conn: Any) -> bool:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception as e:
+            logger.warning(f"Pooled SQL connection failed health check: {e}")
+            return False
+
+    @staticmethod
+    def _close_quietly(conn: Any):
+        try:
+            conn.close()
+        except Exception:
+            pass
@@ -0,0 +1,167 @@
+"""
+IR Simulator用 実行時間モデル
+固定のsleepに代わり、パイプライン・アクティビティ別のタイミングプロファイルで処理時間を決定する
+
+モード:
+    fixed     - 従来互換（Copy 2秒、その他アクティビティ 1秒、パイプライン定義は使わない）
+    zero      - 待機なし（CI向けの高速モード）
+    realistic - 固定オーバーヘッド + 行数 / スループット(rows/sec) でモデル化
+"""
+
+import json
+import logging
+import os
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+TIMING_MODES = ("fixed", "zero", "realistic")
+
+# realisticモードの既定値（ADFの典型的なアクティビティ起動オーバーヘッドを目安にした値）
+DEFAULT_PROFILE: Dict[str, Any] = {
+    "mode": "fixed",
+    "time_scale": 1.0,
+    "fixed": {"copy_seconds": 2.0, "activity_seconds": 1.0},
+    "pipeline_overhead_seconds": 3.0,
+    "activity_types": {
+        "Copy": {"overhead_seconds": 8.0, "rows_per_second": 20000, "rows": 10000},
+        "Script": {"overhead_seconds": 4.0, "rows_per_second": 100000, "rows": 0},
+        "Lookup": {"overhead_seconds": 2.0},
+        "GetMetadata": {"overhead_seconds": 1.5},
+        "SetVariable": {"overhead_seconds": 0.2},
+        "IfCondition": {"overhead_seconds": 0.2},
+        "ExecuteDataFlow": {"overhead_seconds": 60.0, "rows_per_second": 50000, "rows": 10000},
+        "default": {"overhead_seconds": 1.0},
+    },
+    "pipelines": {},
+}
+
+
+def _merge(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    """ネストした辞書をマージ（overrideが優先）"""
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = _merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+def pipeline_activity_specs(pipeline_graphs: Dict[str, Any]) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """解析済みのアクティビティグラフ（pipeline_graph.load_pipeline_graphs）から種別・並列度を抽出
+
+    Returns:
+        {パイプライン名: {アクティビティ名: {"type", "diu", "parallel_copies"}}}
+    """
+    return {
+        pipeline_name: {
+            node.name: {"type": node.type, "diu": node.diu, "parallel_copies": node.parallel_copies}
+            for node in graph.iter_nodes()
+        }
+        for pipeline_name, graph in pipeline_graphs.items()
+    }
+
+
+class TimingModel:
+    """パイプライン・アクティビティの処理時間を算出"""
+
+    def __init__(
+        self,
+        profile: Optional[Dict[str, Any]] = None,
+        pipeline_specs: Optional[Dict[str, Dict[str, Dict[str, Any]]]] = None,
+        mode: Optional[str] = None,
+    ):
+        self.profile = _merge(DEFAULT_PROFILE, profile or {})
+        self.pipeline_specs = pipeline_specs or {}
+        self.mode = (mode or self.profile.get("mode") or "fixed").lower()
+        if self.mode not in TIMING_MODES:
+            raise ValueError(f"Unknown timing mode '{self.mode}'. Expected one of {TIMING_MODES}")
+        self.time_scale = float(self.profile.get("time_scale", 1.0))
+
+    @classmethod
+    def from_files(
+        cls,
+        profile_path: Optional[str] = None,
+        pipeline_graphs: Optional[Dict[str, Any]] = None,
+        mode: Optional[str] = None,
+    ) -> "TimingModel":
+        """設定ファイル（存在しなければ既定値）と解析済みのパイプライン定義から生成"""
+        profile = {}
+        if profile_path and os.path.exists(profile_path):
+            with open(profile_path, encoding="utf-8") as f:
+                profile = json.load(f)
+            logger.info(f"Loaded timing profile from {profile_path}")
+        specs = pipeline_activity_specs(pipeline_graphs or {})
+        model = cls(profile, specs, mode)
+        logger.info(f"Timing model mode={model.mode}, time_scale={model.time_scale}, "
+                    f"pipeline definitions={len(specs)}")
+        return model
+
+    @property
+    def uses_pipeline_definitions(self) -> bool:
+        """パイプライン定義のアクティビティを実行するか（fixedモードは従来どおりパイプライン名から推定）"""
+        return self.mode != "fixed"
+
+    def pipeline_overhead(self, pipeline_name: str) -> float:
+        """パイプライン起動のオーバーヘッド（秒）"""
+        if self.mode != "realistic":
+            return 0.0
+        pipeline = self.profile["pipelines"].get(pipeline_name, {})
+        overhead = pipeline.get("overhead_seconds", self.profile.get("pipeline_overhead_seconds", 0.0))
+        return float(overhead) * self.time_scale
+
+    def copy_duration(self, pipeline_name: str, activity_name: str, rows: Optional[int] = None) -> float:
+        """シミュレーションモードのCopy Activityの処理時間（秒）"""
+        if self.mode == "zero":
+            return 0.0
+        if self.mode == "fixed":
+            return float(self.profile["fixed"]["copy_seconds"]) * self.time_scale
+        return self._realistic(pipeline_name, activity_name, "Copy", rows)
+
+    def activity_duration(self, pipeline_name: str, activity_name: str,
+                          activity_type: Optional[str] = None, rows: Optional[int] = None) -> float:
+        """アクティビティの処理時間（秒）"""
+        if self.mode == "zero":
+            return 0.0
+        if self.mode == "fixed":
+            return float(self.profile["fixed"]["activity_seconds"]) * self.time_scale
+        return self._realistic(pipeline_name, activity_name, activity_type, rows)
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "time_scale": self.time_scale,
+            "pipeline_definitions": len(self.pipeline_specs),
+            "profiled_pipelines": sorted(self.profile["pipelines"].keys()),
+        }
+
+    def _realistic(self, pipeline_name: str, activity_name: str,
+                   activity_type: Optional[str], rows: Optional[int]) -> float:
+        """overhead + rows / rows_per_second で処理時間を算出
+
+        優先順位: pipelines.<name>.activities.<activity> > パイプライン定義の種別 > activity_types
+        """
+        spec = self.pipeline_specs.get(pipeline_name, {}).get(activity_name, {})
+        activity_type = activity_type or spec.get("type") or "default"
+        types = self.profile["activity_types"]
+        settings = dict(types.get(activity_type, types["default"]))
+        pipeline = self.profile["pipelines"].get(pipeline_name, {})
+        settings.update(pipeline.get("activity_types", {}).get(activity_type, {}))
+        settings.update(pipeline.get("activities", {}).get(activity_name, {}))
+
+        overhead = float(settings.get("overhead_seconds", 0.0))
+        rows = rows if rows is not None else int(settings.get("rows", 0))
+        rows_per_second = float(settings.get("rows_per_second", 0.0))
+
+        # Copyは定義上のDIU・並列コピー数に比例してスループットが伸びるものとする（4 DIUを基準）
+        if activity_type == "Copy" and rows_per_second > 0:
+            diu = spec.get("diu")
+            parallel = spec.get("parallel_copies")
+            if isinstance(diu, (int, float)) and diu > 0:
+                rows_per_second *= diu / 4.0
+            if isinstance(parallel, (int, float)) and parallel > 1:
+                rows_per_second *= parallel
+
+        transfer = rows / rows_per_second if rows and rows_per_second > 0 else 0.0
+        return (overhead + transfer) * self.time_scale
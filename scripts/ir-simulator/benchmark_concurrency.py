@@ -0,0 +1,154 @@
+"""
+IR Simulator 同時実行ベンチマーク
+
+クライアント数を段階的に増やしながらエンドポイントへ並行リクエストを送り、
+スループット（req/s）とレイテンシ（p50/p95/p99）を計測する。
+イベントループがブロックされていなければ、スループットはクライアント数に比例して伸びる。
+
+使用例:
+    python scripts/ir-simulator/benchmark_concurrency.py --url http://localhost:8080 \\
+        --clients 1,4,16,64 --requests-per-client 5
+"""
+
+import argparse
+import json
+import statistics
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+import requests
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """最近傍法でパーセンタイルを算出"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def build_payload(endpoint: str, index: int) -> Dict:
+    """エンドポイント別のリクエストボディを生成
+
+    /copy-activityはsourceにquery・tableを指定せず、シミュレーション（タイミングモデルの処理時間）で計測する
+    """
+    if endpoint == "/copy-activity":
+        return {
+            "pipeline_name": "benchmark_pipeline",
+            "activity_name": f"benchmark_copy_{index}",
+            "source": {"type": "SqlServerSource"},
+            "sink": {"type": "SqlServerSink"},
+        }
+    if endpoint == "/pipeline-execution":
+        return {"pipeline_name": "benchmark_pipeline", "parameters": {}}
+    return {}
+
+
+def is_error(endpoint: str, response: requests.Response) -> bool:
+    """エラー応答か（HTTPエラーに加え、/copy-activityはHTTP 200でもstatusがSUCCESS以外ならエラー）"""
+    if response.status_code >= 400:
+        return True
+    if endpoint == "/copy-activity":
+        try:
+            return response.json().get("status") != "SUCCESS"
+        except ValueError:
+            return True
+    return False
+
+
+def run_level(base_url: str, endpoint: str, clients: int, requests_per_client: int, timeout: float) -> Dict:
+    """指定クライアント数で1段階分の計測を実行"""
+    latencies: List[float] = []
+    errors = 0
+    lock = threading.Lock()
+    method = "GET" if endpoint in ("/", "/health", "/executions", "/test-database-status") else "POST"
+
+    def client(client_index: int):
+        nonlocal errors
+        session = requests.Session()
+        local_latencies = []
+        local_errors = 0
+        for i in range(requests_per_client):
+            started = time.perf_counter()
+            try:
+                if method == "GET":
+                    response = session.get(f"{base_url}{endpoint}", timeout=timeout)
+                else:
+                    response = session.post(
+                        f"{base_url}{endpoint}",
+                        json=build_payload(endpoint, client_index * requests_per_client + i),
+                        timeout=timeout,
+                    )
+                if is_error(endpoint, response):
+                    local_errors += 1
+            except requests.RequestException:
+                local_errors += 1
+            local_latencies.append(time.perf_counter() - started)
+        session.close()
+        with lock:
+            latencies.extend(local_latencies)
+            errors += local_errors
+
+    wall_start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=clients) as executor:
+        list(executor.map(client, range(clients)))
+    wall_time = time.perf_counter() - wall_start
+
+    total = clients * requests_per_client
+    return {
+        "clients": clients,
+        "requests": total,
+        "errors": errors,
+        "wall_seconds": round(wall_time, 3),
+        "throughput_rps": round(total / wall_time, 2) if wall_time > 0 else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+        "mean_ms": round(statistics.mean(latencies) * 1000, 1) if latencies else 0.0,
+    }
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="IR Simulator concurrency benchmark")
+    parser.add_argument("--url", default="http://localhost:8080", help="IR SimulatorのベースURL")
+    parser.add_argument("--endpoint", default="/copy-activity", help="計測対象のエンドポイント")
+    parser.add_argument("--clients", default="1,2,4,8,16,32,64", help="クライアント数（カンマ区切り）")
+    parser.add_argument("--requests-per-client", type=int, default=5, help="クライアント毎のリクエスト数")
+    parser.add_argument("--timeout", type=float, default=120.0, help="リクエストタイムアウト（秒）")
+    parser.add_argument("--json", dest="json_path", help="結果をJSONで保存するパス")
+    args = parser.parse_args(argv)
+
+    levels = [int(c) for c in args.clients.split(",") if c.strip()]
+    results = []
+
+    print(f"Benchmarking {args.url}{args.endpoint}")
+    print(f"{'clients':>8} {'requests':>9} {'errors':>7} {'rps':>9} {'p50(ms)':>9} {'p95(ms)':>9} {'p99(ms)':>9}")
+    for clients in levels:
+        result = run_level(args.url, args.endpoint, clients, args.requests_per_client, args.timeout)
+        results.append(result)
+        print(
+            f"{result['clients']:>8} {result['requests']:>9} {result['errors']:>7} "
+            f"{result['throughput_rps']:>9} {result['p50_ms']:>9} {result['p95_ms']:>9} {result['p99_ms']:>9}"
+        )
+
+    # スループットの伸び率（最小クライアント数比）
+    if len(results) > 1 and results[0]["throughput_rps"] > 0:
+        base = results[0]
+        scaling = results[-1]["throughput_rps"] / base["throughput_rps"]
+        ideal = results[-1]["clients"] / base["clients"]
+        print(f"Throughput scaling {base['clients']} -> {results[-1]['clients']} clients: "
+              f"x{scaling:.2f} (ideal x{ideal:.2f})")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({"url": args.url, "endpoint": args.endpoint, "results": results}, f, indent=2)
+
+    return 1 if any(r["errors"] for r in results) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,372 @@
+"""
+IR Simulator トリガースケジュール再生ツール
+
+src/dev/trigger/*.json のスケジュールトリガーを指定期間で展開し、
+実時間を加速してIR Simulatorの /pipeline-execution へ投入する。
+同じ時間帯に多数のパイプラインが起動した場合の待ち時間・同時実行数のピーク・完了時間の分布を計測する。
+
+トリガー定義の pipelines が空の場合は、トリガー名（tr_Schedule_<名前>）と末尾が一致するパイプライン定義を対応付ける。
+
+使用例:
+    # 1日分を360倍速（約4分）で再生
+    python scripts/ir-simulator/replay_triggers.py --start 2025-06-02T00:00 --hours 24 --speed 360
+
+    # 展開結果のみ確認（シミュレーターへは投入しない）
+    python scripts/ir-simulator/replay_triggers.py --start 2025-06-02T00:00 --hours 168 --dry-run
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date, datetime, timedelta
+from datetime import time as dt_time
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+REPO_ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), "..", ".."))
+DEFAULT_TRIGGER_DIR = os.path.join(REPO_ROOT, "src", "dev", "trigger")
+DEFAULT_PIPELINE_DIR = os.path.join(REPO_ROOT, "src", "dev", "pipeline")
+WEEKDAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+TERMINAL_STATUSES = ("SUCCESS", "FAILED")
+
+
+@dataclass
+class Firing:
+    """1回分のトリガー起動（時刻はトリガーのタイムゾーンでのローカル時刻）"""
+    scheduled_at: datetime
+    trigger: str
+    pipeline: str
+    execution_id: Optional[str] = None
+    submit_lag_seconds: Optional[float] = None
+    http_status: Optional[int] = None
+    record: Dict = field(default_factory=dict)
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """最近傍法でパーセンタイルを算出"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    if not value:
+        return None
+    return datetime.fromisoformat(value.rstrip("Z"))
+
+
+# ---------------------------------------------------------------------------
+# トリガー定義の読み込み・展開
+# ---------------------------------------------------------------------------
+
+def load_triggers(trigger_dir: str, pipeline_dir: str) -> Tuple[List[Dict], List[str]]:
+    """スケジュールトリガーを読み込み、(トリガー一覧, 対応パイプライン不明のトリガー名) を返す"""
+    pipeline_names = [os.path.splitext(os.path.basename(p))[0] for p in glob.glob(os.path.join(pipeline_dir, "*.json"))]
+    triggers, unmapped = [], []
+    for path in sorted(glob.glob(os.path.join(trigger_dir, "*.json"))):
+        with open(path, encoding="utf-8") as f:
+            definition = json.load(f)
+        props = definition.get("properties", {})
+        if props.get("type") != "ScheduleTrigger":
+            continue
+        name = definition.get("name") or os.path.splitext(os.path.basename(path))[0]
+        pipelines = [p["pipelineReference"]["referenceName"] for p in props.get("pipelines") or []]
+        if not pipelines:
+            pipelines = _match_pipelines(name, pipeline_names)
+        if not pipelines:
+            unmapped.append(name)
+            continue
+        triggers.append({
+            "name": name,
+            "pipelines": pipelines,
+            "runtime_state": props.get("runtimeState"),
+            "recurrence": props.get("typeProperties", {}).get("recurrence", {}),
+        })
+    return triggers, unmapped
+
+
+def _match_pipelines(trigger_name: str, pipeline_names: List[str]) -> List[str]:
+    """tr_Schedule_<名前> と末尾が一致するパイプライン名を推定"""
+    suffix = re.sub(r"^tr_(Schedule_)?", "", trigger_name).lower()
+    matches = [p for p in pipeline_names if p.lower().endswith("_" + suffix)]
+    if not matches:
+        matches = [p for p in pipeline_names if suffix in p.lower()]
+    if not matches:
+        # 曜日別などでトリガーが分かれている場合（tr_Schedule_UtilityBills_Thursday -> pi_UtilityBills）
+        matches = [p for p in pipeline_names
+                   if suffix.startswith(re.sub(r"^pi_((send|insert|ins|copy)_)?", "", p.lower()) + "_")]
+    return sorted(matches)[:1]
+
+
+def expand_recurrence(recurrence: Dict, range_start: datetime, range_end: datetime) -> List[datetime]:
+    """recurrence定義を [range_start, range_end) の起動時刻に展開"""
+    frequency = recurrence.get("frequency")
+    interval = max(int(recurrence.get("interval") or 1), 1)
+    anchor = _parse_time(recurrence.get("startTime")) or range_start
+    recurrence_end = _parse_time(recurrence.get("endTime"))
+    lo = max(range_start, anchor)
+    hi = min(range_end, recurrence_end) if recurrence_end else range_end
+    schedule = recurrence.get("schedule") or {}
+    if lo >= hi:
+        return []
+
+    if frequency in ("Minute", "Hour") and not schedule:
+        step = timedelta(minutes=interval) if frequency == "Minute" else timedelta(hours=interval)
+        steps = -(-(lo - anchor) // step)  # 切り上げ
+        fire = anchor + steps * step
+        firings = []
+        while fire < hi:
+            firings.append(fire)
+            fire += step
+        return firings
+
+    hours = schedule.get("hours") or ([anchor.hour] if frequency != "Hour" else list(range(0, 24, interval)))
+    minutes = schedule.get("minutes") or [anchor.minute]
+    weekdays = schedule.get("weekDays") or [WEEKDAYS[anchor.weekday()]]
+    month_days = schedule.get("monthDays") or [anchor.day]
+
+    firings = []
+    day: date = lo.date()
+    while day <= hi.date():
+        elapsed_days = (day - anchor.date()).days
+        if frequency == "Day":
+            matched = elapsed_days % interval == 0
+        elif frequency == "Week":
+            anchor_week = anchor.date() - timedelta(days=anchor.weekday())
+            matched = WEEKDAYS[day.weekday()] in weekdays and ((day - anchor_week).days // 7) % interval == 0
+        elif frequency == "Month":
+            months = (day.year - anchor.year) * 12 + day.month - anchor.month
+            matched = day.day in month_days and months % interval == 0
+        else:
+            matched = frequency == "Hour"
+        if matched:
+            for hour in hours:
+                for minute in minutes:
+                    fire = datetime.combine(day, dt_time(hour, minute))
+                    if lo <= fire < hi:
+                        firings.append(fire)
+        day += timedelta(days=1)
+    return sorted(firings)
+
+
+def build_firings(triggers: List[Dict], range_start: datetime, range_end: datetime) -> List[Firing]:
+    firings = [
+        Firing(scheduled_at=fire, trigger=trigger["name"], pipeline=pipeline)
+        for trigger in triggers
+        for fire in expand_recurrence(trigger["recurrence"], range_start, range_end)
+        for pipeline in trigger["pipelines"]
+    ]
+    return sorted(firings, key=lambda f: (f.scheduled_at, f.trigger))
+
+
+# ---------------------------------------------------------------------------
+# 再生
+# ---------------------------------------------------------------------------
+
+def replay(base_url: str, firings: List[Firing], range_start: datetime, speed: float,
+           poll_interval: float, timeout: float, submit_workers: int) -> float:
+    """起動時刻を speed 倍に加速してパイプライン実行を投入し、全件の完了を待つ（再生時間を返す）"""
+    session_local = threading.local()
+
+    def session() -> requests.Session:
+        if not hasattr(session_local, "session"):
+            session_local.session = requests.Session()
+        return session_local.session
+
+    def submit(firing: Firing, due: float):
+        firing.submit_lag_seconds = time.monotonic() - due
+        try:
+            response = session().post(
+                f"{base_url}/pipeline-execution",
+                params={"wait": "false"},
+                json={"pipeline_name": firing.pipeline, "parameters": {"trigger": firing.trigger}},
+                timeout=30,
+            )
+            firing.http_status = response.status_code
+            if response.status_code < 400:
+                firing.execution_id = response.json()["execution_id"]
+        except requests.RequestException as e:
+            firing.record = {"status": "ERROR", "error_message": str(e)}
+
+    wall_start = time.monotonic()
+    with ThreadPoolExecutor(max_workers=submit_workers) as executor:
+        for firing in firings:
+            due = wall_start + (firing.scheduled_at - range_start).total_seconds() / speed
+            delay = due - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            executor.submit(submit, firing, due)
+
+    # 投入済みの実行が全て完了するまでポーリング
+    pending = {f.execution_id: f for f in firings if f.execution_id}
+    deadline = time.monotonic() + timeout
+    poller = requests.Session()
+    while pending and time.monotonic() < deadline:
+        for execution_id in list(pending):
+            try:
+                response = poller.get(f"{base_url}/execution-status/{execution_id}", timeout=10)
+                if response.status_code == 200:
+                    record = response.json()
+                    pending[execution_id].record = record
+                    if record.get("status") in TERMINAL_STATUSES:
+                        del pending[execution_id]
+            except requests.RequestException:
+                pass
+        if pending:
+            time.sleep(poll_interval)
+    for firing in pending.values():
+        firing.record = {**firing.record, "status": "TIMEOUT"}
+    return time.monotonic() - wall_start
+
+
+# ---------------------------------------------------------------------------
+# 集計
+# ---------------------------------------------------------------------------
+
+def _peak(intervals: List[Tuple[datetime, datetime, str]]) -> Tuple[int, Optional[datetime], List[str]]:
+    """区間の最大重なり数と、その時点・該当パイプラインを返す"""
+    events = sorted([(s, 1, name) for s, e, name in intervals] + [(e, -1, name) for s, e, name in intervals],
+                    key=lambda x: (x[0], x[1]))
+    current, peak, peak_at = 0, 0, None
+    for moment, delta, _ in events:
+        current += delta
+        if current > peak:
+            peak, peak_at = current, moment
+    active = sorted(name for s, e, name in intervals if peak_at is not None and s <= peak_at < e)
+    return peak, peak_at, active
+
+
+def summarize(firings: List[Firing], replay_seconds: float, speed: float) -> Dict:
+    statuses = Counter(f.record.get("status") or ("REJECTED" if f.http_status else "NOT_SUBMITTED") for f in firings)
+    queue_delays, run_times, completion_times = [], [], []
+    queued_intervals, running_intervals = [], []
+    for firing in firings:
+        record = firing.record
+        submitted = _parse_time(record.get("submitted_at"))
+        started = _parse_time(record.get("start_time"))
+        ended = _parse_time(record.get("end_time"))
+        if not (submitted and started and ended):
+            continue
+        queue_delays.append((started - submitted).total_seconds())
+        run_times.append((ended - started).total_seconds())
+        completion_times.append((ended - submitted).total_seconds())
+        queued_intervals.append((submitted, started, firing.pipeline))
+        running_intervals.append((started, ended, firing.pipeline))
+
+    def distribution(values: List[float]) -> Dict:
+        return {
+            "p50": round(percentile(values, 50), 3),
+            "p95": round(percentile(values, 95), 3),
+            "p99": round(percentile(values, 99), 3),
+            "max": round(max(values), 3) if values else 0.0,
+        }
+
+    peak_running, peak_running_at, peak_pipelines = _peak(running_intervals)
+    peak_queued, peak_queued_at, _ = _peak(queued_intervals)
+    lags = [f.submit_lag_seconds for f in firings if f.submit_lag_seconds is not None]
+    return {
+        "firings": len(firings),
+        "statuses": dict(statuses),
+        "replay_seconds": round(replay_seconds, 3),
+        "speed": speed,
+        "submit_lag_seconds": distribution(lags),
+        "queue_delay_seconds": distribution(queue_delays),
+        "run_seconds": distribution(run_times),
+        "completion_seconds": distribution(completion_times),
+        "peak_running": peak_running,
+        "peak_running_at": peak_running_at.isoformat() if peak_running_at else None,
+        "peak_running_pipelines": peak_pipelines,
+        "peak_queued": peak_queued,
+        "peak_queued_at": peak_queued_at.isoformat() if peak_queued_at else None,
+    }
+
+
+def print_schedule(firings: List[Firing]):
+    """時間帯別の起動数（同時起動が集中する時間帯の確認用）"""
+    by_hour = Counter(f.scheduled_at.replace(minute=0, second=0, microsecond=0) for f in firings)
+    print(f"{'hour':<17} {'firings':>7}  pipelines")
+    for hour in sorted(by_hour):
+        names = sorted({f.pipeline for f in firings if f.scheduled_at.replace(minute=0, second=0, microsecond=0) == hour})
+        print(f"{hour:%Y-%m-%d %H:%M} {by_hour[hour]:>7}  {', '.join(names)}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Replay ADF schedule triggers against the IR Simulator")
+    parser.add_argument("--url", default="http://localhost:8080", help="IR SimulatorのベースURL")
+    parser.add_argument("--trigger-dir", default=DEFAULT_TRIGGER_DIR, help="トリガー定義ディレクトリ")
+    parser.add_argument("--pipeline-dir", default=DEFAULT_PIPELINE_DIR, help="パイプライン定義ディレクトリ")
+    parser.add_argument("--start", required=True, help="再生開始時刻（トリガーのタイムゾーン、例: 2025-06-02T00:00）")
+    parser.add_argument("--hours", type=float, default=24.0, help="再生する期間（時間）")
+    parser.add_argument("--speed", type=float, default=360.0, help="加速倍率（360なら1時間を10秒で再生）")
+    parser.add_argument("--filter", help="対象トリガー名の正規表現")
+    parser.add_argument("--started-only", action="store_true", help="runtimeStateがStartedのトリガーのみ対象")
+    parser.add_argument("--poll-interval", type=float, default=0.5, help="完了待ちのポーリング間隔（秒）")
+    parser.add_argument("--timeout", type=float, default=600.0, help="全投入後の完了待ちタイムアウト（秒）")
+    parser.add_argument("--submit-workers", type=int, default=16, help="投入用スレッド数")
+    parser.add_argument("--dry-run", action="store_true", help="展開結果のみ表示")
+    parser.add_argument("--json", dest="json_path", help="集計結果と各実行の記録をJSONで保存するパス")
+    args = parser.parse_args(argv)
+
+    range_start = datetime.fromisoformat(args.start)
+    range_end = range_start + timedelta(hours=args.hours)
+    triggers, unmapped = load_triggers(args.trigger_dir, args.pipeline_dir)
+    if args.filter:
+        triggers = [t for t in triggers if re.search(args.filter, t["name"])]
+    if args.started_only:
+        triggers = [t for t in triggers if t["runtime_state"] == "Started"]
+    if unmapped:
+        print(f"Skipping {len(unmapped)} triggers without a matching pipeline: {', '.join(unmapped)}")
+
+    firings = build_firings(triggers, range_start, range_end)
+    print(f"{len(triggers)} triggers -> {len(firings)} firings between {range_start} and {range_end}")
+    if args.dry_run or not firings:
+        print_schedule(firings)
+        return 0
+
+    print(f"Replaying at x{args.speed:g} (about {args.hours * 3600 / args.speed:.0f}s) against {args.url}")
+    replay_seconds = replay(args.url, firings, range_start, args.speed,
+                            args.poll_interval, args.timeout, args.submit_workers)
+    summary = summarize(firings, replay_seconds, args.speed)
+
+    print(f"Statuses: {summary['statuses']}")
+    print(f"{'metric':<22} {'p50':>9} {'p95':>9} {'p99':>9} {'max':>9}")
+    for key in ("submit_lag_seconds", "queue_delay_seconds", "run_seconds", "completion_seconds"):
+        d = summary[key]
+        print(f"{key:<22} {d['p50']:>9} {d['p95']:>9} {d['p99']:>9} {d['max']:>9}")
+    print(f"Peak running: {summary['peak_running']} at {summary['peak_running_at']} "
+          f"({', '.join(summary['peak_running_pipelines'])})")
+    print(f"Peak queued:  {summary['peak_queued']} at {summary['peak_queued_at']}")
+
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "summary": summary,
+                "firings": [
+                    {
+                        "scheduled_at": firing.scheduled_at.isoformat(),
+                        "trigger": firing.trigger,
+                        "pipeline": firing.pipeline,
+                        "execution_id": firing.execution_id,
+                        "http_status": firing.http_status,
+                        "record": firing.record,
+                    }
+                    for firing in firings
+                ],
+            }, f, indent=2, default=str)
+
+    return 0 if summary["statuses"].get("SUCCESS", 0) == len(firings) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -228,9 +228,9 @@ def e2e_synapse_connection():
     connection = SynapseE2EConnection()
     try:
         # 接続テスト - 簡単なクエリを実行
-        result = connection.execute_query("SELECT 1 as test")
+        result = connection.execute_query("SELECT 1 as test", fetch_mode="tuple")
         assert len(result) > 0 and result[0][0] == 1, "接続テストに失敗しました"
         yield connection
     except Exception as e:
         pytest.skip(f"E2E Synapse接続が利用できません: {e}")
-    # 接続は自動的に閉じられるため、明示的なクリーンアップは不要
+    # 接続はプールで再利用され、セッション終了時に閉じられるため、明示的なクリーンアップは不要
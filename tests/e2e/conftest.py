@@ -140,6 +140,27 @@ def e2e_db_connection():
             conn.close()
 
 
+@pytest.fixture(scope="session")
+def docker_e2e_connection():
+    """Docker環境用E2E接続フィクスチャ（セッション内で共有）"""
+    if not PYODBC_AVAILABLE:
+        pytest.skip("pyodbc is not available - DB tests will be skipped")
+
+    from tests.e2e.helpers.docker_e2e_helper import DockerE2EConnection
+    return DockerE2EConnection()
+
+
+@pytest.fixture
+def isolated_docker_e2e(docker_e2e_connection):
+    """テスト毎のトランザクション内でDB操作し、終了時にロールバックするフィクスチャ
+
+    クリーンアップ不要で並列実行可能。IR Simulatorを呼び出すテストでは使用しない
+    （未コミットのデータはシミュレーターから見えないため）
+    """
+    with docker_e2e_connection.isolated() as connection:
+        yield connection
+
+
 @pytest.fixture(scope="session")
 def e2e_test_config():
     """E2Eテスト設定フィクスチャ"""
@@ -193,3 +214,9 @@ def pytest_collection_modifyitems(config, items):
     # for item in items:
     #     if "e2e" in item.keywords:
     #         item.add_marker(pytest.mark.timeout(600))  # 10分のタイムアウト
+
+
+def pytest_sessionfinish(session, exitstatus):
+    """セッション終了時に共有SQL接続プールを閉じる"""
+    from tests.e2e.helpers.connection_pool import close_shared_pools
+    close_shared_pools()
@@ -0,0 +1,208 @@
+"""
+E2Eテスト用 DB接続プール
+テストセッション全体で接続を再利用し、ステートメント毎のpyodbc.connect（TCP+TLS+ログイン）を避ける
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Callable, Dict
+
+logger = logging.getLogger(__name__)
+
+
+class PoolExhaustedError(Exception):
+    """接続プールから時間内に接続を取得できなかった"""
+
+
+class ConnectionPool:
+    """スレッドセーフな接続プール
+
+    checkout()/checkin() で接続を貸し出し・返却する。返却時はロールバックして未確定のトランザクションを破棄し、
+    ロールバックに失敗した（切断された）接続はプールに戻さず閉じる。close()後に返却された接続も閉じる
+    """
+
+    def __init__(
+        self,
+        connect: Callable[[], Any],
+        max_size: int = 5,
+        checkout_timeout: float = 30.0,
+        validate_after_seconds: float = 60.0,
+    ):
+        if max_size < 1:
+            raise ValueError("max_size must be >= 1")
+        self._connect = connect
+        self.max_size = max_size
+        self.checkout_timeout = checkout_timeout
+        self.validate_after_seconds = validate_after_seconds
+        self._idle: deque = deque()
+        self._in_use = 0
+        self._condition = threading.Condition()
+        self._closed = False
+        self._stats = {
+            "checkouts": 0,
+            "hits": 0,
+            "misses": 0,
+            "discarded": 0,
+            "waits": 0,
+        }
+
+    def checkout(self):
+        """接続を取得（アイドル接続があれば再利用、無ければ上限まで新規作成）"""
+        deadline = time.monotonic() + self.checkout_timeout
+        with self._condition:
+            while True:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    self._in_use += 1
+                    break
+                if self._in_use < self.max_size:
+                    conn, returned_at = None, None
+                    self._in_use += 1
+                    break
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    raise PoolExhaustedError(
+                        f"No connection available within {self.checkout_timeout}s (max_size={self.max_size})"
+                    )
+                self._stats["waits"] += 1
+                self._condition.wait(remaining)
+
+        # 接続の作成・検証はロック外で行う
+        try:
+            if conn is not None and time.monotonic() - returned_at > self.validate_after_seconds:
+                if not self._is_alive(conn):
+                    self._close_quietly(conn)
+                    conn = None
+            if conn is None:
+                conn = self._connect()
+                self._count("misses")
+            else:
+                self._count("hits")
+        except BaseException:
+            with self._condition:
+                self._in_use -= 1
+                self._condition.notify()
+            raise
+        self._count("checkouts")
+        return conn
+
+    def checkin(self, conn, discard: bool = False):
+        """接続を返却（discard=True、ロールバックに失敗した場合、close()済みの場合は閉じる）"""
+        if not discard:
+            try:
+                conn.rollback()
+            except Exception:
+                discard = True
+        with self._condition:
+            self._in_use -= 1
+            close_now = discard or self._closed
+            if not close_now:
+                self._idle.append((conn, time.monotonic()))
+            self._condition.notify()
+        if close_now:
+            self._close_quietly(conn)
+            self._count("discarded")
+
+    @contextmanager
+    def connection(self):
+        """with文で接続を借りる（終了時にロールバックして返却）"""
+        conn = self.checkout()
+        try:
+            yield conn
+        finally:
+            self.checkin(conn)
+
+    def close_all(self):
+        """アイドル接続を全て閉じる"""
+        with self._condition:
+            idle = list(self._idle)
+            self._idle.clear()
+        for conn, _ in idle:
+            self._close_quietly(conn)
+
+    def close(self):
+        """アイドル接続を閉じ、以降の貸し出しを停止（貸し出し中の接続は返却時に閉じる）"""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+        self.close_all()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def stats(self) -> Dict[str, Any]:
+        with self._condition:
+            stats = dict(self._stats)
+            stats.update({"in_use": self._in_use, "idle": len(self._idle), "max_size": self.max_size})
+        stats["hit_ratio"] = round(stats["hits"] / stats["checkouts"], 3) if stats["checkouts"] else 0.0
+        return stats
+
+    def _count(self, key: str):
+        with self._condition:
+            self._stats[key] += 1
+
+    @staticmethod
+    def _is_alive(conn) -> bool:
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _close_quietly(conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+
+_shared_pools: Dict[str, ConnectionPool] = {}
+# 共有プール毎の利用者数（release_shared_pool()で0になったプールを閉じる）
+_shared_pool_refs: Dict[str, int] = {}
+_shared_pools_lock = threading.Lock()
+
+
+def get_shared_pool(key: str, connect: Callable[[], Any], max_size: int = 5) -> ConnectionPool:
+    """接続先（key）毎にプロセス内で1つのプールを共有（利用者数を1つ増やす）"""
+    with _shared_pools_lock:
+        pool = _shared_pools.get(key)
+        if pool is None:
+            pool = _shared_pools[key] = ConnectionPool(connect, max_size=max_size)
+            _shared_pool_refs[key] = 0
+            logger.info(f"Created shared connection pool (max_size={max_size})")
+        _shared_pool_refs[key] += 1
+        return pool
+
+
+def release_shared_pool(key: str, pool: ConnectionPool):
+    """get_shared_pool()で取得したプールの利用を終える（最後の利用者が返した時点でプールを閉じる）"""
+    with _shared_pools_lock:
+        # close_shared_pools()で既に閉じられたプール
+        if _shared_pools.get(key) is not pool:
+            return
+        _shared_pool_refs[key] -= 1
+        if _shared_pool_refs[key] > 0:
+            return
+        del _shared_pools[key]
+        del _shared_pool_refs[key]
+    pool.close()
+
+
+def close_shared_pools():
+    """全ての共有プールの接続を閉じる（テストセッション終了時）"""
+    with _shared_pools_lock:
+        pools = list(_shared_pools.values())
+        _shared_pools.clear()
+        _shared_pool_refs.clear()
+    for pool in pools:
+        pool.close()
@@ -7,11 +7,21 @@ import os
 import logging
 import requests
 import json
+import shutil
+import subprocess
+import tempfile
+import threading
 import time
-from typing import Dict, List, Optional, Any
+from typing import Dict, Iterable, Iterator, List, Optional, Any
+from contextlib import contextmanager
 from datetime import datetime
 from azure.storage.blob import BlobServiceClient
 
+from .connection_pool import get_shared_pool
+from .readiness import ServiceProbe, wait_for_services
+from .result_formats import DEFAULT_CHUNK_SIZE, fetch_results, iter_rows, validate_fetch_mode
+from .schema_cache import get_shared_schema_cache
+
 # pyodbcの条件付きインポート（技術的負債対応）
 try:
     import pyodbc
@@ -48,6 +58,11 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+
+class BcpUnavailableError(Exception):
+    """bcpでロードできない（コマンドが無い・値を文字モードで表現できない）"""
+
+
 class DockerE2EConnection:
     """Docker環境でのE2Eテスト用接続管理クラス"""
     
@@ -63,45 +78,64 @@ class DockerE2EConnection:
             "DefaultEndpointsProtocol=http;AccountName=devstoreaccount1;AccountKey=Eby8vdM02xNOcqFlqUwJPLlmEtlCDXJ1OUzFT50uSRZ6IFsuFq2UVErCz4I6tq/K1SZFPTOtr/KBHBeksoGMGw==;BlobEndpoint=http://localhost:10000/devstoreaccount1;"
         )
         
+        # 同じ接続先のインスタンス間で共有する接続プール（E2E_SQL_POOL_SIZEで上限を指定）とスキーマキャッシュ
+        target = f"{self.sql_host},{self.sql_port}/{self.sql_database}/{self.sql_user}"
+        self.pool = get_shared_pool(
+            target,
+            self.get_sql_connection,
+            max_size=int(os.getenv("E2E_SQL_POOL_SIZE", "5")),
+        )
+        self.schema_cache = get_shared_schema_cache(target)
+        # isolated() 中にスレッド毎に固定する接続
+        self._isolation = threading.local()
+        
         # 接続の健全性チェック
         self._wait_for_services()
     
-    def _wait_for_services(self, max_retries: int = 10, delay: int = 2):
-        """サービスが利用可能になるまで待機"""
+    def _wait_for_services(self, max_retries: int = 10, delay: float = 0.25, max_delay: float = 8.0):
+        """サービスが利用可能になるまで待機
+
+        SQL Server（必須）・IR Simulator・Azurite（任意）を並行にプローブし、指数バックオフ＋ジッターで再試行する。
+        結果はプロセス内とxdistワーカー間で共有されるため、待機するのは最初の呼び出しのみ
+        """
         logger.info("Waiting for services to be ready...")
         
-        # SQL Server接続を待機（必須サービス）
-        for attempt in range(max_retries):
-            try:
-                conn = self.get_sql_connection()
+        def check_sql():
+            with self.pool.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("SELECT 1")
                 cursor.fetchone()
-                conn.close()
-                logger.info("SQL Server is ready")
-                break
-            except Exception as e:
-                if attempt == max_retries - 1:
-                    raise Exception(f"SQL Server not available after {max_retries} attempts: {str(e)}")
-                logger.warning(f"SQL Server not ready, attempt {attempt + 1}/{max_retries}")
-                time.sleep(delay)
-          # IR Simulator接続を待機（オプションサービス - 試行回数を少なく）
-        ir_retries = 5
-        for attempt in range(ir_retries):
-            try:
-                response = requests.get(f"{self.ir_simulator_url}/", timeout=3)
-                if response.status_code == 200:
-                    logger.info("IR Simulator is ready")
-                    break
-            except Exception as e:
-                if attempt == ir_retries - 1:
-                    logger.warning(f"IR Simulator not available after {ir_retries} attempts: {str(e)}")
-                    break  # IR Simulatorは必須ではないのでcontinue
-                logger.warning(f"IR Simulator not ready, attempt {attempt + 1}/{ir_retries}")
-                time.sleep(1)  # IRシミュレーター用の短い遅延
+        
+        def check_ir_simulator():
+            response = requests.get(f"{self.ir_simulator_url}/", timeout=3)
+            if response.status_code != 200:
+                raise Exception(f"HTTP {response.status_code}")
+        
+        def check_azurite():
+            # 認証無しのリクエストでも応答があれば起動済み
+            response = requests.get(self._blob_endpoint(), timeout=3)
+            if response.status_code >= 500:
+                raise Exception(f"HTTP {response.status_code}")
+        
+        # IR Simulator・Azuriteはオプションサービス（試行回数を少なく）
+        probes = {
+            "SQL Server": ServiceProbe("SQL Server", check_sql, required=True, max_retries=max_retries),
+            "IR Simulator": ServiceProbe("IR Simulator", check_ir_simulator, required=False, max_retries=5),
+            "Azurite": ServiceProbe("Azurite", check_azurite, required=False, max_retries=5),
+        }
+        key = f"{self.sql_host},{self.sql_port}|{self.ir_simulator_url}|{self._blob_endpoint()}"
+        self.service_status = wait_for_services(key, probes, base_delay=delay, max_delay=max_delay)
+    
+    def _blob_endpoint(self) -> str:
+        """接続文字列のBlobEndpoint"""
+        for part in self.azurite_connection_string.split(";"):
+            name, _, value = part.partition("=")
+            if name.strip().lower() == "blobendpoint":
+                return value.strip()
+        return "http://localhost:10000/devstoreaccount1"
     
     def get_sql_connection(self):
-        """SQL Server接続を取得"""
+        """SQL Server接続を新規作成（プールを使わない。通常はconnection()/transaction()を使用）"""
         connection_string = f"""
         DRIVER={{ODBC Driver 18 for SQL Server}};
         SERVER={self.sql_host},{self.sql_port};
@@ -113,16 +147,109 @@ class DockerE2EConnection:
         """
         return pyodbc.connect(connection_string)
     
+    @contextmanager
+    def connection(self):
+        """プールから接続を借りる（with文の終了時にロールバックして返却、isolated()中はその接続を使用）"""
+        conn = self._checkout()
+        try:
+            yield conn
+        finally:
+            self._checkin(conn)
+
+    @contextmanager
+    def transaction(self):
+        """プールの接続でトランザクションを実行（正常終了でコミット、例外時はロールバック）
+
+        isolated()中はセーブポイントとして扱い、例外時はセーブポイントまでロールバックする
+        （まだトランザクションが始まっていなければ、ブロック内の変更のみを含むトランザクション全体をロールバック）
+
+        使用例:
+            with connection.transaction() as cursor:
+                cursor.execute("DELETE FROM [dbo].[client_dm]")
+                cursor.execute("INSERT INTO [dbo].[client_dm] ...")
+        """
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            savepoint = None
+            if self._isolated_connection() is not None and cursor.execute("SELECT @@TRANCOUNT").fetchone()[0] > 0:
+                self._isolation.savepoints += 1
+                savepoint = f"e2e_sp_{self._isolation.savepoints}"
+                cursor.execute(f"SAVE TRANSACTION {savepoint}")
+            try:
+                yield cursor
+                self._commit(conn)
+            except BaseException:
+                if savepoint:
+                    cursor.execute(f"ROLLBACK TRANSACTION {savepoint}")
+                else:
+                    conn.rollback()
+                raise
+            finally:
+                cursor.close()
+
+    @contextmanager
+    def isolated(self):
+        """このスレッドからのDB操作を1つのトランザクションにまとめ、終了時にロールバックする
+
+        ヘルパー経由のコミットは行われず、テスト終了時に変更が全て取り消されるため、
+        クリーンアップ不要で並列実行しても他のテストのデータを壊さない。
+        未コミットのデータは別セッション（IR Simulator・bcp・他スレッド）からは見えず
+        ロック待ちの原因にもなるため、ヘルパー経由でのみDBを操作するテスト向け
+        """
+        if self._isolated_connection() is not None:
+            raise RuntimeError("isolated() cannot be nested")
+        conn = self.pool.checkout()
+        # autocommit=Falseでは最初の文から暗黙のトランザクションが始まるため、BEGIN TRANSACTIONは発行しない
+        # （発行すると@@TRANCOUNTが2になり、ヘルパー外のCOMMITで外側のトランザクションが残る）
+        conn.autocommit = False
+        self._isolation.connection = conn
+        self._isolation.savepoints = 0
+        try:
+            yield self
+        finally:
+            self._isolation.connection = None
+            # 返却時のロールバックでテスト中の変更を全て取り消す
+            self.pool.checkin(conn)
+            # ロールバックされたDDLのメタデータを残さない
+            self.schema_cache.invalidate()
+
+    def _isolated_connection(self):
+        return getattr(self._isolation, "connection", None)
+
+    def _checkout(self):
+        return self._isolated_connection() or self.pool.checkout()
+
+    def _checkin(self, conn):
+        if conn is not self._isolated_connection():
+            self.pool.checkin(conn)
+
+    def _commit(self, conn):
+        # isolated()中はテスト終了時のロールバックまでコミットしない
+        if conn is not self._isolated_connection():
+            conn.commit()
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """接続プールの統計（hits/missesなど）"""
+        return self.pool.stats()
+    
     def get_blob_client(self):
         """Azure Blob Storage (Azurite) クライアントを取得"""
         return BlobServiceClient.from_connection_string(self.azurite_connection_string)
     
-    def execute_query(self, query: str, params: Optional[tuple] = None) -> List[Dict]:
-        """SQLクエリを実行して結果を辞書のリストで返す"""
-        conn = self.get_sql_connection()
-        cursor = conn.cursor()
+    def execute_query(self, query: str, params: Optional[tuple] = None, fetch_mode: str = "dict",
+                      chunk_size: int = DEFAULT_CHUNK_SIZE) -> Any:
+        """SQLクエリを実行して結果を返す
+
+        fetch_mode（SELECT文のみ有効、詳細は result_formats 参照）:
+            dict（既定）/ tuple / iterator / numpy / pandas
+        iterator は読み切る（またはclose()する）まで接続を保持し、クエリは最初の取得時に実行される
+        """
+        validate_fetch_mode(fetch_mode)
+        if fetch_mode == "iterator" and query.strip().upper().startswith('SELECT'):
+            return self._iter_query(query, params, chunk_size)
         
-        try:
+        with self.connection() as conn:
+            cursor = conn.cursor()
             if params:
                 cursor.execute(query, params)
             else:
@@ -130,17 +257,20 @@ class DockerE2EConnection:
             
             # SELECT文の場合は結果を取得
             if query.strip().upper().startswith('SELECT'):
-                columns = [column[0] for column in cursor.description]
-                results = []
-                for row in cursor.fetchall():
-                    results.append(dict(zip(columns, row)))
-                return results
+                return fetch_results(cursor, fetch_mode, chunk_size)
             else:
-                conn.commit()
+                self._commit(conn)
+                self.schema_cache.invalidate_for_statement(query)
                 return []
-                
-        finally:
-            conn.close()
+    
+    def _iter_query(self, query: str, params: Optional[tuple], chunk_size: int) -> Iterator[Any]:
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            yield from iter_rows(cursor, chunk_size)
     
     def get_table_count(self, table_name: str, schema: str = "dbo") -> int:
         """テーブルのレコード数を取得"""
@@ -150,43 +280,89 @@ class DockerE2EConnection:
     
     def get_table_structure(self, table_name: str, schema: str = "dbo") -> List[Dict]:
         """テーブル構造を取得"""
-        query = """
-        SELECT 
-            COLUMN_NAME,
-            DATA_TYPE,
-            IS_NULLABLE,
-            COLUMN_DEFAULT,
-            CHARACTER_MAXIMUM_LENGTH
-        FROM INFORMATION_SCHEMA.COLUMNS 
-        WHERE TABLE_NAME = ? AND TABLE_SCHEMA = ?
-        ORDER BY ORDINAL_POSITION
-        """
-        return self.execute_query(query, (table_name, schema))
+        return [
+            {
+                "COLUMN_NAME": col["name"],
+                "DATA_TYPE": col["data_type"],
+                "IS_NULLABLE": col["is_nullable"],
+                "COLUMN_DEFAULT": col["default"],
+                "CHARACTER_MAXIMUM_LENGTH": col["max_length"],
+            }
+            for col in self.get_column_metadata(table_name, schema)
+        ]
     
-    def clear_table(self, table_name: str, schema: str = "dbo"):
-        """テーブルのデータをクリア"""
-        query = f"DELETE FROM [{schema}].[{table_name}]"
-        self.execute_query(query)
+    def get_column_metadata(self, table_name: str, schema: str = "dbo") -> List[Dict[str, Any]]:
+        """列名・型・NULL許容・IDENTITY属性を列順で取得（スキーマキャッシュ経由）"""
+        def load():
+            rows = self.execute_query("""
+                SELECT COLUMN_NAME, DATA_TYPE, IS_NULLABLE, COLUMN_DEFAULT, CHARACTER_MAXIMUM_LENGTH, ORDINAL_POSITION,
+                       COLUMNPROPERTY(OBJECT_ID(TABLE_SCHEMA+'.'+TABLE_NAME), COLUMN_NAME, 'IsIdentity') AS IS_IDENTITY
+                FROM INFORMATION_SCHEMA.COLUMNS 
+                WHERE TABLE_NAME = ? AND TABLE_SCHEMA = ? 
+                ORDER BY ORDINAL_POSITION
+            """, (table_name, schema))
+            return [
+                {
+                    "name": row["COLUMN_NAME"],
+                    "data_type": row["DATA_TYPE"],
+                    "is_nullable": row["IS_NULLABLE"],
+                    "default": row["COLUMN_DEFAULT"],
+                    "max_length": row["CHARACTER_MAXIMUM_LENGTH"],
+                    "ordinal": row["ORDINAL_POSITION"],
+                    "is_identity": row["IS_IDENTITY"] == 1,
+                }
+                for row in rows
+            ]
+        return self.schema_cache.get(table_name, schema, load)
+    
+    def clear_table(self, table_name: str, schema: str = "dbo", truncate: bool = False):
+        """テーブルのデータをクリア（既定はDELETE）
+
+        truncate=Trueの場合はTRUNCATE（件数によらずほぼ一定時間、IDENTITYは初期値に戻る）を使い、
+        外部キーで参照されている等で使えない場合はDELETEで削除する。
+        isolated()中はTRUNCATEのスキーマ変更ロックをテスト終了まで保持しないよう、常にDELETEを使う
+        """
+        truncate = truncate and self._isolated_connection() is None
+        if truncate:
+            try:
+                self.execute_query(f"TRUNCATE TABLE [{schema}].[{table_name}]")
+            except pyodbc.Error as e:
+                logger.debug(f"TRUNCATE not possible for {schema}.{table_name}, using DELETE: {e}")
+                truncate = False
+        if not truncate:
+            self.execute_query(f"DELETE FROM [{schema}].[{table_name}]")
+        self.schema_cache.invalidate(table_name, schema)
         logger.info(f"Cleared table: {schema}.{table_name}")
     
-    def insert_test_data(self, table_name: str, data: List[Dict], schema: str = "dbo"):
-        """テストデータを挿入（IDENTITY列自動処理対応）"""
+    def insert_test_data(self, table_name: str, data: List[Dict], schema: str = "dbo",
+                         batch_size: Optional[int] = None, mode: Optional[str] = None) -> Dict[str, Any]:
+        """テストデータを挿入（IDENTITY列自動処理対応）
+
+        mode:
+            executemany - fast_executemany による配列バインド（既定）
+            bcp         - bcpコマンドによるバルクロード（大量データ向け）
+            row         - 1行ずつINSERT（従来動作）
+            auto        - E2E_BCP_THRESHOLD件以上かつbcpが利用可能ならbcp、それ以外はexecutemany
+        batch_size件毎にコミットする
+
+        戻り値は挿入件数・バッチ数・モード・所要時間・rows/secの辞書
+        （以前はNoneを返していた。戻り値を使っていない既存の呼び出し元はそのまま動作する）
+        """
+        mode = (mode or os.getenv("E2E_INSERT_MODE", "auto")).lower()
+        batch_size = batch_size or int(os.getenv("E2E_INSERT_BATCH_SIZE", "1000"))
+        if mode not in ("auto", "executemany", "bcp", "row"):
+            raise ValueError(f"Unknown insert mode: {mode}")
         if not data:
-            return
+            return {"rows": 0, "batches": 0, "mode": mode, "seconds": 0.0, "rows_per_second": 0.0}
         
-        conn = self.get_sql_connection()
+        started = time.perf_counter()
+        # IDENTITY列・型情報を確認（スキーマキャッシュ経由）
+        column_meta = self.get_column_metadata(table_name, schema)
+        conn = self._checkout()
         cursor = conn.cursor()
         
         try:
-            # IDENTITY列を確認
-            identity_check_query = """
-                SELECT COLUMN_NAME 
-                FROM INFORMATION_SCHEMA.COLUMNS 
-                WHERE TABLE_NAME = ? AND TABLE_SCHEMA = ? 
-                AND COLUMNPROPERTY(OBJECT_ID(TABLE_SCHEMA+'.'+TABLE_NAME), COLUMN_NAME, 'IsIdentity') = 1
-            """
-            cursor.execute(identity_check_query, (table_name, schema))
-            identity_columns = [row[0] for row in cursor.fetchall()]
+            identity_columns = [col["name"] for col in column_meta if col["is_identity"]]
             
             # カラム名と値を準備（IDENTITY列は除外）
             all_columns = list(data[0].keys())
@@ -194,53 +370,218 @@ class DockerE2EConnection:
             
             # IDENTITY_INSERTを有効にする必要がある場合
             identity_insert_needed = any(col in identity_columns for col in all_columns)
-            
             if identity_insert_needed and identity_columns:
                 # IDENTITY列も含める場合（明示的にIDを指定）
                 columns = all_columns
-                cursor.execute(f"SET IDENTITY_INSERT [{schema}].[{table_name}] ON")
-            
-            placeholders = ', '.join(['?' for _ in columns])
-            column_names = ', '.join([f'[{col}]' for col in columns])
-            
-            query = f"INSERT INTO [{schema}].[{table_name}] ({column_names}) VALUES ({placeholders})"
-            
-            # データを挿入
-            for row in data:
-                values = [row.get(col) for col in columns]
-                cursor.execute(query, values)
             
-            # IDENTITY_INSERTを無効にする
-            if identity_insert_needed and identity_columns:
-                cursor.execute(f"SET IDENTITY_INSERT [{schema}].[{table_name}] OFF")
+            if mode == "auto":
+                use_bcp = (
+                    len(data) >= int(os.getenv("E2E_BCP_THRESHOLD", "50000"))
+                    and self._find_bcp() is not None
+                    and self._isolated_connection() is None
+                )
+                mode = "bcp" if use_bcp else "executemany"
             
-            conn.commit()
-            logger.info(f"Inserted {len(data)} records into {schema}.{table_name}")
+            if mode == "bcp":
+                try:
+                    if self._isolated_connection() is not None:
+                        raise BcpUnavailableError("bcp runs outside the isolated() transaction")
+                    batches = self._bcp_insert(table_name, schema, columns, data, column_meta, batch_size)
+                except BcpUnavailableError as e:
+                    # 事前チェックで失敗した場合のみ（未ロードの状態で）executemanyへフォールバック
+                    logger.warning(f"bcp not usable for {schema}.{table_name}, falling back to executemany: {e}")
+                    mode = "executemany"
+            
+            if mode != "bcp":
+                if identity_insert_needed and identity_columns:
+                    cursor.execute(f"SET IDENTITY_INSERT [{schema}].[{table_name}] ON")
+                
+                placeholders = ', '.join(['?' for _ in columns])
+                column_names = ', '.join([f'[{col}]' for col in columns])
+                query = f"INSERT INTO [{schema}].[{table_name}] ({column_names}) VALUES ({placeholders})"
+                
+                if mode == "executemany":
+                    cursor.fast_executemany = True
+                    # 先頭行がNULLでも型が決まるよう、文字列列はサイズ付きでバインド
+                    types = {col["name"]: col for col in column_meta}
+                    cursor.setinputsizes([self._input_size(types.get(col)) for col in columns])
+                
+                # データを挿入（batch_size件毎にコミット）
+                batches = 0
+                for offset in range(0, len(data), batch_size):
+                    batch = [[row.get(col) for col in columns] for row in data[offset:offset + batch_size]]
+                    if mode == "executemany":
+                        cursor.executemany(query, batch)
+                    else:
+                        for values in batch:
+                            cursor.execute(query, values)
+                    self._commit(conn)
+                    batches += 1
+                
+                # IDENTITY_INSERTを無効にする
+                if identity_insert_needed and identity_columns:
+                    cursor.execute(f"SET IDENTITY_INSERT [{schema}].[{table_name}] OFF")
+                self._commit(conn)
             
         except Exception as e:
             # エラーが発生した場合もIDENTITY_INSERTを確実に無効にする
             try:
                 cursor.execute(f"SET IDENTITY_INSERT [{schema}].[{table_name}] OFF")
-                conn.commit()
+                self._commit(conn)
             except:
                 pass
             raise e
         finally:
-            conn.close()
+            self._checkin(conn)
+        
+        seconds = time.perf_counter() - started
+        stats = {
+            "rows": len(data),
+            "batches": batches,
+            "mode": mode,
+            "seconds": round(seconds, 3),
+            "rows_per_second": round(len(data) / seconds, 1) if seconds > 0 else 0.0,
+        }
+        logger.info(
+            f"Inserted {len(data)} records into {schema}.{table_name} "
+            f"({mode}, {batches} batches, {stats['rows_per_second']} rows/sec)"
+        )
+        return stats
     
-    def execute_pipeline_simulation(self, pipeline_name: str, parameters: Optional[Dict] = None) -> Dict:
-        """IRシミュレーターを使用してパイプライン実行をシミュレート（ハイブリッドフォールバック対応）"""
+    @staticmethod
+    def _input_size(column: Optional[Dict[str, Any]]):
+        """fast_executemany用のパラメータ型（文字列列のみ指定、それ以外はpyodbcの推論に任せる）
+
+        fast_executemanyは指定サイズ×行数のバッファを確保するため、
+        MAX型・text/ntext（最大長が約2GBとして報告される）はサイズ0のストリーム扱いにする
+        """
+        if column is None or not PYODBC_AVAILABLE:
+            return None
+        data_type = column["data_type"].lower()
+        max_length = column["max_length"] or 0
+        if data_type in ("nvarchar", "nchar", "ntext"):
+            lob = data_type == "ntext" or not 0 < max_length <= 4000
+            return (pyodbc.SQL_WVARCHAR, 0 if lob else max_length, 0)
+        if data_type in ("varchar", "char", "text"):
+            lob = data_type == "text" or not 0 < max_length <= 8000
+            return (pyodbc.SQL_VARCHAR, 0 if lob else max_length, 0)
+        return None
+    
+    @staticmethod
+    def _find_bcp() -> Optional[str]:
+        """bcpコマンドのパス（E2E_BCP_PATH > mssql-tools18の既定パス > PATH）"""
+        for candidate in (os.getenv("E2E_BCP_PATH"), "/opt/mssql-tools18/bin/bcp", shutil.which("bcp")):
+            if candidate and os.path.isfile(candidate) and os.access(candidate, os.X_OK):
+                return candidate
+        return None
+    
+    def _bcp_insert(self, table_name: str, schema: str, columns: List[str], data: List[Dict],
+                    column_meta: List[Dict[str, Any]], batch_size: int) -> int:
+        """タブ区切りの一時ファイルとフォーマットファイルを作成してbcpでロードし、バッチ数を返す"""
+        bcp = self._find_bcp()
+        if bcp is None:
+            raise BcpUnavailableError("bcp executable not found")
+        ordinals = {col["name"]: col["ordinal"] for col in column_meta}
+        missing = [col for col in columns if col not in ordinals]
+        if missing:
+            raise BcpUnavailableError(f"unknown columns: {missing}")
+        
+        with tempfile.TemporaryDirectory(prefix="e2e-bcp-") as work_dir:
+            data_path = os.path.join(work_dir, "data.tsv")
+            format_path = os.path.join(work_dir, "data.fmt")
+            with open(data_path, "w", encoding="utf-8", newline="") as f:
+                for row in data:
+                    f.write("\t".join(self._bcp_field(row.get(col)) for col in columns) + "\n")
+            
+            # 非XMLフォーマットファイルでファイル上の列をテーブル列（序数）へ対応付ける
+            lines = ["14.0", str(len(columns))]
+            for index, col in enumerate(columns, start=1):
+                terminator = "\\n" if index == len(columns) else "\\t"
+                lines.append(f'{index} SQLCHAR 0 0 "{terminator}" {ordinals[col]} {col} ""')
+            with open(format_path, "w", encoding="utf-8") as f:
+                f.write("\n".join(lines) + "\n")
+            
+            command = [
+                bcp, f"[{schema}].[{table_name}]", "in", data_path,
+                "-f", format_path,
+                "-S", f"{self.sql_host},{self.sql_port}",
+                "-d", self.sql_database,
+                "-C", "65001",  # データファイルはUTF-8
+                "-b", str(batch_size),
+                "-E",  # IDENTITY列の値をそのまま使用
+                "-k",  # 空フィールドはNULL（既定値で埋めない）
+                "-u",  # サーバー証明書を信頼（mssql-tools18）
+            ]
+            password_input = None
+            if os.getenv("E2E_BCP_TRUSTED_CONNECTION", "").lower() in ("1", "true", "yes"):
+                command.append("-T")
+            else:
+                # パスワードはプロセス一覧に出ないよう-Pで渡さず、bcpのプロンプトへ標準入力で渡す
+                command += ["-U", self.sql_user]
+                password_input = self.sql_password + "\n"
+            timeout = float(os.getenv("E2E_BCP_TIMEOUT", "600"))
+            try:
+                result = subprocess.run(command, input=password_input, capture_output=True, text=True,
+                                        timeout=timeout)
+            except subprocess.TimeoutExpired:
+                raise Exception(f"bcp did not finish within {timeout:.0f}s")
+            if result.returncode != 0:
+                raise Exception(f"bcp failed ({result.returncode}): {result.stdout.strip()} {result.stderr.strip()}")
+        
+        return (len(data) + batch_size - 1) // batch_size
+    
+    @staticmethod
+    def _bcp_field(value: Any) -> str:
+        """bcp文字モード用に値を文字列化（区切り文字・空文字を含む値はbcp不可）"""
+        if value is None:
+            return ""
+        if isinstance(value, bool):
+            return "1" if value else "0"
+        if isinstance(value, datetime):
+            return value.isoformat(sep=" ", timespec="milliseconds")
+        if isinstance(value, (bytes, bytearray)):
+            raise BcpUnavailableError("binary values are not supported")
+        text = str(value)
+        if text == "" or any(ch in text for ch in "\t\r\n"):
+            raise BcpUnavailableError("values containing tabs/newlines or empty strings are not supported")
+        return text
+    
+    def submit_pipeline_execution(self, pipeline_name: str, parameters: Optional[Dict] = None) -> str:
+        """IRシミュレーターへパイプライン実行を投入し、完了を待たずに実行IDを返す"""
         url = f"{self.ir_simulator_url}/pipeline-execution"
         payload = {
             "pipeline_name": pipeline_name,
             "parameters": parameters or {}
         }
-        
+        response = requests.post(url, params={"wait": "false"}, json=payload, timeout=10)
+        response.raise_for_status()
+        return response.json()["execution_id"]
+
+    def wait_for_execution(self, execution_id: str, timeout: float = 300, poll_interval: float = 0.2) -> Dict:
+        """実行状態をポーリングして終了状態（SUCCESS/FAILED/CANCELLED）まで待機"""
+        deadline = time.time() + timeout
+        while True:
+            status = self.get_execution_status(execution_id)
+            if status.get("status") in ["SUCCESS", "FAILED", "CANCELLED"]:
+                return status
+            if time.time() >= deadline:
+                status["status"] = "TIMEOUT"
+                status["error_message"] = f"Pipeline execution timed out after {timeout} seconds"
+                return status
+            time.sleep(poll_interval)
+            poll_interval = min(poll_interval * 2, 2.0)
+
+    def execute_pipeline_simulation(self, pipeline_name: str, parameters: Optional[Dict] = None,
+                                    timeout: float = 300) -> Dict:
+        """IRシミュレーターを使用してパイプライン実行をシミュレート（ハイブリッドフォールバック対応）
+
+        実行を投入した後は /execution-status をポーリングするため、長時間のパイプラインでも
+        HTTPリクエストを保持し続けない
+        """
         try:
             # 1st試行: IRシミュレーター利用
-            response = requests.post(url, json=payload, timeout=30)
-            response.raise_for_status()
-            return response.json()
+            execution_id = self.submit_pipeline_execution(pipeline_name, parameters)
+            return self.wait_for_execution(execution_id, timeout=timeout)
         except (requests.exceptions.RequestException, requests.exceptions.HTTPError) as e:
             # 2nd試行: エンハンスドローカルシミュレーション
             logger.warning(f"IR Simulator failed, falling back to enhanced local simulation: {str(e)}")
@@ -271,7 +612,33 @@ class DockerE2EConnection:
             # 2nd試行: ローカルCopyActivityシミュレーション
             logger.warning(f"IR Simulator failed for copy activity, falling back to local simulation: {str(e)}")
             return self._execute_local_copy_simulation(pipeline_name, activity_name, source_config, sink_config)
-    
+
+    def execute_copy_activities_batch(
+        self,
+        activities: List[Dict],
+        max_concurrency: Optional[int] = None,
+        timeout: int = 300
+    ) -> List[Dict]:
+        """複数のCopy Activityを1回のリクエストで実行（結果はactivitiesと同じ順序）
+
+        activitiesの各要素は pipeline_name, activity_name, source, sink を持つ辞書
+        """
+        url = f"{self.ir_simulator_url}/copy-activity/batch"
+        payload = {"activities": activities, "max_concurrency": max_concurrency}
+
+        try:
+            response = requests.post(url, json=payload, timeout=timeout)
+            response.raise_for_status()
+            return response.json()["results"]
+        except (requests.exceptions.RequestException, requests.exceptions.HTTPError) as e:
+            logger.warning(f"IR Simulator failed for copy activity batch, falling back to local simulation: {str(e)}")
+            return [
+                self._execute_local_copy_simulation(
+                    a["pipeline_name"], a["activity_name"], a.get("source", {}), a.get("sink", {})
+                )
+                for a in activities
+            ]
+
     def get_execution_status(self, execution_id: str) -> Dict:
         """実行状態を取得"""
         url = f"{self.ir_simulator_url}/execution-status/{execution_id}"
@@ -294,10 +661,15 @@ class DockerE2EConnection:
         source_sample = self.execute_query(f"SELECT TOP 5 * FROM [{source_schema}].[{source_table}] ORDER BY 1")
         target_sample = self.execute_query(f"SELECT TOP 5 * FROM [{target_schema}].[{target_table}] ORDER BY 1")
         
+        # 列構成の比較（スキーマキャッシュ経由）
+        source_columns = [col["name"] for col in self.get_column_metadata(source_table, source_schema)]
+        target_columns = [col["name"] for col in self.get_column_metadata(target_table, target_schema)]
+        
         return {
             "source_count": source_count,
             "target_count": target_count,
             "count_match": source_count == target_count,
+            "missing_columns": [col for col in source_columns if col not in target_columns],
             "source_sample": source_sample,
             "target_sample": target_sample,
             "validation_timestamp": datetime.now().isoformat()
@@ -356,8 +728,11 @@ class DockerE2EConnection:
             sink_table = sink_config.get("table_name") or sink_config.get("table", "sink_table")
             sink_schema = sink_config.get("schema", "dbo")
             
-            # データコピー実行
-            rows_copied = self._perform_local_data_copy(source_table, source_schema, sink_table, sink_schema)
+            # データコピー実行（ソースとシンクが同じサーバーならサーバー側でコピー可能）
+            same_server = all(config.get("server") in (None, self.sql_host) for config in (source_config, sink_config))
+            rows_copied = self._perform_local_data_copy(
+                source_table, source_schema, sink_table, sink_schema, server_side=same_server
+            )
             
             end_time = datetime.now()
             
@@ -701,47 +1076,109 @@ class DockerE2EConnection:
             "end_time": end_time.isoformat()
         }
     
-    def _perform_local_data_copy(self, source_table: str, source_schema: str, sink_table: str, sink_schema: str) -> int:
-        """ローカルデータコピー実行"""
-        # ソースデータを取得
-        source_data = self.execute_query(f"SELECT * FROM [{source_schema}].[{source_table}]")
+    def _perform_local_data_copy(self, source_table: str, source_schema: str, sink_table: str, sink_schema: str,
+                                 server_side: bool = True, chunk_size: Optional[int] = None) -> int:
+        """ローカルデータコピー実行
+
+        テーブル固有の変換が無く server_side=True の場合は INSERT ... SELECT でサーバー側コピーし、
+        それ以外はfetchmanyでchunk_size件ずつ読み出して変換・一括挿入する（全件をメモリに載せない）
+        """
+        chunk_size = chunk_size or int(os.getenv("E2E_COPY_CHUNK_SIZE", "5000"))
         
-        if not source_data:
+        # ソースが空ならターゲットには触れない
+        if not self.execute_query(f"SELECT TOP 1 1 AS found FROM [{source_schema}].[{source_table}]"):
             return 0
         
+        if server_side and not self._has_table_transform(source_table, sink_table):
+            try:
+                return self._server_side_copy(source_table, source_schema, sink_table, sink_schema)
+            except Exception as e:
+                # トランザクション内で失敗した場合のみ（ロールバック済みの状態で）ストリーミングへフォールバック
+                logger.warning(f"Server-side copy failed, falling back to streaming copy: {e}")
+        
         # ターゲットテーブルをクリア
         self.clear_table(sink_table, sink_schema)
         
-        # テーブル固有のデータ変換を実行
-        transformed_data = self._transform_data_for_table(source_data, source_table, sink_table)
+        rows_copied = 0
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"SELECT * FROM [{source_schema}].[{source_table}]")
+            columns = [column[0] for column in cursor.description]
+            # isolated()中は読み出しと挿入が同じ接続になるため、先に読み切る
+            fetched = cursor.fetchall() if self._isolated_connection() is not None else iter_rows(cursor, chunk_size)
+            source_rows = (dict(zip(columns, row)) for row in fetched)
+            
+            # テーブル固有のデータ変換をチャンク毎に適用して挿入
+            chunk = []
+            for row in self._iter_transformed_rows(source_rows, source_table, sink_table):
+                chunk.append(row)
+                if len(chunk) >= chunk_size:
+                    self.insert_test_data(sink_table, chunk, sink_schema, batch_size=chunk_size)
+                    rows_copied += len(chunk)
+                    chunk = []
+            if chunk:
+                self.insert_test_data(sink_table, chunk, sink_schema, batch_size=chunk_size)
+                rows_copied += len(chunk)
         
-        # データ挿入
-        self.insert_test_data(sink_table, transformed_data, sink_schema)
+        return rows_copied
+    
+    def _server_side_copy(self, source_table: str, source_schema: str, sink_table: str, sink_schema: str) -> int:
+        """共通列を INSERT ... SELECT でコピー（クリアと挿入を1トランザクションで実行）"""
+        source_columns = {col["name"] for col in self.get_column_metadata(source_table, source_schema)}
+        sink_meta = self.get_column_metadata(sink_table, sink_schema)
+        columns = [col["name"] for col in sink_meta if col["name"] in source_columns]
+        if not columns:
+            raise ValueError(f"No common columns between {source_schema}.{source_table} and {sink_schema}.{sink_table}")
+        identity_insert_needed = any(col["is_identity"] and col["name"] in source_columns for col in sink_meta)
         
-        return len(transformed_data)
+        column_names = ', '.join(f'[{col}]' for col in columns)
+        with self.transaction() as cursor:
+            cursor.execute(f"DELETE FROM [{sink_schema}].[{sink_table}]")
+            if identity_insert_needed:
+                cursor.execute(f"SET IDENTITY_INSERT [{sink_schema}].[{sink_table}] ON")
+            try:
+                cursor.execute(
+                    f"INSERT INTO [{sink_schema}].[{sink_table}] ({column_names}) "
+                    f"SELECT {column_names} FROM [{source_schema}].[{source_table}]"
+                )
+                rows_copied = cursor.rowcount
+            finally:
+                if identity_insert_needed:
+                    cursor.execute(f"SET IDENTITY_INSERT [{sink_schema}].[{sink_table}] OFF")
+        
+        logger.info(f"Server-side copy {source_schema}.{source_table} -> {sink_schema}.{sink_table}: {rows_copied} rows")
+        return rows_copied
+    
+    @staticmethod
+    def _has_table_transform(source_table: str, sink_table: str) -> bool:
+        """テーブル固有の変換が定義されているか"""
+        return source_table.lower() == "client_dm" and sink_table == "ClientDmBx"
     
     def _transform_data_for_table(self, source_data: List[Dict], source_table: str, sink_table: str) -> List[Dict]:
         """テーブル固有のデータ変換を実行"""
-        if source_table.lower() == "client_dm" and sink_table == "ClientDmBx":
-            # client_dm から ClientDmBx への変換
-            transformed_data = []
-            for i, row in enumerate(source_data, 1):
-                transformed_row = {
-                    "client_id": row["client_id"],
-                    "segment": "STANDARD",  # デフォルトセグメント
-                    "score": 75.5,  # デフォルトスコア
-                    "last_transaction_date": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    "total_amount": 1000.00,  # デフォルト金額
-                    "processed_date": datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
-                    "data_source": "ETL_COPY",
-                    "bx_flag": 1,  # True = 1
-                    "updated_at": datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                }
-                transformed_data.append(transformed_row)
-            return transformed_data
-        else:
+        return list(self._iter_transformed_rows(source_data, source_table, sink_table))
+    
+    def _iter_transformed_rows(self, source_rows: Iterable[Dict], source_table: str, sink_table: str) -> Iterator[Dict]:
+        """テーブル固有のデータ変換を1行ずつ適用（ジェネレーター）"""
+        if not self._has_table_transform(source_table, sink_table):
             # 他のテーブル間のコピーはそのまま
-            return source_data
+            yield from source_rows
+            return
+        
+        # client_dm から ClientDmBx への変換
+        for row in source_rows:
+            now = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            yield {
+                "client_id": row["client_id"],
+                "segment": "STANDARD",  # デフォルトセグメント
+                "score": 75.5,  # デフォルトスコア
+                "last_transaction_date": now,
+                "total_amount": 1000.00,  # デフォルト金額
+                "processed_date": now,
+                "data_source": "ETL_COPY",
+                "bx_flag": 1,  # True = 1
+                "updated_at": now
+            }
     
     def _log_pipeline_execution(self, execution_id: str, pipeline_name: str, activity_name: str, 
                                start_time: datetime, end_time: datetime, status: str,
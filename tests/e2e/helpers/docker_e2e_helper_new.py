@@ -179,7 +179,7 @@ class DockerE2EConnection:
         
         try:
             # 1st試行: IRシミュレーター利用
-            response = requests.post(url, json=payload, timeout=30)
+            response = requests.post(url, params={"wait": "true"}, json=payload, timeout=30)
             response.raise_for_status()
             return response.json()
         except (requests.exceptions.RequestException, requests.exceptions.HTTPError) as e:
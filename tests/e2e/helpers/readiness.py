@@ -0,0 +1,167 @@
+"""
+E2Eテスト用 依存サービスの起動待ち
+複数サービスを並行にプローブ（指数バックオフ＋ジッター）し、準備完了の結果をプロセス内と
+pytest-xdistのワーカー間（ファイルロック＋マーカーファイル）で共有して、最初の呼び出しだけが待機する
+
+マーカーファイルはxdistのテスト実行ID（PYTEST_XDIST_TESTRUNUID）毎に作成するため、別のテスト実行へは
+引き継がない。xdist無しの場合はプロセス内のキャッシュのみを使う。全サービスが準備完了した結果のみ共有する
+"""
+
+import hashlib
+import json
+import logging
+import os
+import random
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Optional
+
+# fcntlの条件付きインポート（Windowsではワーカー間の共有を行わない）
+try:
+    import fcntl
+    FCNTL_AVAILABLE = True
+except ImportError:
+    fcntl = None
+    FCNTL_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+_ready_results: Dict[str, Dict[str, Any]] = {}
+# keyごとの待機用ロック（_ready_lockは辞書の参照・更新のみに使い、プローブ中は保持しない）
+_key_locks: Dict[str, threading.Lock] = {}
+_ready_lock = threading.Lock()
+
+
+class ServiceProbe:
+    """1サービス分のプローブ設定（required=Falseのサービスは失敗しても警告のみ）"""
+
+    def __init__(self, name: str, check: Callable[[], None], required: bool = True, max_retries: int = 10):
+        self.name = name
+        self.check = check
+        self.required = required
+        self.max_retries = max_retries
+
+
+def probe_with_backoff(probe: ServiceProbe, base_delay: float, max_delay: float) -> Dict[str, Any]:
+    """checkが例外を出さなくなるまで指数バックオフ（equal jitter）で再試行"""
+    started = time.monotonic()
+    last_error = None
+    for attempt in range(probe.max_retries):
+        try:
+            probe.check()
+            elapsed = round(time.monotonic() - started, 3)
+            logger.info(f"{probe.name} is ready ({attempt + 1} attempts, {elapsed}s)")
+            return {"ready": True, "attempts": attempt + 1, "seconds": elapsed}
+        except Exception as e:
+            last_error = e
+            if attempt == probe.max_retries - 1:
+                break
+            backoff = min(max_delay, base_delay * (2 ** attempt))
+            sleep = backoff / 2 + random.uniform(0, backoff / 2)
+            logger.warning(f"{probe.name} not ready, attempt {attempt + 1}/{probe.max_retries} (retry in {sleep:.2f}s)")
+            time.sleep(sleep)
+    return {
+        "ready": False,
+        "attempts": probe.max_retries,
+        "seconds": round(time.monotonic() - started, 3),
+        "error": str(last_error),
+    }
+
+
+def wait_for_services(
+    key: str,
+    probes: Dict[str, ServiceProbe],
+    base_delay: float = 0.25,
+    max_delay: float = 8.0,
+) -> Dict[str, Dict[str, Any]]:
+    """全サービスを並行にプローブし、結果を返す（同じkeyの2回目以降はキャッシュを返す）
+
+    必須サービスが準備できなかった場合は例外を送出し、結果はキャッシュしない。
+    任意サービスが準備できなかった結果はプロセス内のみキャッシュし、他のワーカーへは共有しない
+    """
+    with _ready_lock:
+        cached = _ready_results.get(key)
+        if cached is not None:
+            return cached
+        key_lock = _key_locks.setdefault(key, threading.Lock())
+
+    # 同じkeyの呼び出しは最初の1件のプローブを待ち、別のkeyの呼び出しは並行して進める
+    with key_lock:
+        with _ready_lock:
+            cached = _ready_results.get(key)
+        if cached is not None:
+            return cached
+
+        with _worker_lock(key) as marker_path:
+            results = _read_marker(marker_path)
+            if results is None:
+                with ThreadPoolExecutor(max_workers=len(probes), thread_name_prefix="e2e-probe") as pool:
+                    futures = {
+                        name: pool.submit(probe_with_backoff, probe, base_delay, max_delay)
+                        for name, probe in probes.items()
+                    }
+                    results = {name: future.result() for name, future in futures.items()}
+
+                for name, probe in probes.items():
+                    result = results[name]
+                    if result["ready"]:
+                        continue
+                    if probe.required:
+                        raise Exception(
+                            f"{name} not available after {result['attempts']} attempts: {result['error']}"
+                        )
+                    logger.warning(f"{name} not available after {result['attempts']} attempts: {result['error']}")
+                if all(result["ready"] for result in results.values()):
+                    _write_marker(marker_path, results)
+            else:
+                logger.info("Services already verified by another worker")
+
+        with _ready_lock:
+            _ready_results[key] = results
+        return results
+
+
+def _marker_base(key: str, run_id: str) -> str:
+    digest = hashlib.sha1(f"{key}|{run_id}".encode("utf-8")).hexdigest()[:16]
+    return os.path.join(tempfile.gettempdir(), f"e2e-services-ready-{digest}")
+
+
+@contextmanager
+def _worker_lock(key: str):
+    """ワーカー間の排他（xdist無し・fcntlが無い環境ではロック・マーカー共有なし）"""
+    # xdistのワーカーは同じテスト実行IDを共有する
+    run_id = os.getenv("PYTEST_XDIST_TESTRUNUID")
+    if not run_id or not FCNTL_AVAILABLE:
+        yield None
+        return
+    base = _marker_base(key, run_id)
+    with open(f"{base}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield f"{base}.json"
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _read_marker(marker_path: Optional[str]) -> Optional[Dict[str, Any]]:
+    if marker_path is None or not os.path.exists(marker_path):
+        return None
+    try:
+        with open(marker_path, encoding="utf-8") as f:
+            marker = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return marker.get("results")
+
+
+def _write_marker(marker_path: Optional[str], results: Dict[str, Any]):
+    if marker_path is None:
+        return
+    try:
+        with open(marker_path, "w", encoding="utf-8") as f:
+            json.dump({"ready_at": time.time(), "results": results}, f)
+    except OSError as e:
+        logger.warning(f"Failed to write readiness marker: {e}")
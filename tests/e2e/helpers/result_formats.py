@@ -0,0 +1,95 @@
+"""
+E2Eテスト用 クエリ結果の取得形式
+execute_query の fetch_mode で、行毎の辞書生成を避けた取得方法を選べるようにする
+
+    dict     - 列名をキーとする辞書のリスト（既定・従来動作）
+    tuple    - pyodbc.Row（タプル互換、row.列名 でも参照可）のリスト
+    iterator - fetchmanyで少しずつ読み出すpyodbc.Rowのイテレーター
+    numpy    - {列名: numpy.ndarray} の列指向形式
+    pandas   - pandas.DataFrame
+
+列指向の形式（numpy/pandas）は列名で列を識別するため、重複する列名（別名の無いJOIN等）はValueErrorとする
+"""
+
+from typing import Any, Dict, Iterator, List
+
+# numpy/pandasの条件付きインポート（列指向の取得時のみ必要）
+try:
+    import numpy as np
+    NUMPY_AVAILABLE = True
+except ImportError:
+    np = None
+    NUMPY_AVAILABLE = False
+
+try:
+    import pandas as pd
+    PANDAS_AVAILABLE = True
+except ImportError:
+    pd = None
+    PANDAS_AVAILABLE = False
+
+FETCH_MODES = ("dict", "tuple", "iterator", "numpy", "pandas")
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def validate_fetch_mode(fetch_mode: str) -> str:
+    if fetch_mode not in FETCH_MODES:
+        raise ValueError(f"Unknown fetch_mode: {fetch_mode} (expected one of {', '.join(FETCH_MODES)})")
+    if fetch_mode == "numpy" and not NUMPY_AVAILABLE:
+        raise ImportError("numpy is not available - use fetch_mode='tuple' or 'dict'")
+    if fetch_mode == "pandas" and not PANDAS_AVAILABLE:
+        raise ImportError("pandas is not available - use fetch_mode='tuple' or 'dict'")
+    return fetch_mode
+
+
+def iter_rows(cursor, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[Any]:
+    """カーソルからchunk_size件ずつ読み出して1行ずつ返す"""
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            return
+        yield from rows
+
+
+def fetch_results(cursor, fetch_mode: str = "dict", chunk_size: int = DEFAULT_CHUNK_SIZE):
+    """実行済みカーソルの結果をfetch_modeの形式で全件取得（iteratorは呼び出し側で扱う）"""
+    columns = [column[0] for column in cursor.description]
+    if fetch_mode == "dict":
+        return [dict(zip(columns, row)) for row in cursor.fetchall()]
+    if fetch_mode == "tuple":
+        return cursor.fetchall()
+    if fetch_mode in ("numpy", "pandas"):
+        return _fetch_columnar(cursor, columns, fetch_mode, chunk_size)
+    raise ValueError(f"fetch_mode '{fetch_mode}' cannot be fetched eagerly")
+
+
+def row_count(results) -> int:
+    """取得結果の行数（numpy形式は列配列の長さ）"""
+    if isinstance(results, dict):
+        return len(next(iter(results.values()), []))
+    return len(results)
+
+
+def _fetch_columnar(cursor, columns: List[str], fetch_mode: str, chunk_size: int):
+    duplicates = sorted({column for column in columns if columns.count(column) > 1})
+    if duplicates:
+        raise ValueError(
+            f"fetch_mode '{fetch_mode}' requires unique column names, duplicated: {', '.join(duplicates)} "
+            "(add column aliases or use fetch_mode='tuple')"
+        )
+    # 行を辞書化せず、チャンク毎に列方向へ転置して蓄積する
+    values: List[List[Any]] = [[] for _ in columns]
+    while True:
+        rows = cursor.fetchmany(chunk_size)
+        if not rows:
+            break
+        for index, column_values in enumerate(zip(*rows)):
+            values[index].extend(column_values)
+    if fetch_mode == "pandas":
+        return pd.DataFrame({column: values[index] for index, column in enumerate(columns)}, columns=columns)
+    arrays: Dict[str, Any] = {}
+    for index, column in enumerate(columns):
+        # NULLを含む列はobject型のまま保持する
+        dtype = object if any(value is None for value in values[index]) else None
+        arrays[column] = np.array(values[index], dtype=dtype)
+    return arrays
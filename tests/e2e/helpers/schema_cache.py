@@ -0,0 +1,116 @@
+"""
+E2Eテスト用 スキーマメタデータキャッシュ
+テーブル毎（schema.table）の列定義をセッション中保持し、INFORMATION_SCHEMAへの繰り返し問い合わせを避ける
+"""
+
+import logging
+import re
+import threading
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# 識別子（[区切り]・"区切り"・通常の名前）と、ドットで区切った複数部分の名前（db.schema.table）
+_IDENTIFIER = r'(?:\[(?:[^\]]|\]\])+\]|"(?:[^"]|"")+"|[\w#@$]+)'
+_NAME = rf"{_IDENTIFIER}(?:\s*\.\s*{_IDENTIFIER})*"
+
+# テーブル定義を変更する文（CREATE/ALTER/TRUNCATE TABLE, DROP TABLE（複数指定可）, SELECT ... INTO）
+_DDL_PATTERN = re.compile(
+    rf"\b(?:CREATE|ALTER|TRUNCATE)\s+TABLE\s+(?P<table>{_NAME})"
+    rf"|\bDROP\s+TABLE\s+(?:IF\s+EXISTS\s+)?(?P<dropped>{_NAME}(?:\s*,\s*{_NAME})*)"
+    rf"|\bINTO\s+(?P<into>{_NAME})\s+FROM\b",
+    re.IGNORECASE,
+)
+
+
+def table_key(table_name: str, schema: str = "dbo") -> str:
+    """キャッシュキー（大文字小文字を区別しない schema.table）"""
+    return f"{schema}.{table_name}".lower()
+
+
+def _unquote(identifier: str) -> str:
+    if identifier.startswith("["):
+        return identifier[1:-1].replace("]]", "]")
+    if identifier.startswith('"'):
+        return identifier[1:-1].replace('""', '"')
+    return identifier
+
+
+def _parse_table_name(name: str) -> str:
+    """[db].[schema].[table] 形式の名前をキャッシュキーに変換（スキーマ省略時はdbo）"""
+    parts = [_unquote(part) for part in re.findall(_IDENTIFIER, name)]
+    if len(parts) == 1:
+        return table_key(parts[0])
+    return table_key(parts[-1], parts[-2])
+
+
+def ddl_table_keys(sql: str) -> List[str]:
+    """SQL文が定義を変更するテーブルのキャッシュキー（変更しなければ空）"""
+    keys = []
+    for match in _DDL_PATTERN.finditer(sql):
+        if match.group("dropped"):
+            names = [m.group(0) for m in re.finditer(_NAME, match.group("dropped"))]
+        else:
+            names = [match.group("table") or match.group("into")]
+        keys.extend(_parse_table_name(name) for name in names)
+    return keys
+
+
+class SchemaMetadataCache:
+    """テーブル列定義のスレッドセーフなキャッシュ
+
+    値は列順の辞書リスト（name, data_type, is_nullable, default, max_length, ordinal, is_identity）。
+    テーブルが存在しない（列が0件の）場合はキャッシュしない
+    """
+
+    def __init__(self):
+        self._entries: Dict[str, List[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "invalidations": 0}
+
+    def get(self, table_name: str, schema: str, loader: Callable[[], List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """キャッシュ済みの列定義を返す（未取得ならloaderで取得）"""
+        key = table_key(table_name, schema)
+        with self._lock:
+            columns = self._entries.get(key)
+            self._stats["hits" if columns is not None else "misses"] += 1
+        if columns is None:
+            columns = loader()
+            if columns:
+                with self._lock:
+                    self._entries[key] = columns
+        return columns
+
+    def invalidate(self, table_name: Optional[str] = None, schema: str = "dbo"):
+        """指定テーブル（未指定時は全テーブル）のキャッシュを破棄"""
+        with self._lock:
+            if table_name is None:
+                self._entries.clear()
+            else:
+                self._entries.pop(table_key(table_name, schema), None)
+            self._stats["invalidations"] += 1
+
+    def invalidate_for_statement(self, sql: str):
+        """SQL文がテーブル定義を変更する場合、対象テーブルのキャッシュを破棄"""
+        for key in ddl_table_keys(sql):
+            with self._lock:
+                self._entries.pop(key, None)
+                self._stats["invalidations"] += 1
+            logger.debug(f"Schema cache invalidated for {key}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return dict(self._stats, tables=len(self._entries))
+
+
+_shared_caches: Dict[str, SchemaMetadataCache] = {}
+_shared_caches_lock = threading.Lock()
+
+
+def get_shared_schema_cache(key: str) -> SchemaMetadataCache:
+    """接続先（key）毎にプロセス内で1つのキャッシュを共有"""
+    with _shared_caches_lock:
+        cache = _shared_caches.get(key)
+        if cache is None:
+            cache = _shared_caches[key] = SchemaMetadataCache()
+        return cache
@@ -0,0 +1,146 @@
+"""
+E2Eテスト用 SQLスクリプトの分割・文種別判定
+GO区切りのバッチ分割・文のリストの連結と、結果セットを返す文か（CTEを含む）の判定を行う
+"""
+
+import re
+from typing import List, Tuple
+
+# GO（任意で繰り返し回数）だけの行がバッチ区切り（ブロックコメント・文字列リテラルの内側は除く）
+_GO_PATTERN = re.compile(r"^\s*GO(?:\s+(\d+))?\s*;?\s*(?:--.*)?$", re.IGNORECASE)
+# コメントと文字列リテラルを先頭から順に照合する（文字列内の -- やコメント内の ' を誤認しない）
+_SKIP_PATTERN = re.compile(r"(?P<comment>--[^\n]*|/\*.*?\*/)|(?P<literal>'(?:[^']|'')*')", re.DOTALL)
+_TOKEN_PATTERN = re.compile(r"[()]|[A-Za-z_][A-Za-z0-9_]*")
+
+# CTEの後に続く本体の文
+_CTE_BODY_KEYWORDS = ("SELECT", "INSERT", "UPDATE", "DELETE", "MERGE")
+# CREATE/ALTER の後に続くとバッチ内で唯一の文でなければならないオブジェクト
+_OWN_BATCH_OBJECTS = ("VIEW", "PROCEDURE", "PROC", "FUNCTION", "TRIGGER", "SCHEMA", "DEFAULT", "RULE")
+
+
+def split_batches(script: str) -> List[str]:
+    """スクリプトをGO行で分割（GO n は直前のバッチをn回実行、空のバッチは除外）
+
+    複数行にわたるブロックコメント・文字列リテラルの中のGO行では分割しない
+    """
+    batches: List[str] = []
+    lines: List[str] = []
+    comment_depth, in_literal = 0, False
+    for line in script.splitlines():
+        match = None if comment_depth or in_literal else _GO_PATTERN.match(line)
+        if match is None:
+            lines.append(line)
+            comment_depth, in_literal = _scan_line(line, comment_depth, in_literal)
+            continue
+        batch = "\n".join(lines).strip()
+        if batch:
+            batches.extend([batch] * int(match.group(1) or 1))
+        lines = []
+    batch = "\n".join(lines).strip()
+    if batch:
+        batches.append(batch)
+    return batches
+
+
+def _scan_line(line: str, comment_depth: int, in_literal: bool) -> Tuple[int, bool]:
+    """1行を読み進め、行末でのブロックコメントの深さ（入れ子可）と文字列リテラル内かを返す"""
+    index, length = 0, len(line)
+    while index < length:
+        pair = line[index:index + 2]
+        if in_literal:
+            if pair == "''":
+                index += 2
+                continue
+            if line[index] == "'":
+                in_literal = False
+        elif comment_depth:
+            if pair == "/*":
+                comment_depth += 1
+                index += 2
+                continue
+            if pair == "*/":
+                comment_depth -= 1
+                index += 2
+                continue
+        elif pair == "--":
+            break
+        elif pair == "/*":
+            comment_depth += 1
+            index += 2
+            continue
+        elif line[index] == "'":
+            in_literal = True
+        elif line[index] in '["':
+            # 区切り識別子（[O'Brien] 等）の中の ' はリテラルの開始ではない
+            closing = line.find("]" if line[index] == "[" else '"', index + 1)
+            index = length if closing < 0 else closing
+        index += 1
+    return comment_depth, in_literal
+
+
+def join_statements(statements: List[str]) -> str:
+    """文のリストを1つのバッチに連結したスクリプトを返す（split_batchesで分割できる形式）
+
+    各文は改行と ; で区切る（末尾の -- コメントに ; が隠れないよう改行してから付ける）。
+    バッチ内で唯一の文でなければならない文（CREATE VIEW/PROCEDURE/FUNCTION/TRIGGER 等）と、
+    GO区切りを含む文は前後にGO行を入れて単独のバッチにする
+    """
+    parts: List[str] = []
+    previous_alone = False
+    for sql in statements:
+        sql = sql.strip()
+        if not sql:
+            continue
+        alone = must_start_batch(sql) or len(split_batches(sql)) > 1
+        if parts and (alone or previous_alone):
+            parts.append("GO")
+        parts.append(sql if alone else sql.rstrip(";").rstrip() + "\n;")
+        previous_alone = alone
+    return "\n".join(parts)
+
+
+def _tokens(sql: str) -> List[str]:
+    """コメント・文字列リテラルを除いたキーワード・識別子と括弧の列（先頭の括弧は除く）"""
+    def skip(match):
+        return " " if match.group("comment") is not None else "''"
+
+    tokens = _TOKEN_PATTERN.findall(_SKIP_PATTERN.sub(skip, sql))
+    # 先頭の括弧（(SELECT ...) UNION ... 等）は読み飛ばす
+    while tokens and tokens[0] == "(":
+        tokens.pop(0)
+    return tokens
+
+
+def must_start_batch(sql: str) -> bool:
+    """バッチ内で唯一の文でなければならない文か（CREATE [OR ALTER]/ALTER の VIEW・PROCEDURE・FUNCTION・TRIGGER 等）"""
+    tokens = [token.upper() for token in _tokens(sql)[:4]]
+    if tokens[:1] not in (["CREATE"], ["ALTER"]):
+        return False
+    if tokens[1:3] == ["OR", "ALTER"]:
+        tokens = tokens[2:]
+    return len(tokens) > 1 and tokens[1] in _OWN_BATCH_OBJECTS
+
+
+def statement_kind(sql: str) -> str:
+    """文の種別（先頭のキーワード、WITH句はCTE本体の文）を大文字で返す"""
+    tokens = _tokens(sql)
+    if not tokens:
+        return ""
+    first = tokens[0].upper()
+    if first != "WITH":
+        return first
+    # CTE定義（括弧内）を読み飛ばし、括弧の外で最初に現れる本体のキーワードを探す
+    depth = 0
+    for token in tokens[1:]:
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+        elif depth == 0 and token.upper() in _CTE_BODY_KEYWORDS:
+            return token.upper()
+    return first
+
+
+def returns_rows(sql: str) -> bool:
+    """結果セットを返す文か（SELECT、およびSELECTを本体とするCTE）"""
+    return statement_kind(sql) == "SELECT"
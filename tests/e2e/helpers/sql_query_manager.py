@@ -2,12 +2,408 @@
 
 import os
 import re
+import json
+import hashlib
 import logging
-from typing import Dict, Optional, List
+import tempfile
+import threading
+from typing import Any, Dict, NamedTuple, Optional, List, Tuple
 from pathlib import Path
 
 logger = logging.getLogger(__name__)
 
+# Comments, string literals and delimited identifiers are matched first so that placeholders
+# inside them are handled explicitly
+_TOKEN_PATTERN = re.compile(
+    r"(?P<comment>--[^\n]*|/\*.*?\*/)"
+    r"|(?P<literal>(?:(?<!\w)[Nn])?'(?:[^']|'')*')"
+    r'|(?P<identifier>\[(?:[^\]]|\]\])*\]|"(?:[^"]|"")*")'
+    r"|(?<![\w@#$])(?i:TOP)\s+\{(?P<top>[A-Za-z_]\w*)\}"
+    r"|\{(?P<name>[A-Za-z_]\w*)\}",
+    re.DOTALL,
+)
+_PLACEHOLDER_PATTERN = re.compile(r"\{([A-Za-z_]\w*)\}")
+
+
+class CompiledQuery(NamedTuple):
+    """SQL template with {param} placeholders turned into ? bind markers"""
+    sql: str
+    param_names: Tuple[str, ...]
+
+    def bind(self, params: Dict[str, Any]) -> Tuple[Any, ...]:
+        """Build the positional parameter tuple for this query
+        
+        Args:
+            params: Parameter values by name (unused names are ignored)
+            
+        Returns:
+            Parameter values in bind-marker order
+        """
+        missing = [name for name in dict.fromkeys(self.param_names) if name not in params]
+        if missing:
+            raise KeyError(f"Missing query parameters: {missing}")
+        return tuple(params[name] for name in self.param_names)
+
+
+def compile_query(query: str) -> CompiledQuery:
+    """Compile {param} placeholders into ? bind markers
+    
+    A placeholder that is the whole string literal ('{param}' or N'{param}') becomes a
+    single bind marker. Placeholders embedded in a longer literal or in a delimited
+    identifier ([...] or "...") cannot be bound and raise ValueError; placeholders in
+    comments are left untouched. TOP {n} becomes TOP (?), since SQL Server only accepts
+    a parameter as the TOP count when it is parenthesized.
+    
+    Args:
+        query: SQL text with {param} placeholders
+        
+    Returns:
+        CompiledQuery with the rewritten SQL and the parameter names in order
+    """
+    names: List[str] = []
+    
+    def replace(match):
+        if match.group("comment") is not None:
+            return match.group(0)
+        if match.group("identifier") is not None:
+            if _PLACEHOLDER_PATTERN.search(match.group("identifier")):
+                raise ValueError(f"Placeholder inside identifier cannot be bound: {match.group('identifier')}")
+            return match.group(0)
+        if match.group("top") is not None:
+            names.append(match.group("top"))
+            return match.group(0)[:3] + " (?)"
+        if match.group("name") is not None:
+            names.append(match.group("name"))
+            return "?"
+        literal = match.group("literal")
+        body = literal[literal.index("'") + 1:-1]
+        placeholder = _PLACEHOLDER_PATTERN.fullmatch(body)
+        if placeholder:
+            names.append(placeholder.group(1))
+            return "?"
+        if _PLACEHOLDER_PATTERN.search(body):
+            raise ValueError(f"Placeholder inside string literal cannot be bound: {literal}")
+        return literal
+    
+    sql = _TOKEN_PATTERN.sub(replace, query)
+    return CompiledQuery(sql, tuple(names))
+
+
+def _format_query(query: str) -> str:
+    """Format SQL query string"""
+    # Remove empty lines
+    lines = [line for line in query.split('\n') if line.strip()]
+    return '\n'.join(lines)
+
+
+def parse_query_file(content: str) -> Dict[str, Dict[str, str]]:
+    """Parse -- @name: queries from SQL file content
+    
+    Args:
+        content: SQL file content
+        
+    Returns:
+        Dictionary of query_name: {"sql": ..., "description": ...}
+    """
+    queries = {}
+    current_query_name = None
+    current_description = ""
+    current_query_lines = []
+    
+    def save():
+        if current_query_name and current_query_lines:
+            query_sql = '\n'.join(current_query_lines).strip()
+            if query_sql:
+                queries[current_query_name] = {"sql": _format_query(query_sql), "description": current_description}
+    
+    for line in content.split('\n'):
+        line = line.strip()
+        
+        # Detect @name annotation
+        if line.startswith('-- @name:'):
+            # Save previous query
+            save()
+            
+            # Start new query
+            current_query_name = line.replace('-- @name:', '').strip()
+            current_description = ""
+            current_query_lines = []
+            
+        elif current_query_name:
+            # Skip comment lines (except @name annotations)
+            if not line.startswith('--') or line.startswith('-- @'):
+                if line.startswith('-- @description:'):
+                    current_description = line.replace('-- @description:', '').strip()
+                    continue
+                current_query_lines.append(line)
+    
+    # Save last query
+    save()
+    
+    return queries
+
+
+class CachedSQLFile(NamedTuple):
+    """Parsed SQL file as stored in the process-wide cache"""
+    content: str
+    queries: Dict[str, str]
+    content_hash: str
+    mtime_ns: int
+    size: int
+
+
+class SQLFileCache:
+    """Process-wide, thread-safe cache of parsed SQL files
+    
+    Entries are keyed by resolved path and revalidated against the file's mtime and size on
+    each lookup (hot reload). A changed file is re-read; it is only re-parsed when its content
+    hash differs. Set E2E_SQL_HOT_RELOAD=false to skip the stat call once a file is cached.
+    """
+    
+    def __init__(self):
+        self._entries: Dict[str, CachedSQLFile] = {}
+        self._lock = threading.RLock()
+        self.hot_reload = os.getenv("E2E_SQL_HOT_RELOAD", "true").lower() != "false"
+        self.stats = {"hits": 0, "loads": 0, "reloads": 0}
+    
+    def get(self, file_path: Path, parse) -> CachedSQLFile:
+        """Get the cached entry for file_path, loading or reloading it as needed
+        
+        Args:
+            file_path: Path of the SQL file
+            parse: Callable that parses file content into {query_name: sql}
+            
+        Returns:
+            CachedSQLFile for the current file content
+        """
+        key = str(Path(file_path).resolve())
+        entry = self._entries.get(key)
+        if entry is not None and not self.hot_reload:
+            self.stats["hits"] += 1
+            return entry
+        
+        stat = os.stat(key)
+        if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+            self.stats["hits"] += 1
+            return entry
+        
+        with self._lock:
+            # Another thread may have loaded it while we waited
+            entry = self._entries.get(key)
+            if entry is not None and entry.mtime_ns == stat.st_mtime_ns and entry.size == stat.st_size:
+                return entry
+            
+            with open(key, 'r', encoding='utf-8') as f:
+                content = f.read()
+            content_hash = hashlib.sha256(content.encode('utf-8')).hexdigest()
+            
+            if entry is not None and entry.content_hash == content_hash:
+                # Touched but unchanged: keep parsed queries
+                entry = entry._replace(mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            else:
+                if entry is not None:
+                    self.stats["reloads"] += 1
+                    logger.info(f"Reloading changed SQL file: {key}")
+                else:
+                    self.stats["loads"] += 1
+                entry = CachedSQLFile(content, parse(content), content_hash, stat.st_mtime_ns, stat.st_size)
+            self._entries[key] = entry
+            return entry
+    
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+# Shared by every E2ESQLQueryManager in the process
+_sql_file_cache = SQLFileCache()
+
+# Compiled templates by query content hash
+_compiled_queries: Dict[str, CompiledQuery] = {}
+
+
+INDEX_FILENAME = ".query_index.json"
+QUERY_INDEX_VERSION = 1
+
+
+class QueryIndex:
+    """Serialized index of every -- @name: query in a SQL directory
+    
+    Stored as JSON (default <base_path>/.query_index.json, override with E2E_SQL_QUERY_INDEX)
+    with each query's SQL, description, parameters and content hash. A stored index is loaded
+    as-is on first lookup; each lookup then stats only the file it reads from, re-indexing it
+    when its mtime/size and content hash changed. The directory is rescanned (refresh) only
+    when there is no stored index or a query name is not found, e.g. after a file was added.
+    Set E2E_SQL_HOT_RELOAD=false to skip the per-lookup stat as well.
+    """
+    
+    def __init__(self, base_path: Path, index_path: Optional[Path] = None):
+        self.base_path = Path(base_path)
+        self.index_path = Path(index_path or os.getenv("E2E_SQL_QUERY_INDEX") or self.base_path / INDEX_FILENAME)
+        self._files: Optional[Dict[str, Dict[str, Any]]] = None
+        self._by_name: Dict[str, List[str]] = {}
+        self._lock = threading.RLock()
+        self.hot_reload = os.getenv("E2E_SQL_HOT_RELOAD", "true").lower() != "false"
+    
+    def refresh(self) -> bool:
+        """Load the index and bring it up to date with the source files
+        
+        Returns:
+            True if the index had to be rebuilt (and was rewritten)
+        """
+        with self._lock:
+            stored = self._read()
+            files: Dict[str, Dict[str, Any]] = {}
+            changed = set(stored) != {path.name for path in self.base_path.glob("*.sql")}
+            
+            for path in sorted(self.base_path.glob("*.sql")):
+                stat = path.stat()
+                entry = stored.get(path.name)
+                if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                    files[path.name] = entry
+                    continue
+                
+                content = path.read_text(encoding="utf-8")
+                content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+                if entry and entry["hash"] == content_hash:
+                    entry = dict(entry, mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                else:
+                    entry = self._index_file(content, content_hash, stat)
+                    logger.debug(f"Indexed {len(entry['queries'])} queries from {path.name}")
+                files[path.name] = entry
+                changed = True
+            
+            self._files, self._by_name = files, self._names_of(files)
+            
+            if changed:
+                self._write()
+            return changed
+    
+    def files(self) -> Dict[str, Dict[str, Any]]:
+        if self._files is None:
+            with self._lock:
+                stored = self._read() if self._files is None else None
+                if stored:
+                    self._files, self._by_name = stored, self._names_of(stored)
+            if self._files is None:
+                self.refresh()
+        return self._files
+    
+    def get(self, filename: str, query_name: str) -> Optional[Dict[str, Any]]:
+        """Get the index entry (sql, description, parameters, hash) of a query
+        
+        Only the given file is checked for changes.
+        """
+        self.files()
+        entry = self._revalidate(filename)
+        return entry["queries"].get(query_name) if entry else None
+    
+    def file_queries(self, filename: str) -> Optional[Dict[str, Dict[str, Any]]]:
+        """Get the index entries of every query in a file (None if the file does not exist)"""
+        self.files()
+        entry = self._revalidate(filename)
+        return entry["queries"] if entry else None
+    
+    def find(self, query_name: str) -> List[str]:
+        """Get the files that define query_name (rescans the directory if it is not indexed)"""
+        self.files()
+        files = [filename for filename in self._by_name.get(query_name, [])
+                 if query_name in ((self._revalidate(filename) or {}).get("queries") or {})]
+        if not files:
+            self.refresh()
+            files = list(self._by_name.get(query_name, []))
+        return files
+    
+    def list_all(self) -> Dict[str, List[str]]:
+        """Get {filename: [query names]} for every indexed file"""
+        return {filename: list(entry["queries"]) for filename, entry in self.files().items()}
+    
+    def _revalidate(self, filename: str) -> Optional[Dict[str, Any]]:
+        """Re-index a single file if it changed since it was indexed (None if it does not exist)"""
+        path = self.base_path / filename
+        with self._lock:
+            entry = self._files.get(filename)
+            if entry is not None and not self.hot_reload:
+                return entry
+            try:
+                stat = path.stat()
+            except OSError:
+                if entry is not None:
+                    self._files = {name: e for name, e in self._files.items() if name != filename}
+                    self._by_name = self._names_of(self._files)
+                    self._write()
+                return None
+            if entry and entry["mtime_ns"] == stat.st_mtime_ns and entry["size"] == stat.st_size:
+                return entry
+            
+            content = path.read_text(encoding="utf-8")
+            content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+            if entry and entry["hash"] == content_hash:
+                entry = dict(entry, mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            else:
+                entry = self._index_file(content, content_hash, stat)
+                logger.info(f"Re-indexed changed SQL file: {filename}")
+            self._files = dict(self._files, **{filename: entry})
+            self._by_name = self._names_of(self._files)
+            self._write()
+            return entry
+    
+    @staticmethod
+    def _names_of(files: Dict[str, Dict[str, Any]]) -> Dict[str, List[str]]:
+        by_name: Dict[str, List[str]] = {}
+        for filename, entry in files.items():
+            for query_name in entry["queries"]:
+                by_name.setdefault(query_name, []).append(filename)
+        return by_name
+    
+    @staticmethod
+    def _index_file(content: str, content_hash: str, stat) -> Dict[str, Any]:
+        queries = {}
+        for name, query in parse_query_file(content).items():
+            queries[name] = {
+                "sql": query["sql"],
+                "description": query["description"],
+                "parameters": list(dict.fromkeys(_PLACEHOLDER_PATTERN.findall(query["sql"]))),
+                "hash": hashlib.sha256(query["sql"].encode("utf-8")).hexdigest(),
+            }
+        return {"hash": content_hash, "mtime_ns": stat.st_mtime_ns, "size": stat.st_size, "queries": queries}
+    
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if index.get("version") != QUERY_INDEX_VERSION:
+            return {}
+        return index.get("files", {})
+    
+    def _write(self):
+        # Write atomically so concurrent test processes never read a partial index
+        try:
+            fd, tmp_path = tempfile.mkstemp(prefix=".query_index.", dir=str(self.index_path.parent))
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"version": QUERY_INDEX_VERSION, "files": self._files}, f, ensure_ascii=False)
+            os.replace(tmp_path, self.index_path)
+            logger.info(f"Wrote query index: {self.index_path}")
+        except OSError as e:
+            # Read-only checkout: keep the index in memory only
+            logger.debug(f"Could not write query index {self.index_path}: {e}")
+
+
+_query_indexes: Dict[str, QueryIndex] = {}
+_query_indexes_lock = threading.Lock()
+
+
+def get_query_index(base_path: Path) -> QueryIndex:
+    """Get the process-wide QueryIndex for a SQL directory"""
+    key = str(Path(base_path).resolve())
+    with _query_indexes_lock:
+        index = _query_indexes.get(key)
+        if index is None:
+            index = _query_indexes[key] = QueryIndex(Path(key))
+        return index
+
 
 class E2ESQLQueryManager:
     """E2E SQL Query Manager Class for managing external SQL queries"""
@@ -22,8 +418,8 @@ class E2ESQLQueryManager:
         current_dir = Path(__file__).parent.parent.parent.parent
         self.base_path = current_dir / "sql" / "e2e_queries"
         
+        # Files loaded through this manager; parsed content lives in the process-wide cache
         self._query_cache: Dict[str, Dict[str, str]] = {}
-        self._file_cache: Dict[str, str] = {}
         self._current_filename = filename
         
         # Load queries if filename is provided
@@ -41,33 +437,37 @@ class E2ESQLQueryManager:
         Returns:
             Dictionary of query_name: query_sql
         """
+        return self._get_cached_file(filename).queries
+    
+    def warm_up(self) -> int:
+        """Eagerly load and parse every SQL file in base_path into the shared cache
+        
+        Returns:
+            Number of files loaded
+        """
+        files = self.list_files()
+        for filename in files:
+            self._get_cached_file(filename)
+        logger.info(f"Warmed up SQL cache with {len(files)} files")
+        return len(files)
+    
+    def _get_cached_file(self, filename: str) -> CachedSQLFile:
+        """Get a file from the process-wide cache (loaded lazily, reloaded when changed)"""
         file_path = self.base_path / filename
         
         if not file_path.exists():
             raise FileNotFoundError(f"SQL file not found: {file_path}")
         
-        # Check file cache
-        if filename in self._file_cache:
-            logger.debug(f"Using cached content for {filename}")
-            return self._query_cache[filename]
-        
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Cache file content
-            self._file_cache[filename] = content
-            
-            # Parse queries
-            queries = self._parse_queries(content)
-            self._query_cache[filename] = queries
-            
-            logger.info(f"Loaded {len(queries)} queries from {filename}")
-            return queries
-            
+            entry = _sql_file_cache.get(file_path, self._parse_queries)
         except Exception as e:
             logger.error(f"Failed to load SQL file {filename}: {e}")
             raise
+        
+        if self._query_cache.get(filename) is not entry.queries:
+            self._query_cache[filename] = entry.queries
+            logger.debug(f"Loaded {len(entry.queries)} queries from {filename}")
+        return entry
     
     def get_query(self, query_name: str, filename: str = None, **params) -> str:
         """Get SQL query by name
@@ -80,22 +480,7 @@ class E2ESQLQueryManager:
         Returns:
             SQL query string with parameters substituted
         """
-        # Use first cached file if filename not specified
-        if filename is None:
-            if not self._query_cache:
-                raise ValueError("No SQL files loaded. Please specify filename or load a file first.")
-            filename = next(iter(self._query_cache.keys()))
-        
-        # Load file if not cached
-        if filename not in self._query_cache:
-            self.load_queries_from_file(filename)
-        
-        # Get query
-        if query_name not in self._query_cache[filename]:
-            available_queries = list(self._query_cache[filename].keys())
-            raise KeyError(f"Query '{query_name}' not found in {filename}. Available queries: {available_queries}")
-        
-        query = self._query_cache[filename][query_name]
+        filename, query = self._get_raw_query(query_name, filename)
         
         # Parameter substitution
         if params:
@@ -103,50 +488,83 @@ class E2ESQLQueryManager:
         
         return query
     
-    def _parse_queries(self, content: str) -> Dict[str, str]:
-        """Parse queries from SQL file content"""
-        queries = {}
-        current_query_name = None
-        current_query_lines = []
+    def get_compiled_query(self, query_name: str, filename: str = None) -> CompiledQuery:
+        """Get a query with {param} placeholders compiled into ? bind markers
         
-        lines = content.split('\n')
+        The compiled template is cached by the query's content hash.
         
-        for line in lines:
-            line = line.strip()
+        Args:
+            query_name: Name of the query to retrieve
+            filename: Optional filename if not using default
             
-            # Detect @name annotation
-            if line.startswith('-- @name:'):
-                # Save previous query
-                if current_query_name and current_query_lines:
-                    query_sql = '\n'.join(current_query_lines).strip()
-                    if query_sql:
-                        queries[current_query_name] = self._format_query(query_sql)
-                
-                # Start new query
-                current_query_name = line.replace('-- @name:', '').strip()
-                current_query_lines = []
-                
-            elif current_query_name:
-                # Skip comment lines (except @name annotations)
-                if not line.startswith('--') or line.startswith('-- @'):
-                    if line.startswith('-- @description:'):
-                        # Skip description
-                        continue
-                    current_query_lines.append(line)
-        
-        # Save last query
-        if current_query_name and current_query_lines:
-            query_sql = '\n'.join(current_query_lines).strip()
-            if query_sql:
-                queries[current_query_name] = self._format_query(query_sql)
+        Returns:
+            CompiledQuery (sql, param_names)
+        """
+        _, entry = self._lookup(query_name, filename)
+        # Keyed by content hash so an edited query is compiled again
+        compiled = _compiled_queries.get(entry["hash"])
+        if compiled is None:
+            compiled = _compiled_queries[entry["hash"]] = compile_query(entry["sql"])
+        return compiled
+    
+    def get_bound_query(self, query_name: str, filename: str = None, **params) -> Tuple[str, Tuple[Any, ...]]:
+        """Get a parameterized query and its bind values
+        
+        Unlike get_query, parameter values are never written into the SQL text, so the
+        statement text stays the same for every call and its plan can be reused.
+        
+        Args:
+            query_name: Name of the query to retrieve
+            filename: Optional filename if not using default
+            **params: Parameter values for the {param} placeholders
+            
+        Returns:
+            Tuple of (SQL with ? markers, parameter values) for cursor.execute
+        """
+        compiled = self.get_compiled_query(query_name, filename)
+        return compiled.sql, compiled.bind(params)
+    
+    def _get_raw_query(self, query_name: str, filename: str = None) -> Tuple[str, str]:
+        """Resolve the file and return (filename, query SQL) without substitution"""
+        filename, entry = self._lookup(query_name, filename)
+        return filename, entry["sql"]
+    
+    def _lookup(self, query_name: str, filename: str = None) -> Tuple[str, Dict[str, Any]]:
+        """Resolve the file and return (filename, index entry) of a query
         
-        return queries
+        Lookups are served from the query index without parsing the SQL file.
+        """
+        # Use first loaded file if filename not specified
+        explicit = filename is not None
+        if filename is None:
+            if self._query_cache:
+                filename = next(iter(self._query_cache.keys()))
+            else:
+                # Otherwise look the query up in the index (must be defined in exactly one file)
+                files = self.index.find(query_name)
+                if not files:
+                    raise KeyError(f"Query '{query_name}' not found in any SQL file in {self.base_path}")
+                if len(files) > 1:
+                    raise ValueError(
+                        f"Query '{query_name}' is ambiguous: defined in {', '.join(sorted(files))}. "
+                        "Please specify filename."
+                    )
+                filename = files[0]
+        
+        queries = self.index.file_queries(filename)
+        if queries is None:
+            raise FileNotFoundError(f"SQL file not found: {self.base_path / filename}")
+        if query_name not in queries:
+            available_queries = list(queries.keys())
+            raise KeyError(f"Query '{query_name}' not found in {filename}. Available queries: {available_queries}")
+        if explicit and filename not in self._query_cache:
+            # An explicitly named file becomes the default for later lookups, as with load_queries_from_file
+            self._query_cache[filename] = {name: query["sql"] for name, query in queries.items()}
+        return filename, queries[query_name]
     
-    def _format_query(self, query: str) -> str:
-        """Format SQL query string"""
-        # Remove empty lines
-        lines = [line for line in query.split('\n') if line.strip()]
-        return '\n'.join(lines)
+    def _parse_queries(self, content: str) -> Dict[str, str]:
+        """Parse queries from SQL file content"""
+        return {name: entry["sql"] for name, entry in parse_query_file(content).items()}
     
     def _substitute_parameters(self, query: str, params: Dict[str, any]) -> str:
         """Substitute parameters in SQL query"""
@@ -157,6 +575,40 @@ class E2ESQLQueryManager:
         
         return result
     
+    @property
+    def index(self) -> QueryIndex:
+        """Process-wide query index of base_path (loaded lazily)"""
+        return get_query_index(self.base_path)
+    
+    def list_all_queries(self) -> Dict[str, List[str]]:
+        """Get query names of every SQL file from the index (without parsing the files)"""
+        return self.index.list_all()
+    
+    def describe_query(self, query_name: str, filename: str = None) -> Dict[str, Any]:
+        """Get index metadata of a query
+        
+        Args:
+            query_name: Name of the query
+            filename: Optional filename (looked up in the index if omitted)
+            
+        Returns:
+            Dictionary with file, description, parameters and hash
+        """
+        if filename is None:
+            files = self.index.find(query_name)
+            if len(files) != 1:
+                raise KeyError(f"Query '{query_name}' is defined in {len(files)} files; specify filename")
+            filename = files[0]
+        entry = self.index.get(filename, query_name)
+        if entry is None:
+            raise KeyError(f"Query '{query_name}' not found in {filename}")
+        return {
+            "file": filename,
+            "description": entry["description"],
+            "parameters": entry["parameters"],
+            "hash": entry["hash"],
+        }
+    
     def list_files(self) -> List[str]:
         """Get list of available SQL files"""
         if not self.base_path.exists():
@@ -166,15 +618,12 @@ class E2ESQLQueryManager:
     
     def list_queries(self, filename: str) -> List[str]:
         """Get list of query names in specified file"""
-        if filename not in self._query_cache:
-            self.load_queries_from_file(filename)
-        
-        return list(self._query_cache[filename].keys())
+        return list(self.load_queries_from_file(filename).keys())
     
     def clear_cache(self):
-        """Clear all caches"""
+        """Clear all caches (including the process-wide file cache)"""
         self._query_cache.clear()
-        self._file_cache.clear()
+        _sql_file_cache.clear()
         logger.info("Query cache cleared")
     
     def file_exists(self, filename: str = None) -> bool:
@@ -212,26 +661,7 @@ class E2ESQLQueryManager:
             else:
                 raise ValueError("No filename specified and no file currently loaded")
         
-        # Check cache first
-        if filename in self._file_cache:
-            return self._file_cache[filename]
-        
-        # Load file
-        file_path = self.base_path / filename
-        if not file_path.exists():
-            raise FileNotFoundError(f"SQL file not found: {file_path}")
-        
-        try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # Cache content
-            self._file_cache[filename] = content
-            return content
-            
-        except Exception as e:
-            logger.error(f"Failed to read SQL file {filename}: {e}")
-            raise
+        return self._get_cached_file(filename).content
     
     def get_sql_content_with_params(self, params: Dict[str, any], filename: str = None) -> str:
         """Get SQL content with parameters substituted
@@ -249,3 +679,21 @@ class E2ESQLQueryManager:
             content = self._substitute_parameters(content, params)
         
         return content
+
+
+if __name__ == "__main__":
+    import argparse
+    
+    parser = argparse.ArgumentParser(description="Build the compiled query index for sql/e2e_queries")
+    parser.add_argument("--base-path", type=Path, default=E2ESQLQueryManager().base_path,
+                        help="Directory containing the SQL files")
+    parser.add_argument("--output", type=Path, default=None,
+                        help=f"Index file (default: <base-path>/{INDEX_FILENAME})")
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    query_index = QueryIndex(args.base_path, args.output)
+    rebuilt = query_index.refresh()
+    total = sum(len(names) for names in query_index.list_all().values())
+    print(f"{'Rebuilt' if rebuilt else 'Up to date'}: {query_index.index_path} "
+          f"({len(query_index.files())} files, {total} queries)")
@@ -7,8 +7,10 @@ SQL Server connection helper for E2E testing with actual database operations
 import logging
 import os
 import random
+import threading
 import time
 import uuid
+from contextlib import contextmanager
 
 # pyodbcの条件付きインポート（技術的負債対応）
 try:
@@ -32,13 +34,29 @@ except ImportError:
     
     pyodbc = MockPyodbc()
     PYODBC_AVAILABLE = False
-from typing import List, Dict, Any, Optional
+from typing import List, Dict, Any, Optional, Union
 
 # 外部SQLクエリマネージャーのインポート
 from .sql_query_manager import E2ESQLQueryManager
+from .connection_pool import ConnectionPool, get_shared_pool, release_shared_pool
+from .result_formats import DEFAULT_CHUNK_SIZE, fetch_results, iter_rows, row_count, validate_fetch_mode
+from .sql_batch import join_statements, returns_rows, split_batches
 
 logger = logging.getLogger(__name__)
 
+# 接続断とみなすSQLSTATE（接続を破棄して1回だけ再試行する）
+DISCONNECT_SQLSTATES = ('08S01', '08001', '08003', '08004', '08007')
+
+# 接続待機済みの接続文字列（プロセス内で1回だけ待機する）
+_ready_connection_strings = set()
+# 接続文字列毎の待機用ロック（_ready_lockは集合・辞書の参照と更新の間だけ保持する）
+_ready_waiters: Dict[str, threading.Lock] = {}
+_ready_lock = threading.Lock()
+
+
+def _is_disconnect(error: Exception) -> bool:
+    return bool(error.args) and error.args[0] in DISCONNECT_SQLSTATES
+
 
 class SynapseE2EConnection:
     """E2Eテスト用のSynapse/SQL Server接続ヘルパークラス"""
@@ -52,8 +70,10 @@ class SynapseE2EConnection:
         """
         self.connection_string = connection_string or self._get_connection_string()
         self.query_manager = E2ESQLQueryManager()
+        # 接続文字列毎にセッション全体で共有する接続プール（プール・接続は最初のクエリ実行時に取得）
+        self._pool: Optional[ConnectionPool] = None
+        self._pool_lock = threading.Lock()
         logger.info("E2E SynapseE2EConnection initialized with SQL query manager")
-        self.wait_for_connection()
     
     def _get_connection_string(self) -> str:
         """環境変数から接続文字列を構築"""
@@ -81,7 +101,7 @@ class SynapseE2EConnection:
         return connection_string
     
     def get_connection(self):
-        """データベース接続を取得"""
+        """データベース接続を新規作成（プールを使わない。通常はconnection()を使用）"""
         try:
             conn = pyodbc.connect(self.connection_string)
             return conn
@@ -89,43 +109,207 @@ class SynapseE2EConnection:
             logger.error(f"E2E Database connection failed: {e}")
             raise
     
-    def execute_query(self, query: str, params: tuple = None) -> List[tuple]:
-        """クエリを実行して結果を返す"""
+    @property
+    def pool(self) -> ConnectionPool:
+        """共有プール（close()後、またはプールが閉じられた後は次の利用時に取得し直す）"""
+        with self._pool_lock:
+            if self._pool is None or self._pool.closed:
+                self._pool = get_shared_pool(
+                    self.connection_string,
+                    self.get_connection,
+                    max_size=int(os.getenv('E2E_SQL_POOL_SIZE', '5')),
+                )
+            return self._pool
+    
+    @contextmanager
+    def connection(self):
+        """共有プールから接続を借りる（初回のみ接続を待機、終了時にロールバックして返却）"""
+        self._ensure_ready()
+        with self.pool.connection() as conn:
+            yield conn
+    
+    def close(self):
+        """共有プールの利用を終える（最後の利用者の場合はプールを閉じる。以降のクエリ実行時には再取得する）"""
+        with self._pool_lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            release_shared_pool(self.connection_string, pool)
+    
+    def _ensure_ready(self):
+        with _ready_lock:
+            if self.connection_string in _ready_connection_strings:
+                return
+            waiter = _ready_waiters.setdefault(self.connection_string, threading.Lock())
+        # 待機中は接続文字列毎のロックのみ保持する（他の接続先の利用者を待たせない）
+        with waiter:
+            with _ready_lock:
+                if self.connection_string in _ready_connection_strings:
+                    return
+            # 失敗しても以降のクエリ毎に待機し直さない（クエリ側でエラーになる）
+            self.wait_for_connection()
+            with _ready_lock:
+                _ready_connection_strings.add(self.connection_string)
+    
+    def _with_reconnect(self, operation):
+        """operation(conn)を実行し、接続断の場合は接続を破棄して1回だけ再試行"""
+        self._ensure_ready()
+        attempt = 0
+        while True:
+            attempt += 1
+            # 借りたプールへ返却する（実行中にclose()されても参照を取り直さない）
+            pool = self.pool
+            conn = pool.checkout()
+            discard = False
+            try:
+                return operation(conn)
+            except pyodbc.Error as e:
+                if attempt > 1 or not _is_disconnect(e):
+                    raise
+                discard = True
+                logger.warning(f"E2E Connection lost, reconnecting: {e}")
+            finally:
+                pool.checkin(conn, discard=discard)
+    
+    def execute_query(self, query: str, params: tuple = None, fetch_mode: str = 'dict',
+                      chunk_size: int = DEFAULT_CHUNK_SIZE) -> Any:
+        """クエリを実行して結果を返す
+
+        fetch_mode（結果セットを返すクエリのみ有効、詳細は result_formats 参照）:
+            dict（既定）/ tuple / iterator / numpy / pandas
+        結果セットの有無は実行結果（cursor.description）で判定するため、CTE（WITH ...）や
+        DECLARE/SETの後にSELECTが続くバッチも結果を返す
+        """
+        validate_fetch_mode(fetch_mode)
+        if fetch_mode == 'iterator' and returns_rows(query):
+            return self._iter_query(query, params, chunk_size)
+        
+        def run(conn):
+            cursor = conn.cursor()
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            affected = cursor.rowcount
+            
+            # 行数のみの結果（DECLARE/SET/DML）を読み飛ばし、最初の結果セットを取得
+            while cursor.description is None and cursor.nextset():
+                pass
+            if cursor.description is not None:
+                results = fetch_results(cursor, fetch_mode, chunk_size)
+                conn.commit()
+                logger.info(f"E2E Query executed, returned {row_count(results)} rows")
+                return results
+            
+            # INSERT/UPDATE/DELETE文の場合はcommitして行数を返す
+            conn.commit()
+            logger.info(f"E2E Query executed, affected {affected} rows")
+            return [(affected,)]
+        
         try:
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                if params:
-                    cursor.execute(query, params)
-                else:
-                    cursor.execute(query)
-                
-                # SELECT文の場合は結果を取得
-                if query.strip().upper().startswith('SELECT'):
-                    results = cursor.fetchall()
-                    # カラム名を取得
-                    columns = [column[0] for column in cursor.description]
-                    # 結果を辞書のリストに変換
-                    dict_results = [dict(zip(columns, row)) for row in results]
-                    logger.info(f"E2E Query executed, returned {len(dict_results)} rows")
-                    return dict_results
-                else:
-                    # INSERT/UPDATE/DELETE文の場合はcommitして行数を返す
-                    conn.commit()
-                    row_count = cursor.rowcount
-                    logger.info(f"E2E Query executed, affected {row_count} rows")
-                    return [(row_count,)]
-                    
+            return self._with_reconnect(run)
         except Exception as e:
             logger.error(f"E2E Query execution failed: {e}")
             raise
     
+    def execute_batch(self, script: Union[str, List[str]], fetch_mode: str = 'dict') -> Dict[str, Any]:
+        """複数の文・スクリプトをまとめて実行し、全ての結果セットと所要時間を返す
+        
+        文字列はGO行でバッチに分割する。文のリストは join_statements で1つのバッチに連結し、
+        CREATE VIEW/PROCEDURE/FUNCTION/TRIGGER 等、単独のバッチが必要な文の前後でのみ分割する。
+        バッチ毎に1回の往復で送信してnextset()で全ての結果セットを読み、バッチ毎にコミットする。
+        全バッチは同じ接続で実行する（一時テーブル等はバッチ間で引き継がれる）
+        
+        Args:
+            script: SQLスクリプト（GO区切り可）または文のリスト
+            fetch_mode: 結果セットの取得形式（iterator以外、詳細は result_formats 参照）
+            
+        Returns:
+            {"batches": [...], "result_sets": [...], "total_ms": ...}
+            result_sets の各要素は batch・index・columns・rows（結果セットの場合）・rowcount と、
+            elapsed_ms（直前の結果からの経過時間 = 文毎の所要時間の目安）・offset_ms（バッチ開始から）
+        """
+        if fetch_mode == 'iterator':
+            raise ValueError("execute_batch does not support fetch_mode='iterator'")
+        validate_fetch_mode(fetch_mode)
+        if not isinstance(script, str):
+            script = join_statements(script)
+        batches = split_batches(script)
+        
+        batch_results = []
+        result_sets = []
+        started = time.perf_counter()
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            for batch_index, batch in enumerate(batches):
+                batch_started = time.perf_counter()
+                previous = batch_started
+                try:
+                    cursor.execute(batch)
+                    index = 0
+                    while True:
+                        result = {"batch": batch_index, "index": index, "columns": None, "rows": None,
+                                  "rowcount": cursor.rowcount}
+                        if cursor.description is not None:
+                            result["columns"] = [column[0] for column in cursor.description]
+                            result["rows"] = fetch_results(cursor, fetch_mode)
+                        now = time.perf_counter()
+                        result["elapsed_ms"] = round((now - previous) * 1000, 3)
+                        result["offset_ms"] = round((now - batch_started) * 1000, 3)
+                        previous = now
+                        result_sets.append(result)
+                        index += 1
+                        if not cursor.nextset():
+                            break
+                    conn.commit()
+                except Exception as e:
+                    logger.error(f"E2E Batch {batch_index + 1}/{len(batches)} failed: {e}")
+                    raise
+                batch_results.append({
+                    "batch": batch_index,
+                    "result_sets": index,
+                    "elapsed_ms": round((time.perf_counter() - batch_started) * 1000, 3),
+                })
+        
+        total_ms = round((time.perf_counter() - started) * 1000, 3)
+        logger.info(f"E2E Batch executed: {len(batches)} batches, {len(result_sets)} result sets in {total_ms}ms")
+        return {"batches": batch_results, "result_sets": result_sets, "total_ms": total_ms}
+    
+    def execute_external_script(self, filename: str, query_name: str = None, **params) -> Dict[str, Any]:
+        """
+        外部SQLファイル（query_name省略時はファイル全体）をexecute_batchで実行
+        
+        Args:
+            filename: SQLファイル名
+            query_name: クエリ名（省略時はファイル全体をGO区切りのスクリプトとして実行）
+            **params: クエリパラメータ
+            
+        Returns:
+            execute_batchの結果
+        """
+        if query_name is None:
+            script = self.query_manager.get_sql_content_with_params(params, filename)
+        else:
+            script = self.query_manager.get_query(query_name, filename, **params)
+        logger.info(f"Executing external script: {filename}::{query_name or '*'}")
+        return self.execute_batch(script)
+    
+    def _iter_query(self, query: str, params: Optional[tuple], chunk_size: int):
+        """fetchmanyで少しずつ結果を返す（読み切るかclose()されるまで接続を保持）"""
+        with self.connection() as conn:
+            cursor = conn.cursor()
+            if params:
+                cursor.execute(query, params)
+            else:
+                cursor.execute(query)
+            yield from iter_rows(cursor, chunk_size)
+    
     def wait_for_connection(self, max_retries: int = 10, delay: int = 3) -> bool:
         """データベース接続が利用可能になるまで待機"""
         logger.info(f"E2E Waiting for database connection (max {max_retries} retries)...")
         
         for attempt in range(max_retries):
             try:
-                with self.get_connection() as conn:
+                with self.pool.connection() as conn:
                     cursor = conn.cursor()
                     cursor.execute("SELECT 1")
                     cursor.fetchone()
@@ -142,7 +326,7 @@ class SynapseE2EConnection:
     def test_synapse_connection(self) -> bool:
         """Synapse接続テスト"""
         try:
-            with self.get_connection() as conn:
+            with self.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute("SELECT 1 as test_result")
                 result = cursor.fetchone()
@@ -165,7 +349,7 @@ class SynapseE2EConnection:
             FROM INFORMATION_SCHEMA.TABLES 
             WHERE TABLE_SCHEMA = ? AND TABLE_NAME = ?
             """
-            result = self.execute_query(query, (schema_name, table_name))
+            result = self.execute_query(query, (schema_name, table_name), fetch_mode='tuple')
             return result[0][0] > 0 if result else False
         except Exception as e:
             logger.error(f"Table existence check failed: {e}")
@@ -236,11 +420,11 @@ class SynapseE2EConnection:
         insert_query = f"INSERT INTO {table_name} ({', '.join(columns)}) VALUES ({placeholders})"
         
         try:
-            with self.get_connection() as conn:
+            with self.connection() as conn:
                 cursor = conn.cursor()
-                for row in test_data:
-                    params = tuple(row.values())
-                    cursor.execute(insert_query, params)
+                # 配列バインドで全行を1回の往復で送信
+                cursor.fast_executemany = True
+                cursor.executemany(insert_query, [tuple(row.values()) for row in test_data])
                 conn.commit()
             logger.info(f"Successfully inserted {len(test_data)} rows into {table_name}")
             return True
@@ -286,27 +470,36 @@ class SynapseE2EConnection:
             query = self.query_manager.get_query(query_name, filename, **params)
             logger.info(f"Executing external query: {filename}::{query_name}")
             
-            results = self.execute_query(query)
-            
-            # 結果を辞書形式に変換
-            if results:
-                if hasattr(results[0], '_fields'):
-                    # Named tupleの場合
-                    return [dict(zip(row._fields, row)) for row in results]
-                
-                # pyodbc.Rowの場合、カラム名を取得して辞書に変換
-                if cursor.description:
-                    columns = [column[0] for column in cursor.description]
-                    return [dict(zip(columns, row)) for row in results]
-                else:
-                    # 通常のtupleの場合、カラム名を推定
-                    return [{"col" + str(i): val for i, val in enumerate(row)} for row in results]
-            return []
+            # execute_queryはSELECT結果を辞書のリストで返す
+            return self.execute_query(query)
                 
         except Exception as e:
             logger.error(f"External query execution failed: {filename}::{query_name} - {e}")
             raise
     
+    def execute_bound_external_query(self, filename: str, query_name: str, **params) -> List[Dict[str, Any]]:
+        """
+        外部SQLファイルのクエリを、{param} を ? のバインドパラメータに置き換えて実行
+        
+        SQL文字列は値によらず同一となるため、SQL Server側で実行プランが再利用される。
+        LOCATION等のバインドできない位置のプレースホルダーには execute_external_query を使用する
+        
+        Args:
+            filename: SQLファイル名
+            query_name: クエリ名
+            **params: クエリパラメータ
+            
+        Returns:
+            クエリ実行結果（SELECTは辞書のリスト、それ以外は [(影響行数,)]）
+        """
+        try:
+            query, values = self.query_manager.get_bound_query(query_name, filename, **params)
+            logger.info(f"Executing bound external query: {filename}::{query_name}")
+            return self.execute_query(query, values)
+        except Exception as e:
+            logger.error(f"External query execution failed: {filename}::{query_name} - {e}")
+            raise
+    
     def execute_external_query_no_result(self, filename: str, query_name: str, **params) -> bool:
         """
         外部SQLファイルからクエリを読み込んで実行（結果なし）
@@ -320,13 +513,11 @@ class SynapseE2EConnection:
             実行成功/失敗
         """
         try:
-            query = self.query_manager.get_query(filename, query_name, **params)
+            query = self.query_manager.get_query(query_name, filename, **params)
             logger.info(f"Executing external query (no result): {filename}::{query_name}")
             
-            with self.get_connection() as conn:
-                cursor = conn.cursor()
-                cursor.execute(query)
-                conn.commit()
+            # 後続の文のエラーも検出できるよう、全ての結果を読み切る（GO区切りにも対応）
+            self.execute_batch(query)
             
             return True
         except Exception as e:
@@ -343,14 +534,12 @@ class SynapseE2EConnection:
         Returns:
             ファイル名をキー、クエリ名リストを値とする辞書
         """
+        # クエリインデックスから取得（SQLファイルを個別に解析しない）
+        all_queries = self.query_manager.list_all_queries()
         if filename:
-            return {filename: self.query_manager.get_available_queries(filename)}
-        
-        result = {}
-        for file in self.query_manager.get_available_files():
-            result[file] = self.query_manager.get_available_queries(file)
+            return {filename: all_queries.get(filename, [])}
         
-        return result
+        return all_queries
 
     # =================================================================
     # E2Eテスト用便利メソッド
@@ -374,10 +563,11 @@ class SynapseE2EConnection:
                 "electric_only_client_insert"
             ]
             
-            for query_name in basic_setup_queries:
-                if not self.execute_external_query_no_result("client_dm.sql", query_name):
-                    logger.error(f"Failed to execute setup query: {query_name}")
-                    return False
+            # 全てのセットアップクエリを同じ接続でまとめて実行
+            self.execute_batch([
+                self.query_manager.get_query(query_name, "client_dm.sql")
+                for query_name in basic_setup_queries
+            ])
             
             logger.info(f"Client DM test data setup completed with prefix: {test_prefix}")
             return True
@@ -390,14 +580,9 @@ class SynapseE2EConnection:
         Marketing Client DM包括的テスト用データセットアップ
         """
         try:
-            # 包括的なテストデータセットアップ
-            self.execute_external_query_no_result(
-                "marketing_client_dm_comprehensive.sql", 
-                "comprehensive_test_setup"
-            )
-            
-            # 各種顧客タイプのデータ作成
+            # 包括的なテストデータセットアップと各種顧客タイプのデータ作成を同じ接続でまとめて実行
             setup_queries = [
+                "comprehensive_test_setup",
                 "gas_only_customer_insert",
                 "electric_only_customer_insert", 
                 "combined_customer_insert",
@@ -405,10 +590,10 @@ class SynapseE2EConnection:
                 "complex_equipment_customer_insert"
             ]
             
-            for query_name in setup_queries:
-                self.execute_external_query_no_result(
-                    "marketing_client_dm_comprehensive.sql", query_name
-                )
+            self.execute_batch([
+                self.query_manager.get_query(query_name, "marketing_client_dm_comprehensive.sql")
+                for query_name in setup_queries
+            ])
             
             logger.info("Marketing Client DM comprehensive test data setup completed")
             return True
@@ -476,7 +661,7 @@ class SynapseE2EConnection:
             EXEC sp_executesql @sql;
             """
             
-            with self.get_connection() as conn:
+            with self.connection() as conn:
                 cursor = conn.cursor()
                 cursor.execute(cleanup_query)
                 conn.commit()
@@ -488,16 +673,22 @@ class SynapseE2EConnection:
             return False
 
 # グローバル関数とインスタンス - テストファイルからのインポート用
+_shared_connection: Optional[SynapseE2EConnection] = None
+
+
 def e2e_synapse_connection() -> SynapseE2EConnection:
     """
-    E2Eテスト用のSynapse接続インスタンスを取得
+    E2Eテスト用のSynapse接続インスタンスを取得（プロセス内で共有）
     
     Returns:
         SynapseE2EConnection: 設定済みの接続インスタンス
     """
+    global _shared_connection
     if not PYODBC_AVAILABLE:
         logger.warning("pyodbc not available - returning mock connection")
-    return SynapseE2EConnection()
+    if _shared_connection is None:
+        _shared_connection = SynapseE2EConnection()
+    return _shared_connection
 
 
 def e2e_clean_test_data(table_pattern: str = "test_%") -> bool:
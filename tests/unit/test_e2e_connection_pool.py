@@ -0,0 +1,237 @@
+"""
+E2Eヘルパー connection_pool のユニットテスト
+接続関数をfakeに差し替え、上限・取得タイムアウト、切断された接続の破棄、例外発生時の返却、共有プールを検証する
+"""
+
+import threading
+
+import pytest
+
+from tests.e2e.helpers import connection_pool
+from tests.e2e.helpers.connection_pool import (
+    ConnectionPool,
+    PoolExhaustedError,
+    get_shared_pool,
+    release_shared_pool,
+)
+
+pytestmark = pytest.mark.unit
+
+
+class FakeConnection:
+    def __init__(self):
+        self.alive = True
+        self.closed = False
+        self.rollbacks = 0
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        if not self.alive:
+            raise RuntimeError("connection is broken")
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, sql):
+        if not self.connection.alive:
+            raise RuntimeError("connection is broken")
+
+    def fetchone(self):
+        return (1,)
+
+    def close(self):
+        pass
+
+
+class FakeConnect:
+    """作成した接続を記録する接続関数（failuresの回数だけ接続エラーを送出）"""
+
+    def __init__(self, failures=0):
+        self.created = []
+        self.failures = failures
+
+    def __call__(self):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("login failed")
+        conn = FakeConnection()
+        self.created.append(conn)
+        return conn
+
+
+def test_checked_in_connection_is_rolled_back_and_reused():
+    """返却した接続はロールバックされ、次の取得で再利用される"""
+    connect = FakeConnect()
+    pool = ConnectionPool(connect, max_size=2)
+
+    conn = pool.checkout()
+    pool.checkin(conn)
+
+    assert pool.checkout() is conn
+    assert conn.rollbacks == 1
+    assert len(connect.created) == 1
+    stats = pool.stats()
+    assert (stats["checkouts"], stats["hits"], stats["misses"], stats["hit_ratio"]) == (2, 1, 1, 0.5)
+
+
+def test_checkout_times_out_at_max_size():
+    """max_size本を貸し出し中の場合、checkout_timeout後にPoolExhaustedError"""
+    pool = ConnectionPool(FakeConnect(), max_size=2, checkout_timeout=0.05)
+    pool.checkout()
+    pool.checkout()
+
+    with pytest.raises(PoolExhaustedError, match="max_size=2"):
+        pool.checkout()
+
+    assert pool.stats()["in_use"] == 2
+    assert pool.stats()["waits"] >= 1
+
+
+def test_waiting_checkout_receives_returned_connection():
+    """上限で待機中の取得は、他スレッドが返却した接続で再開する"""
+    pool = ConnectionPool(FakeConnect(), max_size=1, checkout_timeout=2.0)
+    conn = pool.checkout()
+    returner = threading.Timer(0.05, pool.checkin, args=(conn,))
+    returner.start()
+
+    try:
+        assert pool.checkout() is conn
+    finally:
+        returner.join()
+
+
+def test_connection_failing_rollback_is_discarded():
+    """ロールバックに失敗した（切断された）接続はプールへ戻さずに閉じる"""
+    connect = FakeConnect()
+    pool = ConnectionPool(connect, max_size=1)
+    broken = pool.checkout()
+    broken.alive = False
+
+    pool.checkin(broken)
+
+    assert broken.closed
+    assert pool.stats()["discarded"] == 1
+    assert pool.checkout() is not broken
+    assert len(connect.created) == 2
+
+
+def test_stale_idle_connection_is_validated_and_replaced():
+    """validate_after_secondsを過ぎたアイドル接続は疎通確認し、切断されていれば作り直す"""
+    connect = FakeConnect()
+    pool = ConnectionPool(connect, max_size=1, validate_after_seconds=0)
+    conn = pool.checkout()
+    pool.checkin(conn)
+    conn.alive = False
+
+    fresh = pool.checkout()
+
+    assert fresh is not conn
+    assert conn.closed
+    assert pool.stats()["misses"] == 2
+
+
+def test_connection_is_returned_after_exception():
+    """connection()内で例外が発生しても接続はロールバックして返却される"""
+    pool = ConnectionPool(FakeConnect(), max_size=1, checkout_timeout=0.05)
+
+    with pytest.raises(ValueError):
+        with pool.connection() as conn:
+            raise ValueError("assertion in test body")
+
+    assert conn.rollbacks == 1
+    assert pool.stats()["in_use"] == 0
+    with pool.connection() as again:
+        assert again is conn
+
+
+def test_connect_failure_frees_slot():
+    """接続の作成に失敗しても枠は解放され、次の取得で再作成できる"""
+    pool = ConnectionPool(FakeConnect(failures=1), max_size=1, checkout_timeout=0.05)
+
+    with pytest.raises(RuntimeError, match="login failed"):
+        pool.checkout()
+
+    assert pool.stats()["in_use"] == 0
+    assert pool.checkout() is not None
+
+
+def test_close_all_closes_idle_connections():
+    """close_all()はアイドル接続を全て閉じる"""
+    pool = ConnectionPool(FakeConnect(), max_size=2)
+    first, second = pool.checkout(), pool.checkout()
+    pool.checkin(first)
+    pool.checkin(second)
+
+    pool.close_all()
+
+    assert first.closed and second.closed
+    assert pool.stats()["idle"] == 0
+
+
+@pytest.fixture
+def shared_pools(monkeypatch):
+    monkeypatch.setattr(connection_pool, "_shared_pools", {})
+    monkeypatch.setattr(connection_pool, "_shared_pool_refs", {})
+
+
+def test_connection_returned_after_close_is_closed():
+    """close()後は貸し出しを停止し、貸し出し中だった接続は返却時に閉じる"""
+    pool = ConnectionPool(FakeConnect(), max_size=2)
+    idle, in_use = pool.checkout(), pool.checkout()
+    pool.checkin(idle)
+
+    pool.close()
+
+    assert idle.closed and not in_use.closed
+    pool.checkin(in_use)
+    assert in_use.closed
+    assert pool.stats()["idle"] == 0
+    with pytest.raises(RuntimeError, match="closed"):
+        pool.checkout()
+
+
+def test_shared_pool_is_reused_per_key(shared_pools):
+    """get_shared_pool()は接続先毎に同じプールを返す"""
+    connect = FakeConnect()
+
+    first = get_shared_pool("server/db", connect)
+
+    assert get_shared_pool("server/db", connect) is first
+    assert get_shared_pool("server/other", connect) is not first
+
+
+def test_shared_pool_closes_when_last_user_releases(shared_pools):
+    """共有プールは最後の利用者がrelease_shared_pool()した時点で閉じ、次の取得では新しいプールを作る"""
+    connect = FakeConnect()
+    first = get_shared_pool("server/db", connect)
+    get_shared_pool("server/db", connect)
+    conn = first.checkout()
+    first.checkin(conn)
+
+    release_shared_pool("server/db", first)
+    assert not first.closed and not conn.closed
+
+    release_shared_pool("server/db", first)
+    assert first.closed and conn.closed
+    assert get_shared_pool("server/db", connect) is not first
+
+
+def test_release_after_close_shared_pools_is_ignored(shared_pools):
+    """close_shared_pools()後に古いプールを返却しても、同じ接続先の新しいプールには影響しない"""
+    connect = FakeConnect()
+    old = get_shared_pool("server/db", connect)
+    connection_pool.close_shared_pools()
+    new = get_shared_pool("server/db", connect)
+
+    release_shared_pool("server/db", old)
+
+    assert old.closed and not new.closed
+    assert get_shared_pool("server/db", connect) is new
@@ -0,0 +1,238 @@
+"""
+E2Eヘルパー DockerE2EConnection.insert_test_data のユニットテスト
+接続プール・カーソル・subprocessをfakeに差し替え、挿入モードの選択（auto/executemany/bcp/row）、
+bcpが使えない場合のフォールバック、パスワードをコマンドライン引数ではなく標準入力で渡すことを検証する
+"""
+
+import subprocess
+import threading
+
+import pytest
+
+pytest.importorskip("azure.storage.blob")
+
+from tests.e2e.helpers import docker_e2e_helper  # noqa: E402
+from tests.e2e.helpers.docker_e2e_helper import DockerE2EConnection  # noqa: E402
+
+pytestmark = pytest.mark.unit
+
+PASSWORD = "S3cret!Passw0rd"
+
+COLUMNS = [
+    {"name": "id", "data_type": "int", "max_length": None, "ordinal": 1, "is_identity": True},
+    {"name": "name", "data_type": "nvarchar", "max_length": 50, "ordinal": 2, "is_identity": False},
+]
+
+
+class FakeCursor:
+    def __init__(self, log):
+        self.log = log
+        self.fast_executemany = False
+
+    def execute(self, sql, *params):
+        self.log.append(("execute", sql, params))
+
+    def executemany(self, sql, rows):
+        self.log.append(("executemany", sql, list(rows), self.fast_executemany))
+
+    def setinputsizes(self, sizes):
+        self.log.append(("setinputsizes", list(sizes)))
+
+
+class FakeConnection:
+    def __init__(self):
+        self.log = []
+
+    def cursor(self):
+        return FakeCursor(self.log)
+
+    def commit(self):
+        self.log.append(("commit",))
+
+
+class FakePool:
+    def __init__(self):
+        self.conn = FakeConnection()
+        self.checked_out = 0
+
+    def checkout(self):
+        self.checked_out += 1
+        return self.conn
+
+    def checkin(self, conn, discard=False):
+        self.checked_out -= 1
+
+
+class FakeSchemaCache:
+    def get(self, table_name, schema, load):
+        return COLUMNS
+
+    def invalidate(self, *args):
+        pass
+
+
+class FakeBcp:
+    """subprocess.runの代わりにbcpの引数・標準入力・データファイルを記録する"""
+
+    def __init__(self, returncode=0):
+        self.returncode = returncode
+        self.calls = []
+
+    def __call__(self, command, input=None, **kwargs):
+        data_path = command[command.index("in") + 1]
+        with open(data_path, encoding="utf-8") as f:
+            self.calls.append({"command": command, "input": input, "data": f.read(), "kwargs": kwargs})
+        return subprocess.CompletedProcess(command, self.returncode, stdout="", stderr="login failed")
+
+
+@pytest.fixture
+def connection(monkeypatch):
+    """サービス待機を行わずに生成した接続（プール・スキーマキャッシュはfake）"""
+    for name in ("E2E_INSERT_MODE", "E2E_BCP_THRESHOLD", "E2E_INSERT_BATCH_SIZE", "E2E_BCP_TRUSTED_CONNECTION"):
+        monkeypatch.delenv(name, raising=False)
+    conn = DockerE2EConnection.__new__(DockerE2EConnection)
+    conn.sql_host, conn.sql_port, conn.sql_database = "sqlserver", "1433", "TGMATestDB"
+    conn.sql_user, conn.sql_password = "sa", PASSWORD
+    conn.pool = FakePool()
+    conn.schema_cache = FakeSchemaCache()
+    conn._isolation = threading.local()
+    return conn
+
+
+@pytest.fixture
+def bcp(monkeypatch):
+    fake = FakeBcp()
+    monkeypatch.setattr(DockerE2EConnection, "_find_bcp", staticmethod(lambda: "/opt/mssql-tools18/bin/bcp"))
+    monkeypatch.setattr(docker_e2e_helper.subprocess, "run", fake)
+    return fake
+
+
+def rows(count):
+    return [{"name": f"user{i}"} for i in range(count)]
+
+
+def statements(connection, kind):
+    return [entry for entry in connection.pool.conn.log if entry[0] == kind]
+
+
+def test_auto_mode_uses_executemany_below_threshold(connection, bcp):
+    """autoはE2E_BCP_THRESHOLD件未満ならexecutemanyでbatch_size件毎にコミットする"""
+    stats = connection.insert_test_data("users", rows(5), batch_size=2)
+
+    assert (stats["mode"], stats["rows"], stats["batches"]) == ("executemany", 5, 3)
+    batches = statements(connection, "executemany")
+    assert [len(batch[2]) for batch in batches] == [2, 2, 1]
+    assert all(batch[3] for batch in batches)
+    assert batches[0][1] == "INSERT INTO [dbo].[users] ([name]) VALUES (?)"
+    assert len(statements(connection, "setinputsizes")) == 1
+    assert bcp.calls == []
+    assert connection.pool.checked_out == 0
+
+
+def test_auto_mode_uses_bcp_at_threshold(connection, bcp, monkeypatch):
+    """autoはE2E_BCP_THRESHOLD件以上かつbcpが利用可能ならbcpでロードする"""
+    monkeypatch.setenv("E2E_BCP_THRESHOLD", "3")
+
+    stats = connection.insert_test_data("users", rows(3), batch_size=2)
+
+    assert (stats["mode"], stats["batches"]) == ("bcp", 2)
+    assert len(bcp.calls) == 1
+    assert bcp.calls[0]["data"] == "user0\nuser1\nuser2\n"
+    assert statements(connection, "executemany") == []
+
+
+def test_auto_mode_does_not_use_bcp_inside_isolated(connection, bcp, monkeypatch):
+    """isolated()中はbcp（別セッション）を使わずexecutemanyで挿入する"""
+    monkeypatch.setenv("E2E_BCP_THRESHOLD", "1")
+    connection._isolation.connection = connection.pool.checkout()
+
+    stats = connection.insert_test_data("users", rows(3))
+
+    assert stats["mode"] == "executemany"
+    assert bcp.calls == []
+    assert statements(connection, "commit") == []
+
+
+def test_bcp_password_is_passed_on_stdin_not_argv(connection, bcp):
+    """パスワードは-Pでコマンドラインに載せず、bcpのプロンプトへ標準入力で渡す"""
+    connection.insert_test_data("users", rows(2), mode="bcp")
+
+    call = bcp.calls[0]
+    assert all(PASSWORD not in arg for arg in call["command"])
+    assert "-P" not in call["command"]
+    assert call["input"] == PASSWORD + "\n"
+    command = call["command"]
+    assert command[command.index("-U") + 1] == "sa"
+    assert command[command.index("-C") + 1] == "65001"
+    assert call["kwargs"]["timeout"] == 600
+
+
+def test_bcp_trusted_connection_sends_no_password(connection, bcp, monkeypatch):
+    """E2E_BCP_TRUSTED_CONNECTIONでは-Tで接続し、パスワードを渡さない"""
+    monkeypatch.setenv("E2E_BCP_TRUSTED_CONNECTION", "true")
+
+    connection.insert_test_data("users", rows(2), mode="bcp")
+
+    call = bcp.calls[0]
+    assert "-T" in call["command"] and "-U" not in call["command"]
+    assert call["input"] is None
+
+
+def test_bcp_falls_back_to_executemany_when_not_installed(connection, monkeypatch):
+    """bcpコマンドが無い場合はexecutemanyへフォールバックする"""
+    monkeypatch.setattr(DockerE2EConnection, "_find_bcp", staticmethod(lambda: None))
+
+    stats = connection.insert_test_data("users", rows(2), mode="bcp")
+
+    assert stats["mode"] == "executemany"
+    assert len(statements(connection, "executemany")) == 1
+
+
+def test_bcp_falls_back_for_values_it_cannot_represent(connection, bcp):
+    """タブ・改行を含む値はbcpを起動せずexecutemanyへフォールバックする"""
+    stats = connection.insert_test_data("users", [{"name": "tab\there"}], mode="bcp")
+
+    assert stats["mode"] == "executemany"
+    assert bcp.calls == []
+
+
+def test_bcp_failure_is_raised_without_fallback(connection, bcp):
+    """bcpの実行に失敗した場合（一部ロード済みの可能性がある）はフォールバックせず例外とする"""
+    bcp.returncode = 1
+
+    with pytest.raises(Exception, match="bcp failed"):
+        connection.insert_test_data("users", rows(2), mode="bcp")
+
+    assert statements(connection, "executemany") == []
+    assert connection.pool.checked_out == 0
+
+
+def test_row_mode_inserts_one_row_at_a_time_with_identity_insert(connection):
+    """rowは1行ずつINSERTし、IDENTITY列を指定した場合はIDENTITY_INSERTを切り替える"""
+    data = [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}]
+
+    stats = connection.insert_test_data("users", data, mode="row")
+
+    assert stats["mode"] == "row"
+    executed = [entry[1] for entry in statements(connection, "execute")]
+    assert executed == [
+        "SET IDENTITY_INSERT [dbo].[users] ON",
+        "INSERT INTO [dbo].[users] ([id], [name]) VALUES (?, ?)",
+        "INSERT INTO [dbo].[users] ([id], [name]) VALUES (?, ?)",
+        "SET IDENTITY_INSERT [dbo].[users] OFF",
+    ]
+
+
+def test_mode_from_environment_and_unknown_mode(connection, monkeypatch):
+    """modeの省略時はE2E_INSERT_MODEを使い、未知のモードはValueError"""
+    monkeypatch.setenv("E2E_INSERT_MODE", "row")
+    assert connection.insert_test_data("users", rows(1))["mode"] == "row"
+
+    with pytest.raises(ValueError, match="Unknown insert mode"):
+        connection.insert_test_data("users", rows(1), mode="bulk")
+
+
+def test_empty_data_inserts_nothing(connection):
+    """空のデータは接続を使わずに0件を返す"""
+    assert connection.insert_test_data("users", [])["rows"] == 0
+    assert connection.pool.conn.log == []
@@ -0,0 +1,125 @@
+"""
+E2Eヘルパー readiness のユニットテスト
+起動待ちの結果のキャッシュ、xdistワーカー間のマーカー共有、失敗結果を共有しないことを検証する
+"""
+
+import threading
+import time
+
+import pytest
+
+from tests.e2e.helpers import readiness
+from tests.e2e.helpers.readiness import ServiceProbe, wait_for_services
+
+pytestmark = pytest.mark.unit
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(monkeypatch, tmp_path):
+    """プロセス内キャッシュをテスト毎に空にし、マーカーファイルはtmp_pathへ作成する"""
+    monkeypatch.setattr(readiness, "_ready_results", {})
+    monkeypatch.setattr(readiness, "_key_locks", {})
+    monkeypatch.setattr(readiness.tempfile, "gettempdir", lambda: str(tmp_path))
+    monkeypatch.delenv("PYTEST_XDIST_TESTRUNUID", raising=False)
+
+
+class Check:
+    """呼び出し回数を数え、failがTrueの間は例外を送出するプローブ"""
+
+    def __init__(self, fail: bool = False, delay: float = 0.0):
+        self.calls = 0
+        self.fail = fail
+        self.delay = delay
+
+    def __call__(self):
+        self.calls += 1
+        time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("not ready")
+
+
+def probes(**checks):
+    return {
+        name: ServiceProbe(name, check, required=not name.startswith("optional"), max_retries=1)
+        for name, check in checks.items()
+    }
+
+
+def forget_process_cache():
+    """別プロセス（別ワーカー・別のテスト実行）からの呼び出しを再現する"""
+    readiness._ready_results.clear()
+
+
+def test_second_call_in_process_uses_cache():
+    """同じkeyの2回目以降はプローブせずにキャッシュを返す"""
+    sql = Check()
+    wait_for_services("key", probes(sql=sql))
+    results = wait_for_services("key", probes(sql=sql))
+
+    assert sql.calls == 1
+    assert results["sql"]["ready"]
+
+
+def test_required_failure_raises_and_is_not_cached():
+    """必須サービスが準備できなければ例外とし、次の呼び出しで再プローブする"""
+    sql = Check(fail=True)
+    with pytest.raises(Exception, match="sql not available"):
+        wait_for_services("key", probes(sql=sql))
+
+    sql.fail = False
+    wait_for_services("key", probes(sql=sql))
+    assert sql.calls == 2
+
+
+def test_marker_is_shared_within_the_same_xdist_run(monkeypatch):
+    """同じxdistのテスト実行ID内では、他のワーカーのプローブ結果を再利用する"""
+    monkeypatch.setenv("PYTEST_XDIST_TESTRUNUID", "run-1")
+    sql = Check()
+    wait_for_services("key", probes(sql=sql))
+    forget_process_cache()
+
+    wait_for_services("key", probes(sql=sql))
+    assert sql.calls == 1
+
+    monkeypatch.setenv("PYTEST_XDIST_TESTRUNUID", "run-2")
+    forget_process_cache()
+    wait_for_services("key", probes(sql=sql))
+    assert sql.calls == 2
+
+
+def test_marker_is_not_used_without_xdist():
+    """xdist無しでは別のテスト実行の結果を引き継がない"""
+    sql = Check()
+    wait_for_services("key", probes(sql=sql))
+    forget_process_cache()
+
+    wait_for_services("key", probes(sql=sql))
+    assert sql.calls == 2
+
+
+def test_failed_optional_probe_is_not_shared(monkeypatch):
+    """任意サービスが失敗した結果はマーカーへ書き込まず、他のワーカーは再プローブする"""
+    monkeypatch.setenv("PYTEST_XDIST_TESTRUNUID", "run-1")
+    sql, optional_blob = Check(), Check(fail=True)
+    results = wait_for_services("key", probes(sql=sql, optional_blob=optional_blob))
+    assert not results["optional_blob"]["ready"]
+    forget_process_cache()
+
+    optional_blob.fail = False
+    results = wait_for_services("key", probes(sql=sql, optional_blob=optional_blob))
+    assert results["optional_blob"]["ready"]
+    assert sql.calls == 2
+
+
+def test_probe_of_one_key_does_not_block_other_keys():
+    """プローブ中も別のkeyの呼び出しは待たされない"""
+    slow = Check(delay=0.5)
+    waiter = threading.Thread(target=wait_for_services, args=("slow", probes(sql=slow)))
+    waiter.start()
+    try:
+        time.sleep(0.05)
+        started = time.monotonic()
+        wait_for_services("fast", probes(sql=Check()))
+        assert time.monotonic() - started < 0.3
+    finally:
+        waiter.join()
@@ -0,0 +1,75 @@
+"""
+E2Eヘルパー result_formats のユニットテスト
+fetch_modeの形式変換と、列指向の形式での列名重複の検出を検証する
+"""
+
+import pytest
+
+from tests.e2e.helpers import result_formats
+from tests.e2e.helpers.result_formats import fetch_results, iter_rows, row_count, validate_fetch_mode
+
+pytestmark = pytest.mark.unit
+
+
+class FakeCursor:
+    """description・fetchall・fetchmanyのみを持つカーソル"""
+
+    def __init__(self, columns, rows):
+        self.description = [(column, None) for column in columns]
+        self._rows = list(rows)
+
+    def fetchall(self):
+        rows, self._rows = self._rows, []
+        return rows
+
+    def fetchmany(self, size):
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+
+def test_dict_mode_returns_row_dicts():
+    """dict形式は列名をキーとする辞書のリスト"""
+    cursor = FakeCursor(["id", "name"], [(1, "a"), (2, "b")])
+
+    assert fetch_results(cursor, "dict") == [{"id": 1, "name": "a"}, {"id": 2, "name": "b"}]
+
+
+def test_iter_rows_reads_in_chunks():
+    """iter_rowsはchunk_size件ずつ読み出して全行を返す"""
+    cursor = FakeCursor(["id"], [(i,) for i in range(5)])
+
+    assert list(iter_rows(cursor, chunk_size=2)) == [(i,) for i in range(5)]
+
+
+def test_row_count_handles_columnar_dict():
+    """row_countは列指向の辞書では列の長さを返す"""
+    assert row_count({"id": [1, 2, 3]}) == 3
+    assert row_count({}) == 0
+    assert row_count([(1,), (2,)]) == 2
+
+
+@pytest.mark.parametrize("fetch_mode", ["numpy", "pandas"])
+def test_columnar_modes_reject_duplicate_column_names(fetch_mode):
+    """列指向の形式は列名が重複する結果を黙って捨てずにValueErrorとする"""
+    cursor = FakeCursor(["id", "name", "id"], [(1, "a", 10)])
+
+    with pytest.raises(ValueError, match="duplicated: id"):
+        fetch_results(cursor, fetch_mode)
+
+
+@pytest.mark.skipif(not result_formats.NUMPY_AVAILABLE, reason="numpy is not installed")
+def test_numpy_mode_keeps_nulls_as_object_arrays():
+    """numpy形式はNULLを含む列をobject型で保持する"""
+    cursor = FakeCursor(["id", "name"], [(1, None), (2, "b"), (3, "c")])
+
+    arrays = fetch_results(cursor, "numpy", chunk_size=2)
+
+    assert arrays["id"].tolist() == [1, 2, 3]
+    assert arrays["name"].dtype == object
+    assert arrays["name"].tolist() == [None, "b", "c"]
+
+
+def test_validate_fetch_mode_rejects_unknown_mode():
+    """未知のfetch_modeはValueError"""
+    with pytest.raises(ValueError, match="Unknown fetch_mode"):
+        validate_fetch_mode("records")
@@ -0,0 +1,89 @@
+"""
+E2Eヘルパー schema_cache のユニットテスト
+DDL文の検出（区切り識別子・スキーマ修飾・複数テーブル）と、キャッシュの破棄を検証する
+"""
+
+import pytest
+
+from tests.e2e.helpers.schema_cache import SchemaMetadataCache, ddl_table_keys
+
+pytestmark = pytest.mark.unit
+
+COLUMNS = [{"name": "id", "data_type": "int"}]
+
+
+@pytest.mark.parametrize("sql, keys", [
+    ("CREATE TABLE users (id INT)", ["dbo.users"]),
+    ("create table [stg].[Users](id INT)", ["stg.users"]),
+    ("ALTER TABLE dbo.orders ADD note NVARCHAR(50)", ["dbo.orders"]),
+    ("ALTER TABLE [dbo] . [order items] DROP COLUMN note", ["dbo.order items"]),
+    ('ALTER TABLE "sales"."Order ""Lines""" ADD x INT', ['sales.order "lines"']),
+    ("ALTER TABLE [dbo].[a]]b] ADD x INT", ["dbo.a]b"]),
+    ("DROP TABLE orders", ["dbo.orders"]),
+    ("DROP TABLE IF EXISTS [stg].[orders]", ["stg.orders"]),
+    ("DROP TABLE dbo.a, [stg].[b c],d", ["dbo.a", "stg.b c", "dbo.d"]),
+    ("TRUNCATE TABLE TGMATestDB.dbo.client_dm", ["dbo.client_dm"]),
+    ("SELECT id, name INTO #work FROM dbo.users", ["dbo.#work"]),
+    ("SELECT * INTO [stg].[copy] FROM users", ["stg.copy"]),
+    ("CREATE TABLE a (id INT)\nGO\nDROP TABLE b", ["dbo.a", "dbo.b"]),
+    ("INSERT INTO dbo.users (id) SELECT id FROM dbo.staging", []),
+    ("SELECT * FROM dbo.users WHERE note = 'table'", []),
+    ("UPDATE dbo.users SET name = 'x'", []),
+    ("CREATE INDEX ix_users ON dbo.users (name)", []),
+])
+def test_ddl_table_keys(sql, keys):
+    """定義を変更するテーブルのみを schema.table（小文字、スキーマ省略時はdbo）で返す"""
+    assert ddl_table_keys(sql) == keys
+
+
+def loader(calls):
+    def load():
+        calls.append(1)
+        return COLUMNS
+    return load
+
+
+def test_get_caches_per_table_case_insensitively():
+    """列定義はschema.table単位（大文字小文字を区別しない）でキャッシュする"""
+    cache = SchemaMetadataCache()
+    calls = []
+
+    assert cache.get("Users", "dbo", loader(calls)) == COLUMNS
+    assert cache.get("users", "DBO", loader(calls)) == COLUMNS
+
+    assert len(calls) == 1
+    assert cache.stats()["hits"] == 1 and cache.stats()["misses"] == 1
+
+
+def test_missing_table_is_not_cached():
+    """列が0件（テーブルが存在しない）の結果はキャッシュしない"""
+    cache = SchemaMetadataCache()
+    cache.get("missing", "dbo", lambda: [])
+
+    assert cache.get("missing", "dbo", lambda: COLUMNS) == COLUMNS
+
+
+def test_ddl_statement_invalidates_only_the_changed_tables():
+    """DDL文の実行後は対象テーブルのみ再取得する"""
+    cache = SchemaMetadataCache()
+    calls = []
+    for table in ("order items", "users"):
+        cache.get(table, "dbo", loader(calls))
+
+    cache.invalidate_for_statement("ALTER TABLE [dbo].[Order Items] ADD note NVARCHAR(50)")
+    cache.get("order items", "dbo", loader(calls))
+    cache.get("users", "dbo", loader(calls))
+
+    assert len(calls) == 3
+
+
+def test_invalidate_without_table_clears_everything():
+    """invalidate()はテーブル未指定なら全て破棄する"""
+    cache = SchemaMetadataCache()
+    cache.get("a", "dbo", lambda: COLUMNS)
+    cache.get("b", "stg", lambda: COLUMNS)
+
+    cache.invalidate("b", "stg")
+    assert cache.stats()["tables"] == 1
+    cache.invalidate()
+    assert cache.stats()["tables"] == 0
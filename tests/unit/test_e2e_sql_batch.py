@@ -0,0 +1,153 @@
+"""
+E2Eヘルパー sql_batch のユニットテスト
+GO区切りのバッチ分割（GO n・コメント/文字列内のGO）、文のリストの連結（単独のバッチが必要な文）と、
+文種別の判定（CTE・コメント・文字列）を検証する
+"""
+
+import pytest
+
+from tests.e2e.helpers.sql_batch import (
+    join_statements,
+    must_start_batch,
+    returns_rows,
+    split_batches,
+    statement_kind,
+)
+
+pytestmark = pytest.mark.unit
+
+
+def test_split_on_go_lines():
+    """GOだけの行（大文字小文字・前後の空白・末尾のセミコロン/コメントを許容）で分割する"""
+    script = "CREATE TABLE t (id INT)\nGO\nINSERT INTO t VALUES (1)\n  go ; -- done\nSELECT * FROM t"
+
+    assert split_batches(script) == [
+        "CREATE TABLE t (id INT)",
+        "INSERT INTO t VALUES (1)",
+        "SELECT * FROM t",
+    ]
+
+
+def test_go_with_count_repeats_previous_batch():
+    """GO n は直前のバッチをn回実行する"""
+    assert split_batches("INSERT INTO t DEFAULT VALUES\nGO 3\nSELECT 1") == [
+        "INSERT INTO t DEFAULT VALUES",
+        "INSERT INTO t DEFAULT VALUES",
+        "INSERT INTO t DEFAULT VALUES",
+        "SELECT 1",
+    ]
+
+
+def test_empty_batches_are_dropped():
+    """空のバッチ（連続するGO・末尾のGO）は除外する"""
+    assert split_batches("\nGO\nSELECT 1\nGO\n\nGO\n") == ["SELECT 1"]
+
+
+def test_go_inside_block_comment_does_not_split():
+    """複数行のブロックコメント（入れ子を含む）の中のGO行では分割しない"""
+    script = "SELECT 1\n/* outer\n/* inner */\nGO\n*/\nSELECT 2\nGO\nSELECT 3"
+
+    assert split_batches(script) == ["SELECT 1\n/* outer\n/* inner */\nGO\n*/\nSELECT 2", "SELECT 3"]
+
+
+def test_go_inside_string_literal_does_not_split():
+    """複数行の文字列リテラルの中のGO行では分割しない（'' のエスケープ・区切り識別子内の ' を考慮）"""
+    script = "INSERT INTO [O'Brien] VALUES ('it''s\nGO\nstill text') -- it's\nGO\nSELECT 2"
+
+    assert split_batches(script) == [
+        "INSERT INTO [O'Brien] VALUES ('it''s\nGO\nstill text') -- it's",
+        "SELECT 2",
+    ]
+
+
+def test_go_in_line_comment_does_not_start_block_state():
+    """行コメント内の /* や ' は後続行の判定に影響しない"""
+    script = "SELECT 1 -- don't /* here\nGO\nSELECT 2"
+
+    assert split_batches(script) == ["SELECT 1 -- don't /* here", "SELECT 2"]
+
+
+def test_go_as_part_of_statement_is_not_a_separator():
+    """GO以外の語を含む行は区切りではない"""
+    script = "SELECT 1 AS GO\nGOTO label\nGO"
+
+    assert split_batches(script) == ["SELECT 1 AS GO\nGOTO label"]
+
+
+@pytest.mark.parametrize("sql, kind", [
+    ("SELECT 1", "SELECT"),
+    ("  insert INTO t VALUES (1)", "INSERT"),
+    ("-- leading comment\n/* block */ UPDATE t SET a = 1", "UPDATE"),
+    ("WITH c AS (SELECT 1 AS a) SELECT * FROM c", "SELECT"),
+    ("WITH a AS (SELECT 1 AS x), b AS (SELECT x FROM a) DELETE FROM t WHERE id IN (SELECT x FROM b)", "DELETE"),
+    (";WITH c (n) AS (SELECT 1) INSERT INTO t SELECT n FROM c", "INSERT"),
+    ("(SELECT 1) UNION (SELECT 2)", "SELECT"),
+    ("CREATE VIEW v AS SELECT 1 AS a", "CREATE"),
+    ("SELECT '--not a comment' AS a", "SELECT"),
+    ("/* WITH c AS (SELECT 1) */ DELETE FROM t", "DELETE"),
+    ("-- only a comment", ""),
+])
+def test_statement_kind(sql, kind):
+    """先頭のキーワード（CTEは本体の文）を返し、コメント・文字列の中の語は無視する"""
+    assert statement_kind(sql) == kind
+
+
+def test_cte_keywords_inside_strings_are_ignored():
+    """CTE定義内の文字列に含まれるキーワードで本体を誤判定しない"""
+    sql = "WITH c AS (SELECT ') SELECT' AS a) UPDATE t SET a = (SELECT a FROM c)"
+
+    assert statement_kind(sql) == "UPDATE"
+
+
+def test_returns_rows_only_for_select_statements():
+    """結果セットを返すのはSELECTとSELECTを本体とするCTEのみ"""
+    assert returns_rows("WITH c AS (SELECT 1 AS a) SELECT a FROM c")
+    assert not returns_rows("WITH c AS (SELECT 1 AS a) INSERT INTO t SELECT a FROM c")
+    assert not returns_rows("EXEC sp_who")
+
+
+@pytest.mark.parametrize("sql, alone", [
+    ("CREATE VIEW v AS SELECT 1 AS a", True),
+    ("create procedure dbo.p AS SELECT 1", True),
+    ("CREATE PROC p AS SELECT 1", True),
+    ("CREATE OR ALTER FUNCTION f() RETURNS INT AS BEGIN RETURN 1 END", True),
+    ("ALTER TRIGGER tr ON t AFTER INSERT AS SELECT 1", True),
+    ("-- header\nCREATE SCHEMA stg", True),
+    ("CREATE TABLE v (id INT)", False),
+    ("ALTER TABLE t ADD view_name INT", False),
+    ("CREATE INDEX ix ON t (id)", False),
+    ("SELECT 'CREATE VIEW v' AS a", False),
+    ("/* CREATE VIEW v */ INSERT INTO t VALUES (1)", False),
+])
+def test_must_start_batch(sql, alone):
+    """CREATE [OR ALTER]/ALTER の VIEW・PROCEDURE・FUNCTION・TRIGGER・SCHEMA のみ単独のバッチが必要"""
+    assert must_start_batch(sql) is alone
+
+
+def test_join_statements_into_one_batch():
+    """通常の文は改行と ; で1つのバッチに連結する（末尾の -- コメントで ; を隠さない）"""
+    script = join_statements(["DELETE FROM t -- clear old rows", "INSERT INTO t VALUES (1);", "  ", "SELECT * FROM t"])
+
+    assert split_batches(script) == [
+        "DELETE FROM t -- clear old rows\n;\nINSERT INTO t VALUES (1)\n;\nSELECT * FROM t\n;"
+    ]
+
+
+def test_join_statements_isolates_statements_that_must_start_a_batch():
+    """CREATE VIEW等とGO区切りを含むスクリプトは、前後をGOで区切って単独のバッチにする"""
+    script = join_statements([
+        "DROP VIEW IF EXISTS v",
+        "CREATE VIEW v AS SELECT 1 AS a -- view",
+        "SELECT * FROM v",
+        "INSERT INTO t VALUES (1)\nGO 2",
+        "SELECT COUNT(*) FROM t",
+    ])
+
+    assert split_batches(script) == [
+        "DROP VIEW IF EXISTS v\n;",
+        "CREATE VIEW v AS SELECT 1 AS a -- view",
+        "SELECT * FROM v\n;",
+        "INSERT INTO t VALUES (1)",
+        "INSERT INTO t VALUES (1)",
+        "SELECT COUNT(*) FROM t\n;",
+    ]
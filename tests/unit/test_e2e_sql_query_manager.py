@@ -0,0 +1,266 @@
+"""
+E2Eヘルパー sql_query_manager のユニットテスト
+クエリインデックスからの検索（ファイルを解析しない）、変更・追加されたファイルの再インデックス、
+クエリが見つからない・複数ファイルで定義されている場合のエラー、テンプレートのバインド変数への変換、
+解析済みSQLファイルキャッシュの更新検知を検証する
+"""
+
+import os
+from pathlib import Path
+
+import pytest
+
+from tests.e2e.helpers.sql_query_manager import (
+    E2ESQLQueryManager,
+    QueryIndex,
+    SQLFileCache,
+    compile_query,
+    parse_query_file,
+)
+
+pytestmark = pytest.mark.unit
+
+
+def write_sql(directory: Path, filename: str, *queries):
+    """(名前, SQL) の組を -- @name: 形式でファイルへ書き込む"""
+    path = directory / filename
+    path.write_text("\n".join(f"-- @name: {name}\n{sql}\n" for name, sql in queries), encoding="utf-8")
+    # mtimeの分解能に依存せず変更を検出させる
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    return path
+
+
+def make_manager(base_path: Path) -> E2ESQLQueryManager:
+    manager = E2ESQLQueryManager()
+    manager.base_path = base_path
+    return manager
+
+
+def test_stored_index_is_used_without_scanning_the_directory(tmp_path, monkeypatch):
+    """保存済みのインデックスがあれば、ディレクトリを走査せずに検索する"""
+    write_sql(tmp_path, "a.sql", ("get_a", "SELECT 1 AS a"))
+    QueryIndex(tmp_path).refresh()
+
+    def no_scan(self, pattern):
+        raise AssertionError("directory was scanned")
+
+    monkeypatch.setattr(Path, "glob", no_scan)
+    index = QueryIndex(tmp_path)
+
+    assert index.find("get_a") == ["a.sql"]
+    assert index.get("a.sql", "get_a")["sql"] == "SELECT 1 AS a"
+
+
+def test_changed_file_is_reindexed_on_lookup(tmp_path):
+    """検索したファイルが変更されていれば、そのファイルのみ再インデックスする"""
+    write_sql(tmp_path, "a.sql", ("get_a", "SELECT 1 AS a"))
+    index = QueryIndex(tmp_path)
+    index.refresh()
+
+    write_sql(tmp_path, "a.sql", ("get_a", "SELECT 2 AS a"))
+
+    assert index.get("a.sql", "get_a")["sql"] == "SELECT 2 AS a"
+    assert QueryIndex(tmp_path).get("a.sql", "get_a")["sql"] == "SELECT 2 AS a"
+
+
+def test_added_file_is_found_by_rescanning_on_miss(tmp_path):
+    """インデックスに無いクエリ名はディレクトリを再走査して検索する"""
+    write_sql(tmp_path, "a.sql", ("get_a", "SELECT 1 AS a"))
+    index = QueryIndex(tmp_path)
+    index.refresh()
+
+    write_sql(tmp_path, "b.sql", ("get_b", "SELECT 1 AS b"))
+
+    assert index.find("get_b") == ["b.sql"]
+
+
+def test_get_query_is_served_from_the_index(tmp_path):
+    """ファイル名を省略したget_queryはインデックスから定義ファイルを特定し、パラメーターを置換する"""
+    write_sql(tmp_path, "a.sql", ("get_a", "SELECT * FROM t WHERE id = {id}"))
+    manager = make_manager(tmp_path)
+
+    assert manager.get_query("get_a", id=5) == "SELECT * FROM t WHERE id = 5"
+    assert manager.get_compiled_query("get_a").param_names == ("id",)
+
+
+def test_unknown_query_reports_not_found(tmp_path):
+    """どのファイルにも無いクエリは「not found」のKeyError"""
+    write_sql(tmp_path, "a.sql", ("get_a", "SELECT 1"))
+    manager = make_manager(tmp_path)
+
+    with pytest.raises(KeyError, match="'missing' not found in any SQL file"):
+        manager.get_query("missing")
+
+
+def test_query_in_several_files_reports_ambiguous(tmp_path):
+    """複数ファイルで定義されたクエリは定義ファイルを列挙したValueError"""
+    write_sql(tmp_path, "a.sql", ("shared", "SELECT 1"))
+    write_sql(tmp_path, "b.sql", ("shared", "SELECT 2"))
+    manager = make_manager(tmp_path)
+
+    with pytest.raises(ValueError, match="ambiguous: defined in a.sql, b.sql"):
+        manager.get_query("shared")
+    assert manager.get_query("shared", filename="b.sql") == "SELECT 2"
+
+
+def test_missing_file_raises_file_not_found(tmp_path):
+    """存在しないファイル名を指定した場合はFileNotFoundError"""
+    manager = make_manager(tmp_path)
+
+    with pytest.raises(FileNotFoundError):
+        manager.get_query("get_a", filename="missing.sql")
+
+
+@pytest.mark.parametrize("template, sql, names", [
+    ("SELECT * FROM t WHERE id = {id}", "SELECT * FROM t WHERE id = ?", ("id",)),
+    ("SELECT * FROM t WHERE a = {x} OR b = {x}", "SELECT * FROM t WHERE a = ? OR b = ?", ("x", "x")),
+    ("SELECT * FROM t WHERE name = '{name}'", "SELECT * FROM t WHERE name = ?", ("name",)),
+    ("SELECT * FROM t WHERE name = N'{name}'", "SELECT * FROM t WHERE name = ?", ("name",)),
+    ("SELECT '{not_a_param' AS s, {id}", "SELECT '{not_a_param' AS s, ?", ("id",)),
+    ("SELECT 'it''s', '{a}', {b}", "SELECT 'it''s', ?, ?", ("a", "b")),
+    ("SELECT N'O''Brien', {id}", "SELECT N'O''Brien', ?", ("id",)),
+    ("SELECT 1 -- {ignored}\nFROM t WHERE id = {id}", "SELECT 1 -- {ignored}\nFROM t WHERE id = ?", ("id",)),
+    ("SELECT /* '{ignored}' */ {id}", "SELECT /* '{ignored}' */ ?", ("id",)),
+    ("SELECT [it's], \"a'b\" FROM t WHERE id = {id}", "SELECT [it's], \"a'b\" FROM t WHERE id = ?", ("id",)),
+    ("SELECT [a]]--b] FROM t WHERE id = {id}", "SELECT [a]]--b] FROM t WHERE id = ?", ("id",)),
+    ("SELECT TOP {n} * FROM t", "SELECT TOP (?) * FROM t", ("n",)),
+    ("select top\n  {n} * from t", "select top (?) * from t", ("n",)),
+    ("SELECT TOP ({n}) * FROM t", "SELECT TOP (?) * FROM t", ("n",)),
+    ("SELECT STOP {n}", "SELECT STOP ?", ("n",)),
+])
+def test_compile_query(template, sql, names):
+    """プレースホルダーは?に変換し、コメント・文字列リテラル・区切り識別子の中はそのまま残す"""
+    assert compile_query(template) == (sql, names)
+
+
+@pytest.mark.parametrize("template", [
+    "SELECT * FROM t WHERE name LIKE '{prefix}%'",
+    "SELECT * FROM t WHERE name = N'x{name}'",
+    "SELECT * FROM t WHERE name = 'it''s {name}'",
+    "SELECT * FROM [{table}]",
+    "SELECT * FROM dbo.[stg_{suffix}]",
+    'SELECT "{column}" FROM t',
+])
+def test_placeholder_that_cannot_be_bound_raises(template):
+    """リテラルの一部・区切り識別子内のプレースホルダーはバインドできないためValueError"""
+    with pytest.raises(ValueError, match="cannot be bound"):
+        compile_query(template)
+
+
+def test_compiled_query_binds_parameters_in_marker_order():
+    """bind()はバインド変数の順にパラメーターを並べ、不足していればKeyError"""
+    compiled = compile_query("SELECT TOP {n} * FROM t WHERE a = '{a}' AND b = {b} AND c = {a}")
+
+    assert compiled.bind({"a": "x", "b": 2, "n": 10, "unused": 0}) == (10, "x", 2, "x")
+    with pytest.raises(KeyError, match="'b'"):
+        compiled.bind({"a": "x", "n": 10})
+
+
+class CountingParser:
+    """解析回数を記録するパーサー"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, content):
+        self.calls += 1
+        return {name: query["sql"] for name, query in parse_query_file(content).items()}
+
+
+def touch(path: Path, seconds: int = 1):
+    """内容を変えずにmtimeのみ進める"""
+    stat = path.stat()
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + seconds * 1_000_000_000))
+
+
+def test_file_cache_reuses_entry_while_file_is_unchanged(tmp_path):
+    """mtime・サイズが変わらない間は読み込み・解析せずにキャッシュを返す"""
+    path = write_sql(tmp_path, "a.sql", ("get_a", "SELECT 1 AS a"))
+    cache = SQLFileCache()
+    parse = CountingParser()
+
+    first = cache.get(path, parse)
+    second = cache.get(tmp_path / "." / "a.sql", parse)
+
+    assert second is first
+    assert first.queries == {"get_a": "SELECT 1 AS a"}
+    assert parse.calls == 1
+    assert cache.stats == {"hits": 1, "loads": 1, "reloads": 0}
+
+
+def test_file_cache_reloads_when_mtime_changes(tmp_path):
+    """mtimeが変わったファイルは読み直し、内容が変わっていれば再解析する"""
+    path = write_sql(tmp_path, "a.sql", ("get_a", "SELECT 1 AS a"))
+    cache = SQLFileCache()
+    parse = CountingParser()
+    cache.get(path, parse)
+
+    write_sql(tmp_path, "a.sql", ("get_a", "SELECT 2 AS a"))
+    entry = cache.get(path, parse)
+
+    assert entry.queries == {"get_a": "SELECT 2 AS a"}
+    assert entry.mtime_ns == path.stat().st_mtime_ns
+    assert parse.calls == 2
+    assert cache.stats["reloads"] == 1
+
+
+def test_file_cache_keeps_parsed_queries_when_only_mtime_changes(tmp_path):
+    """mtimeのみ変わり内容が同じ場合は再解析せず、記録したmtimeだけ更新する"""
+    path = write_sql(tmp_path, "a.sql", ("get_a", "SELECT 1 AS a"))
+    cache = SQLFileCache()
+    parse = CountingParser()
+    first = cache.get(path, parse)
+
+    touch(path)
+    entry = cache.get(path, parse)
+
+    assert entry.queries is first.queries
+    assert entry.mtime_ns == path.stat().st_mtime_ns
+    assert parse.calls == 1
+    assert cache.stats["reloads"] == 0
+
+
+def test_file_cache_without_hot_reload_ignores_changes(tmp_path):
+    """hot_reloadを無効にした場合はキャッシュ済みのファイルをstatせずに返す"""
+    path = write_sql(tmp_path, "a.sql", ("get_a", "SELECT 1 AS a"))
+    cache = SQLFileCache()
+    cache.hot_reload = False
+    parse = CountingParser()
+    cache.get(path, parse)
+
+    write_sql(tmp_path, "a.sql", ("get_a", "SELECT 2 AS a"))
+    path.unlink()
+
+    assert cache.get(path, parse).queries == {"get_a": "SELECT 1 AS a"}
+    assert parse.calls == 1
+
+
+def test_file_cache_missing_file_raises_file_not_found(tmp_path):
+    """存在しないファイル、またはキャッシュ後に削除されたファイルはFileNotFoundError"""
+    cache = SQLFileCache()
+    parse = CountingParser()
+    with pytest.raises(FileNotFoundError):
+        cache.get(tmp_path / "missing.sql", parse)
+
+    path = write_sql(tmp_path, "a.sql", ("get_a", "SELECT 1 AS a"))
+    cache.get(path, parse)
+    path.unlink()
+
+    with pytest.raises(FileNotFoundError):
+        cache.get(path, parse)
+    assert parse.calls == 1
+
+
+def test_file_cache_clear_forces_reload(tmp_path):
+    """clear()後は同じファイルでも読み込み直す"""
+    path = write_sql(tmp_path, "a.sql", ("get_a", "SELECT 1 AS a"))
+    cache = SQLFileCache()
+    parse = CountingParser()
+    cache.get(path, parse)
+
+    cache.clear()
+    cache.get(path, parse)
+
+    assert parse.calls == 2
+    assert cache.stats["loads"] == 2
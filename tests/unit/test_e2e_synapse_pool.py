@@ -0,0 +1,89 @@
+"""
+E2Eヘルパー SynapseE2EConnection の共有プール利用のユニットテスト
+close()による共有プールの返却（利用者数）と、接続待機中のロック範囲を検証する
+"""
+
+import threading
+
+import pytest
+
+from tests.e2e.helpers import connection_pool, synapse_e2e_helper
+from tests.e2e.helpers.synapse_e2e_helper import SynapseE2EConnection
+
+pytestmark = pytest.mark.unit
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+@pytest.fixture(autouse=True)
+def isolated_state(monkeypatch):
+    monkeypatch.setattr(connection_pool, "_shared_pools", {})
+    monkeypatch.setattr(connection_pool, "_shared_pool_refs", {})
+    monkeypatch.setattr(synapse_e2e_helper, "_ready_connection_strings", set())
+    monkeypatch.setattr(synapse_e2e_helper, "_ready_waiters", {})
+    monkeypatch.setattr(SynapseE2EConnection, "get_connection", lambda self: FakeConnection())
+    monkeypatch.setattr(SynapseE2EConnection, "wait_for_connection", lambda self, *args, **kwargs: True)
+
+
+def test_close_keeps_pool_open_for_other_instances():
+    """close()は共有プールの利用を終えるだけで、他のインスタンスが使用中のプールは閉じない"""
+    first = SynapseE2EConnection("DSN=test")
+    second = SynapseE2EConnection("DSN=test")
+    with first.connection():
+        pass
+    with second.connection() as conn:
+        pass
+    pool = second.pool
+
+    first.close()
+    assert not pool.closed and not conn.closed
+
+    second.close()
+    assert pool.closed and conn.closed
+
+
+def test_closed_instance_reacquires_pool_on_next_use():
+    """close()後のインスタンスは次の利用時に共有プールを取得し直す"""
+    helper = SynapseE2EConnection("DSN=test")
+    old = helper.pool
+    helper.close()
+
+    with helper.connection():
+        pass
+
+    assert old.closed
+    assert helper.pool is not old and not helper.pool.closed
+
+
+def test_waiting_for_one_server_does_not_block_others(monkeypatch):
+    """接続待機中も別の接続文字列の利用者は待たされない（待機は接続文字列毎）"""
+    waiting = threading.Event()
+    release = threading.Event()
+
+    def wait_for_connection(self, *args, **kwargs):
+        if self.connection_string == "DSN=slow":
+            waiting.set()
+            release.wait(5)
+        return True
+
+    monkeypatch.setattr(SynapseE2EConnection, "wait_for_connection", wait_for_connection)
+    slow = threading.Thread(target=SynapseE2EConnection("DSN=slow")._ensure_ready)
+    slow.start()
+    try:
+        assert waiting.wait(5)
+        fast = threading.Thread(target=SynapseE2EConnection("DSN=fast")._ensure_ready)
+        fast.start()
+        fast.join(1)
+        assert not fast.is_alive()
+    finally:
+        release.set()
+        slow.join(5)
@@ -0,0 +1,138 @@
+"""
+IR Simulator BlockBlobStreamUploader のユニットテスト
+Blobクライアントをfakeに差し替え、ブロックサイズの決定（50,000ブロック上限）、ステージしたブロックIDと確定順、
+空のストリーム、ステージ失敗時に確定しないことを検証する
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "docker", "ir-simulator"))
+
+import blob_upload  # noqa: E402
+from blob_upload import MAX_BLOCKS, BlockBlobStreamUploader, plan_block_size  # noqa: E402
+
+pytestmark = pytest.mark.unit
+
+MiB = 1024 * 1024
+
+
+class FakeBlobClient:
+    """ステージしたブロックと確定したブロックリストを記録する（fail_blockのIDでステージに失敗）"""
+
+    def __init__(self, fail_block=None):
+        self.fail_block = fail_block
+        self.staged = {}
+        self.commits = []
+
+    def stage_block(self, block_id, data):
+        if block_id == self.fail_block:
+            raise RuntimeError(f"stage_block {block_id} failed")
+        self.staged[block_id] = data
+
+    def commit_block_list(self, block_ids, **kwargs):
+        self.commits.append((list(block_ids), kwargs))
+
+
+async def run_blocking(func, *args, **kwargs):
+    # ステージ処理を並行させるため一度イベントループへ制御を戻す
+    await asyncio.sleep(0)
+    return func(*args, **kwargs)
+
+
+async def chunks(*parts):
+    for part in parts:
+        yield part
+
+
+def upload(client, parts, block_size=4, max_concurrency=2, **commit_kwargs):
+    progress = {}
+    uploader = BlockBlobStreamUploader(client, run_blocking, block_size, max_concurrency, progress)
+    result = asyncio.run(uploader.upload(chunks(*parts), **commit_kwargs))
+    return result, progress
+
+
+def test_plan_keeps_block_size_when_upload_fits_in_max_blocks():
+    """MAX_BLOCKS個のブロックに収まるサイズならブロックサイズを変えない"""
+    assert plan_block_size(4 * MiB, 4, 256 * MiB, expected_size=MAX_BLOCKS * 4 * MiB) == (4 * MiB, 4)
+
+
+def test_plan_grows_block_size_just_above_max_blocks():
+    """MAX_BLOCKS個を1バイトでも超えるサイズはブロックサイズを切り上げて拡大する"""
+    block_size, _ = plan_block_size(4 * MiB, 4, 256 * MiB, expected_size=MAX_BLOCKS * 4 * MiB + 1)
+
+    assert block_size == 4 * MiB + 1
+    assert -(-(MAX_BLOCKS * 4 * MiB + 1) // block_size) == MAX_BLOCKS
+
+
+def test_plan_lowers_concurrency_to_fit_buffer_limit():
+    """block_size × (同時ステージ数 + 1) がバッファ上限を超えないよう同時ステージ数を下げる"""
+    assert plan_block_size(32 * MiB, 8, 128 * MiB) == (32 * MiB, 3)
+
+
+@pytest.mark.parametrize("kwargs, message", [
+    ({"expected_size": MAX_BLOCKS * 8 * MiB + 1, "max_block_size": 8 * MiB}, "to fit in 50000 blocks"),
+    ({"max_block_size": 2 * MiB}, "exceeds the limit"),
+    ({"max_block_size": 8 * MiB, "max_buffer_bytes": 6 * MiB}, "upload buffer limit"),
+])
+def test_plan_rejects_uploads_that_cannot_fit(kwargs, message):
+    """上限に収まらない場合はアップロード前にValueError"""
+    kwargs = {"max_buffer_bytes": 256 * MiB, **kwargs}
+    with pytest.raises(ValueError, match=message):
+        plan_block_size(4 * MiB, 4, **kwargs)
+
+
+def test_blocks_are_staged_with_fixed_length_ids_and_committed_in_order():
+    """受信データをblock_size単位で同じ長さのブロックIDでステージし、送信順に確定する"""
+    client = FakeBlobClient()
+
+    result, progress = upload(client, [b"abcdef", b"", b"ghijk"], block_size=4, overwrite=True)
+
+    assert client.commits == [(["00000000", "00000001", "00000002"], {"overwrite": True})]
+    assert [client.staged[block_id] for block_id in client.commits[0][0]] == [b"abcd", b"efgh", b"ijk"]
+    assert result == {"size": 11, "blocks": 3, "block_size": 4}
+    assert (progress["bytes_received"], progress["bytes_uploaded"]) == (11, 11)
+    assert progress["blocks_staged"] == progress["blocks_total"] == 3
+
+
+def test_empty_stream_commits_an_empty_block_list():
+    """空のストリームはブロックをステージせず、空のブロックリストで確定する（0バイトのBlob）"""
+    client = FakeBlobClient()
+
+    result, _ = upload(client, [])
+
+    assert client.staged == {}
+    assert client.commits == [([], {})]
+    assert result == {"size": 0, "blocks": 0, "block_size": 4}
+
+
+def test_stage_failure_aborts_without_commit():
+    """ステージに失敗した場合は例外を送出し、ブロックリストを確定しない"""
+    client = FakeBlobClient(fail_block="00000001")
+
+    with pytest.raises(RuntimeError, match="stage_block 00000001 failed"):
+        upload(client, [b"x" * 40], block_size=4, max_concurrency=1)
+
+    assert client.commits == []
+    assert "00000002" not in client.staged
+
+
+def test_exceeding_max_blocks_fails_before_commit(monkeypatch):
+    """MAX_BLOCKSを超えるブロック数になった時点で失敗し、確定しない"""
+    monkeypatch.setattr(blob_upload, "MAX_BLOCKS", 2)
+    client = FakeBlobClient()
+
+    with pytest.raises(ValueError, match="exceeds 2 blocks"):
+        upload(client, [b"x" * 9], block_size=4)
+
+    assert client.commits == []
+
+
+@pytest.mark.parametrize("kwargs", [{"block_size": 0}, {"max_concurrency": 0}])
+def test_uploader_rejects_invalid_settings(kwargs):
+    """block_size・max_concurrencyが1未満ならValueError"""
+    with pytest.raises(ValueError):
+        BlockBlobStreamUploader(FakeBlobClient(), run_blocking, **kwargs)
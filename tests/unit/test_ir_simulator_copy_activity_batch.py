@@ -0,0 +1,110 @@
+"""
+IR Simulator /copy-activity/batch のユニットテスト
+コピーエンジン・SQL接続をfakeに差し替え、成功・失敗が混在するバッチの結果と、
+SQL接続プールの枯渇（SQLPoolTimeoutError）の503への変換を検証する
+"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "docker", "ir-simulator"))
+
+pytest.importorskip("fastapi")
+pytest.importorskip("httpx")
+try:
+    import main  # noqa: E402
+except ImportError as e:
+    # pyodbc（unixODBC）・azure-storage-blob・pandasが無い環境
+    pytest.skip(f"IR Simulator dependencies are not available: {e}", allow_module_level=True)
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from copy_engine import CopyResult  # noqa: E402
+from execution_store import ExecutionStore  # noqa: E402
+from sql_pool import SQLPoolTimeoutError  # noqa: E402
+from timing_model import TimingModel  # noqa: E402
+
+pytestmark = pytest.mark.unit
+
+
+class FakeCopyEngine:
+    """sourceのqueryに応じて結果を返す（"fail"は例外、"exhausted"はプール枯渇）"""
+
+    def run(self, source, sink, batch_size=None):
+        if source["query"] == "fail":
+            raise RuntimeError("source table does not exist")
+        if source["query"] == "exhausted":
+            raise SQLPoolTimeoutError("Timed out waiting for a SQL connection")
+        return CopyResult(rows_copied=42, bytes_copied=420, batches=1, duration_seconds=0.5,
+                          sink_type="table", sink_target="[dbo].[dst]")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    """起動処理（ヘルスプローブ等）を実行しないTestClient（SQL Serverは未構成扱い）"""
+    monkeypatch.setattr(main, "copy_engine", FakeCopyEngine())
+    monkeypatch.setattr(main, "timing_model", TimingModel(mode="zero"))
+    monkeypatch.setattr(main, "execution_store", ExecutionStore())
+    monkeypatch.setattr(main, "get_sql_connection", lambda: None)
+    return TestClient(main.app)
+
+
+def item(name, query=None):
+    source = {"type": "SqlServerSource"}
+    if query:
+        source["query"] = query
+    return {"pipeline_name": "pi_batch", "activity_name": name, "execution_id": f"exec-{name}",
+            "source": source, "sink": {"table": "dst"}}
+
+
+def test_batch_returns_mixed_results_in_request_order(client):
+    """成功・失敗が混在しても全件をリクエスト順に返し、失敗は件数とエラーメッセージに反映する"""
+    response = client.post("/copy-activity/batch", json={"activities": [
+        item("simulated"),
+        item("copied", "SELECT id FROM src"),
+        item("broken", "fail"),
+        item("exhausted", "exhausted"),
+    ]})
+
+    assert response.status_code == 200
+    body = response.json()
+    assert (body["total"], body["succeeded"], body["failed"]) == (4, 2, 2)
+    results = {r["execution_id"]: r for r in body["results"]}
+    assert [r["execution_id"] for r in body["results"]] == [
+        "exec-simulated", "exec-copied", "exec-broken", "exec-exhausted"
+    ]
+    assert results["exec-simulated"]["status"] == "SUCCESS"
+    assert results["exec-simulated"]["rows_copied"] == 100
+    assert results["exec-copied"]["rows_copied"] == 42
+    assert results["exec-copied"]["sink_target"] == "[dbo].[dst]"
+    assert results["exec-broken"]["status"] == "FAILED"
+    assert results["exec-broken"]["error_message"] == "source table does not exist"
+    assert results["exec-broken"]["end_time"] is None
+    assert results["exec-exhausted"]["status"] == "FAILED"
+    assert "Timed out" in results["exec-exhausted"]["error_message"]
+    assert main.execution_store.get("exec-broken")["status"] == "FAILED"
+
+
+def test_batch_log_pool_exhaustion_maps_to_503(client, monkeypatch):
+    """ETLログの書き込みでプールが枯渇した場合は成功・失敗として返さず、Retry-After付きの503とする"""
+    def exhausted():
+        raise SQLPoolTimeoutError("Timed out after 10s waiting for a SQL connection")
+
+    monkeypatch.setattr(main, "get_sql_connection", exhausted)
+
+    response = client.post("/copy-activity/batch", json={"activities": [item("simulated")]})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert "Timed out" in response.json()["detail"]
+
+
+def test_batch_rejects_too_many_activities(client, monkeypatch):
+    """COPY_BATCH_MAX_ITEMSを超えるバッチは400"""
+    monkeypatch.setattr(main, "COPY_BATCH_MAX_ITEMS", 1)
+
+    response = client.post("/copy-activity/batch", json={"activities": [item("a"), item("b")]})
+
+    assert response.status_code == 400
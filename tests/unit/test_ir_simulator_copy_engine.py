@@ -0,0 +1,239 @@
+"""
+IR Simulator CopyEngine のユニットテスト
+SQL接続をfakeに差し替え、バッチ単位の読み出し・書き込み、source設定の判定、Blob出力、エラーの伝播を検証する
+"""
+
+import gzip
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "docker", "ir-simulator"))
+
+from copy_engine import (  # noqa: E402
+    CopyConfigurationError,
+    CopyEngine,
+    has_copy_source,
+    resolve_source_query,
+)
+from sql_pool import SQLConnectionPool, SQLPoolTimeoutError  # noqa: E402
+
+pytestmark = pytest.mark.unit
+
+
+class FakeDatabase:
+    """ソースクエリの結果と、シンクへの書き込みを記録する"""
+
+    def __init__(self, columns, rows, fail_on_batch=None):
+        self.columns = columns
+        self.rows = list(rows)
+        self.fail_on_batch = fail_on_batch
+        self.executed = []
+        self.inserted = []
+        self.fetch_sizes = []
+        self.commits = 0
+
+
+class FakeCursor:
+    def __init__(self, db):
+        self.db = db
+        self.description = None
+        self.arraysize = 1
+        self.fast_executemany = False
+        self._rows = []
+
+    def execute(self, sql, *params):
+        self.db.executed.append((sql, params))
+        if sql.lstrip().upper().startswith("SELECT"):
+            self.description = None if self.db.columns is None else [(c, None) for c in self.db.columns]
+            self._rows = list(self.db.rows)
+
+    def fetchmany(self, size):
+        self.db.fetch_sizes.append(size)
+        rows, self._rows = self._rows[:size], self._rows[size:]
+        return rows
+
+    def executemany(self, sql, rows):
+        if self.db.fail_on_batch is not None and len(self.db.inserted) == self.db.fail_on_batch:
+            raise RuntimeError("insert failed")
+        self.db.inserted.append((sql, list(rows)))
+
+
+class FakeConnection:
+    def __init__(self, db):
+        self.db = db
+
+    def cursor(self):
+        return FakeCursor(self.db)
+
+    def commit(self):
+        self.db.commits += 1
+
+    def rollback(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class FakeBlobClient:
+    def __init__(self):
+        self.staged = {}
+        self.committed = None
+
+    def stage_block(self, block_id, data):
+        self.staged[block_id] = data
+
+    def commit_block_list(self, block_ids):
+        self.committed = list(block_ids)
+
+    def content(self):
+        return b"".join(self.staged[block_id] for block_id in self.committed)
+
+
+class FakeBlobService:
+    def __init__(self):
+        self.blobs = {}
+
+    def create_container(self, container):
+        pass
+
+    def get_blob_client(self, container, blob):
+        return self.blobs.setdefault(f"{container}/{blob}", FakeBlobClient())
+
+
+def make_engine(db, max_size=4, block_size=1024):
+    pool = SQLConnectionPool(lambda: FakeConnection(db), max_size=max_size, acquire_timeout=0.05)
+    blob_service = FakeBlobService()
+    return CopyEngine(pool, lambda: blob_service, default_batch_size=2, block_size=block_size), pool, blob_service
+
+
+@pytest.mark.parametrize("source, expected", [
+    ({"query": "SELECT 1 AS a"}, True),
+    ({"sqlReaderQuery": "SELECT 1 AS a"}, True),
+    ({"table_name": "t"}, True),
+    ({"table": "t"}, True),
+    ({"type": "SqlServerSource"}, False),
+    ({"query": ""}, False),
+    ({}, False),
+])
+def test_has_copy_source(source, expected):
+    """クエリまたはテーブル指定がある場合のみ実データコピーとする"""
+    assert has_copy_source(source) is expected
+
+
+def test_resolve_source_query_quotes_table_names():
+    """テーブル指定は角括弧で囲んだSELECT文に変換する（スキーマ省略時はdbo）"""
+    assert resolve_source_query({"table_name": "orders"}) == "SELECT * FROM [dbo].[orders]"
+    assert resolve_source_query({"table": "a]b", "schema": "stg"}) == "SELECT * FROM [stg].[a]]b]"
+    assert resolve_source_query({"query": "SELECT 1 AS a", "table": "t"}) == "SELECT 1 AS a"
+
+
+def test_table_copy_streams_in_batches():
+    """テーブルシンクはfetchmanyとexecutemanyをバッチサイズ単位で繰り返し、バッチ毎にコミットする"""
+    db = FakeDatabase(["id", "name"], [(i, f"n{i}") for i in range(5)])
+    engine, pool, _ = make_engine(db)
+
+    result = engine.run({"query": "SELECT id, name FROM src"},
+                        {"table_name": "dst", "preCopyScript": "DELETE FROM dst"})
+
+    assert (result.rows_copied, result.batches, result.sink_type) == (5, 3, "table")
+    assert result.sink_target == "[dbo].[dst]"
+    assert [len(rows) for _, rows in db.inserted] == [2, 2, 1]
+    assert db.inserted[0][0] == "INSERT INTO [dbo].[dst] ([id], [name]) VALUES (?, ?)"
+    assert set(db.fetch_sizes) == {2}
+    assert ("DELETE FROM dst", ()) in db.executed
+    assert db.commits == 4
+    assert pool.stats()["in_use"] == 0
+
+
+def test_column_mapping_renames_sink_columns():
+    """column_mappingでsource列名をsink列名へ置き換える"""
+    db = FakeDatabase(["id", "name"], [(1, "a")])
+    engine, _, _ = make_engine(db)
+
+    engine.run({"query": "SELECT id, name FROM src", "parameters": [1]},
+               {"table": "dst", "column_mapping": {"name": "customer_name"}}, batch_size=10)
+
+    assert db.inserted[0][0] == "INSERT INTO [dbo].[dst] ([id], [customer_name]) VALUES (?, ?)"
+    assert db.executed[0] == ("SELECT id, name FROM src", (1,))
+
+
+def test_unnamed_source_column_is_rejected():
+    """列名の無いsource列（SELECT 1 など）はテーブルへ書き込まずにCopyConfigurationError"""
+    db = FakeDatabase(["", "name"], [(1, "a")])
+    engine, pool, _ = make_engine(db)
+
+    with pytest.raises(CopyConfigurationError, match="unnamed columns at position"):
+        engine.run({"query": "SELECT 1, name FROM src"}, {"table": "dst"})
+
+    assert db.inserted == []
+    assert pool.stats()["in_use"] == 0
+
+
+def test_source_without_result_set_is_rejected():
+    """結果セットを返さないsourceクエリはCopyConfigurationError"""
+    db = FakeDatabase(None, [])
+    engine, _, _ = make_engine(db)
+
+    with pytest.raises(CopyConfigurationError, match="did not return a result set"):
+        engine.run({"query": "EXEC dbo.cleanup"}, {"table": "dst"})
+
+
+def test_insert_error_propagates_and_releases_resources():
+    """書き込み中のエラーは呼び出し元へ送出し、接続とテーブルコピー枠を解放する"""
+    db = FakeDatabase(["id"], [(i,) for i in range(5)], fail_on_batch=1)
+    engine, pool, _ = make_engine(db, max_size=2)
+
+    with pytest.raises(RuntimeError, match="insert failed"):
+        engine.run({"query": "SELECT id FROM src"}, {"table": "dst"})
+
+    assert len(db.inserted) == 1
+    assert pool.stats()["in_use"] == 0
+    db.fail_on_batch = None
+    assert engine.run({"query": "SELECT id FROM src"}, {"table": "dst"}).rows_copied == 5
+
+
+def test_table_copy_slot_timeout_raises_pool_timeout():
+    """テーブルコピーの同時実行枠が空かない場合はSQLPoolTimeoutError"""
+    engine, _, _ = make_engine(FakeDatabase(["id"], [(1,)]), max_size=2)
+    engine._table_copy_semaphore.acquire()
+
+    with pytest.raises(SQLPoolTimeoutError):
+        engine.run({"query": "SELECT id FROM src"}, {"table": "dst"})
+
+
+def test_table_sink_requires_two_connections():
+    """テーブルシンクは接続を2本使うため、max_sizeが1のプールではCopyConfigurationError"""
+    engine, _, _ = make_engine(FakeDatabase(["id"], [(1,)]), max_size=1)
+
+    with pytest.raises(CopyConfigurationError, match="max_size >= 2"):
+        engine.run({"query": "SELECT id FROM src"}, {"table": "dst"})
+
+
+def test_blob_copy_stages_fixed_size_blocks_in_order():
+    """Blobシンクはヘッダー付きCSVをblock_size単位でステージし、順番どおりにコミットする"""
+    db = FakeDatabase(["id", "name"], [(i, "x" * 10) for i in range(20)])
+    engine, _, blob_service = make_engine(db, block_size=64)
+
+    result = engine.run({"query": "SELECT id, name FROM src"},
+                        {"type": "DelimitedText", "container": "out", "blob_name": "data.csv"})
+
+    blob = blob_service.blobs["out/data.csv"]
+    content = blob.content().decode("utf-8").splitlines()
+    assert content[0] == "id,name"
+    assert content[1:] == [f"{i},{'x' * 10}" for i in range(20)]
+    assert blob.committed == sorted(blob.committed) and len(blob.committed) > 1
+    assert all(len(blob.staged[block_id]) == 64 for block_id in blob.committed[:-1])
+    assert (result.rows_copied, result.sink_type, result.sink_target) == (20, "blob", "out/data.csv")
+
+
+def test_blob_copy_gzip_compresses_stream():
+    """.gzのBlob名はgzipでストリーム圧縮する"""
+    db = FakeDatabase(["id"], [(i,) for i in range(3)])
+    engine, _, blob_service = make_engine(db)
+
+    engine.run({"query": "SELECT id FROM src"}, {"container": "out", "blob_name": "data.csv.gz"})
+
+    assert gzip.decompress(blob_service.blobs["out/data.csv.gz"].content()) == b"id\n0\n1\n2\n"
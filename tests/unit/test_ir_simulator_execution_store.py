@@ -0,0 +1,209 @@
+"""
+IR Simulator ExecutionStore のユニットテスト
+件数上限（LRU）・TTLによる破棄、検索条件、SQLiteへの永続化を検証する
+"""
+
+import os
+import sys
+import time
+import types
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "docker", "ir-simulator"))
+
+import execution_store as execution_store_module  # noqa: E402
+from execution_store import ExecutionStore, SharedExecutionStore  # noqa: E402
+
+pytestmark = pytest.mark.unit
+
+
+class FakeClock:
+    """time.monotonicの代わりに手動で進める時計"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def advance(self, seconds: float):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = FakeClock()
+    monkeypatch.setattr(
+        execution_store_module, "time", types.SimpleNamespace(monotonic=fake.monotonic, time=time.time)
+    )
+    return fake
+
+
+def record(execution_id: str, status: str = "SUCCESS", pipeline_name: str = "pi_test",
+           start_time: str = "2025-01-01T00:00:00"):
+    return {
+        "execution_id": execution_id,
+        "status": status,
+        "pipeline_name": pipeline_name,
+        "start_time": start_time,
+    }
+
+
+def test_max_entries_evicts_least_recently_used():
+    """件数上限を超えると最も長く使われていない完了済みレコードから破棄する"""
+    store = ExecutionStore(max_entries=2)
+    store.put(record("a"))
+    store.put(record("b"))
+    store.get("a")
+    store.put(record("c"))
+
+    assert "a" in store and "c" in store
+    assert "b" not in store
+    assert store.stats()["evicted"] == 1
+
+
+def test_active_records_are_not_evicted():
+    """実行中（QUEUED/RUNNING）のレコードは件数上限を超えても破棄しない"""
+    store = ExecutionStore(max_entries=1)
+    store.put(record("running", status="RUNNING"))
+    store.put(record("done"))
+    store.put(record("queued", status="QUEUED"))
+
+    assert "running" in store and "queued" in store
+    assert "done" not in store
+
+
+def test_ttl_expires_untouched_records(clock):
+    """TTLを過ぎた完了済みレコードは次の書き込み時に破棄する"""
+    store = ExecutionStore(max_entries=0, ttl_seconds=60)
+    store.put(record("old"))
+    clock.advance(61)
+    store.put(record("new"))
+
+    assert "old" not in store
+    assert "new" in store
+
+
+def test_get_refreshes_ttl_together_with_lru_order(clock):
+    """get()はLRU順とTTLの基準時刻を一緒に更新する"""
+    store = ExecutionStore(max_entries=0, ttl_seconds=60)
+    store.put(record("read"))
+    store.put(record("idle"))
+    clock.advance(40)
+    store.get("read")
+    clock.advance(30)
+    store.put(record("new"))
+
+    assert "read" in store
+    assert "idle" not in store
+
+
+def test_update_keeps_indexes_consistent():
+    """ステータス更新後はインデックスも新しいステータスで検索できる"""
+    store = ExecutionStore()
+    store.put(record("a", status="RUNNING"))
+    store.update("a", status="SUCCESS")
+
+    assert store.query(status="running") == ([], 0)
+    page, total = store.query(status="success")
+    assert total == 1 and page[0]["execution_id"] == "a"
+
+
+def test_query_filters_and_pages_by_start_time():
+    """検索結果はパイプライン名・開始時刻で絞り込み、開始時刻の降順でページングする"""
+    store = ExecutionStore()
+    for day in range(1, 6):
+        store.put(record(f"x{day}", pipeline_name="pi_x", start_time=f"2025-01-0{day}T00:00:00"))
+    store.put(record("y", pipeline_name="pi_y", start_time="2025-01-03T00:00:00"))
+
+    page, total = store.query(
+        pipeline_name="pi_x", since="2025-01-02T00:00:00", until="2025-01-04T00:00:00", limit=2
+    )
+    assert total == 3
+    assert [r["execution_id"] for r in page] == ["x4", "x3"]
+
+    page, _ = store.query(pipeline_name="pi_x", limit=2, offset=4)
+    assert [r["execution_id"] for r in page] == ["x1"]
+
+
+@pytest.mark.parametrize("field", ["since", "until"])
+def test_query_rejects_invalid_time_filter(field):
+    """since/untilがISO形式でなければValueError（APIでは422）"""
+    store = ExecutionStore()
+    store.put(record("a"))
+
+    with pytest.raises(ValueError, match=field):
+        store.query(**{field: "yesterday"})
+
+
+def test_sqlite_persists_batched_writes_and_fails_interrupted_runs(tmp_path):
+    """SQLiteへの書き込みはflush()でまとめて行い、再起動時は実行中だったレコードを失敗扱いで復元する"""
+    path = str(tmp_path / "executions.db")
+    store = ExecutionStore(sqlite_path=path, persist_interval=3600)
+    store.put(record("done"))
+    store.put(record("running", status="RUNNING"))
+    store.put(record("deleted"))
+    store.delete("deleted")
+    assert store.stats()["pending_writes"] == 3
+    store.close()
+
+    reopened = ExecutionStore(sqlite_path=path, persist_interval=3600)
+    try:
+        assert reopened.get("done")["status"] == "SUCCESS"
+        assert reopened.get("running")["status"] == "FAILED"
+        assert reopened.get("deleted") is None
+    finally:
+        reopened.close()
+
+
+def test_add_rejects_existing_execution_id():
+    """add()は同じexecution_idのレコードを置き換えずにFalseを返す"""
+    store = ExecutionStore()
+    assert store.add(record("a", status="RUNNING"))
+    assert not store.add(record("a", status="QUEUED"))
+
+    assert store.get("a")["status"] == "RUNNING"
+
+
+def test_shared_store_add_rejects_existing_execution_id(tmp_path):
+    """共有ストアのadd()も既存のexecution_idを置き換えない"""
+    store = SharedExecutionStore(str(tmp_path / "shared.db"))
+    try:
+        assert store.add(record("a", status="RUNNING"))
+        assert not store.add(record("a", status="QUEUED"))
+        assert store.get("a")["status"] == "RUNNING"
+    finally:
+        store.close()
+
+
+def test_get_does_not_return_expired_records(clock):
+    """TTLを過ぎた完了済みレコードは書き込みを待たずにget()で破棄し、Noneを返す"""
+    store = ExecutionStore(max_entries=0, ttl_seconds=60)
+    store.put(record("done"))
+    store.put(record("running", status="RUNNING"))
+    clock.advance(61)
+
+    assert store.get("done") is None
+    assert "done" not in store
+    assert store.get("running")["status"] == "RUNNING"
+    assert store.stats()["evicted"] == 1
+
+
+def test_shared_store_get_does_not_return_expired_records(tmp_path, monkeypatch):
+    """共有ストアのget()もTTLを過ぎた完了済みレコードを破棄し、Noneを返す"""
+    store = SharedExecutionStore(str(tmp_path / "shared.db"), ttl_seconds=60)
+    try:
+        store.put(record("done"))
+        store.put(record("running", status="RUNNING"))
+        now = time.time()
+        monkeypatch.setattr(
+            execution_store_module, "time", types.SimpleNamespace(monotonic=time.monotonic, time=lambda: now + 61)
+        )
+
+        assert store.get("done") is None
+        assert "done" not in store
+        assert store.get("running")["status"] == "RUNNING"
+        assert store.stats()["evicted"] == 1
+    finally:
+        store.close()
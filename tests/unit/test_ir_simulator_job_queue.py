@@ -0,0 +1,161 @@
+"""
+IR Simulator SharedPipelineJobQueue のユニットテスト
+SQLiteファイルを共有するジョブキューの投入・重複検知・リース切れジョブの再投入を検証する
+"""
+
+import asyncio
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "docker", "ir-simulator"))
+
+from execution_store import SharedExecutionStore  # noqa: E402
+from job_queue import DuplicateJobError, SharedPipelineJobQueue  # noqa: E402
+
+pytestmark = pytest.mark.unit
+
+
+async def echo(job_id, payload):
+    return {"job_id": job_id, **payload}
+
+
+def make_queue(path, handler=echo, **kwargs):
+    kwargs.setdefault("poll_interval", 0.01)
+    return SharedPipelineJobQueue(str(path), handler, **kwargs)
+
+
+def job_row(queue, job_id):
+    return queue._db.execute(
+        "SELECT status, worker, attempts, error FROM pipeline_jobs WHERE job_id = ?", (job_id,)
+    ).fetchone()
+
+
+def test_submitted_job_runs_and_resolves_future(tmp_path):
+    """投入したジョブはディスパッチャーで実行され、Futureに結果が設定される"""
+    async def scenario():
+        queue = make_queue(tmp_path / "jobs.db")
+        await queue.start()
+        try:
+            future = await queue.submit("job-1", {"value": 1})
+            return await asyncio.wait_for(future, timeout=5), queue.stats(), job_row(queue, "job-1")
+        finally:
+            await queue.stop()
+
+    result, stats, row = asyncio.run(scenario())
+
+    assert result == {"job_id": "job-1", "value": 1}
+    assert stats["completed"] == 1
+    assert row[0] == "DONE" and row[2] == 1
+
+
+def test_duplicate_job_id_raises_duplicate_job_error(tmp_path):
+    """ジョブテーブルに残っているjob_idの再投入はDuplicateJobError"""
+    async def scenario():
+        release = asyncio.Event()
+
+        async def blocked(job_id, payload):
+            await release.wait()
+
+        queue = make_queue(tmp_path / "jobs.db", blocked)
+        await queue.start()
+        try:
+            await queue.submit("job-1", {})
+            with pytest.raises(DuplicateJobError):
+                await queue.submit("job-1", {})
+            return queue.stats()
+        finally:
+            release.set()
+            await queue.stop()
+
+    assert asyncio.run(scenario())["submitted"] == 1
+
+
+def test_expired_lease_is_requeued_until_max_attempts(tmp_path):
+    """リースが切れた実行中ジョブは再投入され、試行回数の上限に達すると失敗となる"""
+    path = tmp_path / "jobs.db"
+    dead = make_queue(path, lease_seconds=0, max_attempts=2)
+    dead._enqueue("job-1", "{}")
+    assert dead._claim(1)[0][0] == "job-1"
+
+    survivor = make_queue(path, lease_seconds=0, max_attempts=2)
+    assert survivor._renew_leases([]) == (1, 0)
+    assert job_row(survivor, "job-1")[:2] == ("QUEUED", None)
+
+    survivor._claim(1)
+    survivor.worker_id = "other-host:1"
+    assert survivor._renew_leases([]) == (0, 1)
+    status, _, attempts, error = job_row(survivor, "job-1")
+    assert status == "FAILED" and attempts == 2
+    assert "stopped while running" in error
+
+
+def test_renewed_lease_is_not_requeued(tmp_path):
+    """実行中のジョブはリースを更新している限り再投入されない"""
+    queue = make_queue(tmp_path / "jobs.db", lease_seconds=60)
+    queue._enqueue("job-1", "{}")
+    queue._claim(1)
+
+    assert queue._renew_leases(["job-1"]) == (0, 0)
+    assert job_row(queue, "job-1")[0] == "RUNNING"
+
+
+def test_finish_ignores_job_requeued_to_another_worker(tmp_path):
+    """リースを失って他ワーカーが取得したジョブの結果は元のワーカーから上書きしない"""
+    path = tmp_path / "jobs.db"
+    first = make_queue(path, lease_seconds=0)
+    first._enqueue("job-1", "{}")
+    first._claim(1)
+    second = make_queue(path, lease_seconds=0)
+    second.worker_id = "other-host:1"
+    second._renew_leases([])
+    second._claim(1)
+
+    first._finish("job-1", "FAILED", None, "late result")
+
+    status, worker, attempts, _ = job_row(second, "job-1")
+    assert (status, worker, attempts) == ("RUNNING", "other-host:1", 2)
+
+
+def test_expired_lease_updates_execution_record(tmp_path):
+    """リース切れの再投入・失敗は同じSQLiteファイルの実行履歴にも反映する（再投入はQUEUED、失敗はFAILED）"""
+    path = tmp_path / "shared.db"
+    store = SharedExecutionStore(str(path))
+    store.put({"execution_id": "job-1", "pipeline_name": "pi_test", "status": "RUNNING",
+               "start_time": "2025-01-01T00:00:00", "current_activity": "Copy", "activities_running": ["Copy"]})
+    queue = make_queue(path, lease_seconds=0, max_attempts=2,
+                       on_lease_expired=SharedExecutionStore.apply_lease_expiry)
+    try:
+        queue._enqueue("job-1", "{}")
+        queue._claim(1)
+
+        assert queue._renew_leases([]) == (1, 0)
+        record = store.get("job-1")
+        assert record["status"] == "QUEUED"
+        assert (record["current_activity"], record["activities_running"]) == (None, [])
+
+        queue._claim(1)
+        assert queue._renew_leases([]) == (0, 1)
+        record = store.get("job-1")
+        assert record["status"] == "FAILED"
+        assert "stopped while running" in record["error_message"]
+        assert record["end_time"] is not None
+        assert store.query(status="running") == ([], 0)
+    finally:
+        store.close()
+
+
+def test_lease_expiry_hook_failure_rolls_back_requeue(tmp_path):
+    """実行履歴の更新に失敗した場合はジョブテーブルの再投入も行わない（同じトランザクション）"""
+    def broken_hook(db, requeued, abandoned):
+        raise RuntimeError("hook failed")
+
+    queue = make_queue(tmp_path / "jobs.db", lease_seconds=0, on_lease_expired=broken_hook)
+    queue._enqueue("job-1", "{}")
+    queue._claim(1)
+
+    with pytest.raises(RuntimeError, match="hook failed"):
+        queue._renew_leases([])
+
+    assert job_row(queue, "job-1")[0] == "RUNNING"
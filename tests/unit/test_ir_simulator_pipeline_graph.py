@@ -0,0 +1,227 @@
+"""
+IR Simulator パイプライン定義のアクティビティグラフのユニットテスト
+定義の解析（依存関係・入れ子・循環検出）と、依存条件に従った実行・スキップ・失敗の伝播を検証する
+"""
+
+import asyncio
+import json
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "docker", "ir-simulator"))
+
+from pipeline_graph import (  # noqa: E402
+    FAILED,
+    SKIPPED,
+    SUCCEEDED,
+    ActivityGraph,
+    load_pipeline_graphs,
+    run_activity_graph,
+)
+
+pytestmark = pytest.mark.unit
+
+PIPELINE_DIR = os.path.join(os.path.dirname(__file__), "..", "..", "src", "dev", "pipeline")
+
+
+def activity(name, type_="Wait", depends_on=(), **type_properties):
+    """パイプライン定義JSONのアクティビティ（depends_onは (名前, [条件...]) のリスト）"""
+    return {
+        "name": name,
+        "type": type_,
+        "dependsOn": [{"activity": d, "dependencyConditions": list(c)} for d, c in depends_on],
+        "typeProperties": type_properties,
+    }
+
+
+def run(graph, fail=(), branches=None):
+    """グラフを実行し、(結果, 実行順, スキップされたアクティビティ) を返す（failに含まれる名前は失敗させる）"""
+    executed, skipped = [], []
+
+    async def run_activity(node):
+        executed.append(node.name)
+        if node.name in fail:
+            raise RuntimeError(f"{node.name} failed")
+
+    async def on_skipped(node):
+        skipped.append(node.name)
+
+    choose_branch = (lambda node: branches[node.name]) if branches else None
+    outcomes = asyncio.run(run_activity_graph(graph, run_activity, on_skipped, choose_branch))
+    return outcomes, executed, skipped
+
+
+def test_topological_order_follows_depends_on():
+    """実行順序は定義順ではなくdependsOnに従う"""
+    graph = ActivityGraph.from_activities([
+        activity("Load", depends_on=[("Transform", ["Succeeded"])]),
+        activity("Transform", depends_on=[("Extract", ["Succeeded"])]),
+        activity("Extract"),
+    ])
+
+    assert graph.order == ["Extract", "Transform", "Load"]
+
+
+def test_dependency_cycle_is_rejected():
+    """循環する依存関係はValueError"""
+    with pytest.raises(ValueError, match="cycle"):
+        ActivityGraph.from_activities([
+            activity("A", depends_on=[("B", ["Succeeded"])]),
+            activity("B", depends_on=[("A", ["Succeeded"])]),
+        ])
+
+
+def test_unknown_dependency_is_rejected():
+    """存在しないアクティビティへの依存はValueError"""
+    with pytest.raises(ValueError, match="unknown activity"):
+        ActivityGraph.from_activities([activity("A", depends_on=[("Missing", ["Succeeded"])])])
+
+
+def test_nested_activities_are_parsed_and_counted():
+    """IfCondition・ForEachの入れ子もノードとして解析し、count()に含める"""
+    graph = ActivityGraph.from_activities([
+        activity("Check", "IfCondition",
+                 ifTrueActivities=[activity("OnTrue")], ifFalseActivities=[activity("OnFalse")]),
+        activity("Loop", "ForEach", activities=[activity("Copy", "Copy", dataIntegrationUnits=4, parallelCopies=2)]),
+    ])
+
+    assert graph.count() == 5
+    copy = graph.nodes["Loop"].inner.nodes["Copy"]
+    assert (copy.diu, copy.parallel_copies) == (4, 2)
+
+
+def test_success_path_runs_every_activity():
+    """全て成功した場合は依存順に全アクティビティを実行する"""
+    graph = ActivityGraph.from_activities([
+        activity("A"),
+        activity("B", depends_on=[("A", ["Succeeded"])]),
+    ])
+
+    outcomes, executed, skipped = run(graph)
+
+    assert outcomes == {"A": SUCCEEDED, "B": SUCCEEDED}
+    assert executed == ["A", "B"]
+    assert skipped == []
+
+
+def test_failure_skips_succeeded_dependents_and_runs_failed_handlers():
+    """失敗したアクティビティのSucceeded依存先はスキップし、Failed・Completed依存先は実行する"""
+    graph = ActivityGraph.from_activities([
+        activity("Copy"),
+        activity("Next", depends_on=[("Copy", ["Succeeded"])]),
+        activity("AfterNext", depends_on=[("Next", ["Succeeded"])]),
+        activity("OnError", depends_on=[("Copy", ["Failed"])]),
+        activity("Always", depends_on=[("Copy", ["Completed"])]),
+    ])
+
+    outcomes, executed, skipped = run(graph, fail={"Copy"})
+
+    assert outcomes == {
+        "Copy": FAILED,
+        "Next": SKIPPED,
+        "AfterNext": SKIPPED,
+        "OnError": SUCCEEDED,
+        "Always": SUCCEEDED,
+    }
+    assert sorted(executed) == ["Always", "Copy", "OnError"]
+    assert sorted(skipped) == ["AfterNext", "Next"]
+
+
+def test_skipped_condition_runs_only_when_dependency_was_skipped():
+    """Skipped条件の依存先は、依存元がスキップされた場合のみ実行する"""
+    graph = ActivityGraph.from_activities([
+        activity("A"),
+        activity("B", depends_on=[("A", ["Failed"])]),
+        activity("WhenSkipped", depends_on=[("B", ["Skipped"])]),
+    ])
+
+    outcomes, _, _ = run(graph)
+    assert outcomes["B"] == SKIPPED
+    assert outcomes["WhenSkipped"] == SUCCEEDED
+
+    outcomes, _, _ = run(graph, fail={"A"})
+    assert outcomes["B"] == SUCCEEDED
+    assert outcomes["WhenSkipped"] == SKIPPED
+
+
+def test_if_condition_runs_chosen_branch_and_propagates_failure():
+    """IfConditionは選択した分岐のみ実行し、分岐内の失敗はIfCondition自体の失敗となる"""
+    graph = ActivityGraph.from_activities([
+        activity("Check", "IfCondition",
+                 ifTrueActivities=[activity("OnTrue")], ifFalseActivities=[activity("OnFalse")]),
+        activity("After", depends_on=[("Check", ["Succeeded"])]),
+    ])
+
+    outcomes, executed, _ = run(graph, branches={"Check": False})
+    assert "OnTrue" not in executed
+    assert outcomes["OnFalse"] == SUCCEEDED and outcomes["After"] == SUCCEEDED
+
+    outcomes, _, skipped = run(graph, fail={"OnTrue"}, branches={"Check": True})
+    assert outcomes["Check"] == FAILED
+    assert skipped == ["After"]
+
+
+def test_load_pipeline_graphs_skips_invalid_definitions(tmp_path):
+    """不正な定義（JSON不正・循環）は読み飛ばし、正しい定義のみ返す"""
+    (tmp_path / "pi_ok.json").write_text(json.dumps({
+        "name": "pi_ok",
+        "properties": {"activities": [activity("A"), activity("B", depends_on=[("A", ["Succeeded"])])]},
+    }), encoding="utf-8")
+    (tmp_path / "pi_cycle.json").write_text(json.dumps({
+        "name": "pi_cycle",
+        "properties": {"activities": [
+            activity("A", depends_on=[("B", ["Succeeded"])]),
+            activity("B", depends_on=[("A", ["Succeeded"])]),
+        ]},
+    }), encoding="utf-8")
+    (tmp_path / "pi_broken.json").write_text("{not json", encoding="utf-8")
+
+    graphs = load_pipeline_graphs(str(tmp_path))
+
+    assert list(graphs) == ["pi_ok"]
+    assert graphs["pi_ok"].order == ["A", "B"]
+
+
+def test_load_pipeline_graphs_returns_empty_for_missing_directory(tmp_path):
+    """ディレクトリが無い場合は空の辞書"""
+    assert load_pipeline_graphs(str(tmp_path / "missing")) == {}
+
+
+@pytest.mark.skipif(not os.path.isdir(PIPELINE_DIR), reason="src/dev/pipeline not found")
+def test_repository_pipeline_definitions_load():
+    """リポジトリのパイプライン定義は全て解析できる（依存先の欠落・循環が無い）"""
+    definitions = [name for name in os.listdir(PIPELINE_DIR) if name.endswith(".json")]
+
+    graphs = load_pipeline_graphs(PIPELINE_DIR)
+
+    assert len(graphs) == len(definitions)
+    assert all(graph.count() > 0 for graph in graphs.values())
+
+
+def test_on_skipped_error_propagates_without_hanging_dependents():
+    """on_skippedが例外を送出しても後続のアクティビティは待ち続けず、全て完了した後に例外を送出する"""
+    graph = ActivityGraph.from_activities([
+        activity("A"),
+        activity("B", depends_on=[("A", ["Failed"])]),
+        activity("AfterSkip", depends_on=[("B", ["Skipped"])]),
+        activity("Cascade", depends_on=[("B", ["Succeeded"])]),
+    ])
+    executed, notified = [], []
+
+    async def run_activity(node):
+        executed.append(node.name)
+
+    async def on_skipped(node):
+        notified.append(node.name)
+        raise RuntimeError(f"cannot record {node.name}")
+
+    async def scenario():
+        return await asyncio.wait_for(run_activity_graph(graph, run_activity, on_skipped), timeout=5)
+
+    with pytest.raises(RuntimeError, match="cannot record B"):
+        asyncio.run(scenario())
+
+    assert executed == ["A", "AfterSkip"]
+    assert sorted(notified) == ["B", "Cascade"]
@@ -0,0 +1,256 @@
+"""
+IR Simulator SQLConnectionPool のユニットテスト
+接続ファクトリをfakeに差し替え、貸し出し・タイムアウト・ヘルスチェック・アイドル接続の破棄を検証する
+"""
+
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "docker", "ir-simulator"))
+
+from sql_pool import SQLConnectionPool, SQLPoolTimeoutError  # noqa: E402
+
+pytestmark = pytest.mark.unit
+
+
+class FakeCursor:
+    def __init__(self, connection):
+        self.connection = connection
+
+    def execute(self, sql):
+        if self.connection.broken:
+            raise RuntimeError("connection is broken")
+
+    def fetchone(self):
+        return (1,)
+
+    def close(self):
+        pass
+
+
+class FakeConnection:
+    def __init__(self):
+        self.broken = False
+        self.closed = False
+        self.rollbacks = 0
+        self.fail_rollback = False
+
+    def cursor(self):
+        return FakeCursor(self)
+
+    def rollback(self):
+        if self.fail_rollback:
+            raise RuntimeError("rollback failed")
+        self.rollbacks += 1
+
+    def close(self):
+        self.closed = True
+
+
+class FakeConnect:
+    """作成した接続を記録する接続ファクトリ（failuresの回数だけ接続エラーを送出）"""
+
+    def __init__(self, failures: int = 0):
+        self.created = []
+        self.failures = failures
+
+    def __call__(self):
+        if self.failures:
+            self.failures -= 1
+            raise RuntimeError("connect failed")
+        conn = FakeConnection()
+        self.created.append(conn)
+        return conn
+
+
+def make_pool(connect=None, **kwargs):
+    kwargs.setdefault("acquire_timeout", 1.0)
+    kwargs.setdefault("health_check_interval", 60.0)
+    return SQLConnectionPool(connect or FakeConnect(), **kwargs)
+
+
+def test_released_connection_is_reused_after_rollback():
+    """返却した接続はロールバックされ、次の取得で再利用される"""
+    connect = FakeConnect()
+    pool = make_pool(connect, max_size=2)
+
+    conn = pool.acquire()
+    pool.release(conn)
+    assert pool.acquire() is conn
+
+    assert len(connect.created) == 1
+    assert conn.rollbacks == 1
+    stats = pool.stats()
+    assert stats["pool_misses"] == 1
+    assert stats["pool_hits"] == 1
+    assert stats["in_use"] == 1
+
+
+def test_connection_context_manager_returns_connection_on_error():
+    """connection()は例外発生時も接続をプールへ返却する"""
+    pool = make_pool(max_size=1)
+
+    with pytest.raises(ValueError):
+        with pool.connection():
+            raise ValueError("boom")
+
+    stats = pool.stats()
+    assert stats["in_use"] == 0
+    assert stats["idle"] == 1
+
+
+def test_failed_rollback_discards_connection():
+    """ロールバックに失敗した接続は破棄され、枠が解放される"""
+    pool = make_pool(max_size=1)
+    conn = pool.acquire()
+    conn.fail_rollback = True
+
+    pool.release(conn)
+
+    assert conn.closed
+    stats = pool.stats()
+    assert stats["size"] == 0
+    assert stats["connections_closed"] == 1
+
+
+def test_acquire_times_out_when_pool_is_exhausted():
+    """上限まで貸し出し中の場合、タイムアウトでSQLPoolTimeoutErrorを送出する"""
+    pool = make_pool(max_size=1)
+    pool.acquire()
+
+    with pytest.raises(SQLPoolTimeoutError):
+        pool.acquire(timeout=0.05)
+
+    assert pool.stats()["acquire_timeouts"] == 1
+
+
+def test_waiting_acquire_receives_released_connection():
+    """待機中の取得は他スレッドの返却で再開する"""
+    pool = make_pool(max_size=1)
+    conn = pool.acquire()
+    releaser = threading.Timer(0.05, pool.release, args=(conn,))
+    releaser.start()
+
+    try:
+        assert pool.acquire(timeout=2.0) is conn
+    finally:
+        releaser.join()
+
+    stats = pool.stats()
+    assert stats["waits"] == 1
+    assert stats["total_wait_seconds"] > 0
+
+
+def test_connect_failure_frees_reserved_slot():
+    """接続作成に失敗しても確保した枠は解放され、次の取得で再作成できる"""
+    pool = make_pool(FakeConnect(failures=1), max_size=1)
+
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+    assert pool.stats()["size"] == 0
+
+    pool.acquire(timeout=0.05)
+    stats = pool.stats()
+    assert stats["connect_failures"] == 1
+    assert stats["size"] == 1
+
+
+def test_unhealthy_idle_connection_is_replaced():
+    """ヘルスチェックに失敗したアイドル接続は破棄され、新しい接続に置き換えられる"""
+    connect = FakeConnect()
+    pool = make_pool(connect, max_size=1, health_check_interval=0.0)
+    stale = pool.acquire()
+    pool.release(stale)
+    stale.broken = True
+
+    fresh = pool.acquire()
+
+    assert fresh is not stale
+    assert stale.closed
+    assert pool.stats()["health_check_failures"] == 1
+    assert pool.stats()["size"] == 1
+
+
+def test_recently_used_connection_skips_health_check():
+    """health_check_interval以内に使われた接続は疎通確認せずに貸し出す"""
+    pool = make_pool(max_size=1, health_check_interval=60.0)
+    conn = pool.acquire()
+    pool.release(conn)
+    conn.broken = True
+
+    assert pool.acquire() is conn
+    assert pool.stats()["health_check_failures"] == 0
+
+
+def test_evict_idle_closes_expired_connections():
+    """max_idle_secondsを超えたアイドル接続はevict_idle()で破棄される"""
+    pool = make_pool(max_size=2, max_idle_seconds=0.01)
+    first, second = pool.acquire(), pool.acquire()
+    pool.release(first)
+    pool.release(second)
+    time.sleep(0.05)
+
+    assert pool.evict_idle() == 2
+    assert first.closed and second.closed
+    stats = pool.stats()
+    assert stats["size"] == 0
+    assert stats["connections_evicted"] == 2
+
+
+def test_evict_idle_keeps_min_size():
+    """アイドル接続の破棄はmin_sizeを下回らない"""
+    pool = make_pool(max_size=2, min_size=1, max_idle_seconds=0.01)
+    first, second = pool.acquire(), pool.acquire()
+    pool.release(first)
+    pool.release(second)
+    time.sleep(0.05)
+
+    assert pool.evict_idle() == 1
+    assert pool.stats()["size"] == 1
+
+
+def test_close_all_closes_idle_and_returned_connections():
+    """close_all()後はアイドル接続を閉じ、返却された接続も閉じ、新たな貸し出しを拒否する"""
+    pool = make_pool(max_size=2)
+    idle, in_use = pool.acquire(), pool.acquire()
+    pool.release(idle)
+
+    pool.close_all()
+    assert idle.closed
+    with pytest.raises(RuntimeError):
+        pool.acquire()
+
+    pool.release(in_use)
+    assert in_use.closed
+    assert pool.stats()["size"] == 0
+
+
+def test_prefill_opens_min_size_connections():
+    """prefill()はmin_size本の接続を事前に作成し、最初の取得はそれを再利用する"""
+    connect = FakeConnect()
+    pool = make_pool(connect, max_size=4, min_size=2)
+
+    assert pool.prefill() == 2
+    assert pool.prefill() == 0
+
+    stats = pool.stats()
+    assert (stats["size"], stats["idle"], stats["in_use"]) == (2, 2, 0)
+    assert pool.acquire() in connect.created
+    assert pool.stats()["pool_hits"] == 1
+    assert len(connect.created) == 2
+
+
+def test_prefill_stops_at_connect_failure():
+    """接続に失敗した時点で事前作成を打ち切り、確保した枠は解放する"""
+    pool = make_pool(FakeConnect(failures=1), max_size=4, min_size=3)
+
+    assert pool.prefill() == 0
+    stats = pool.stats()
+    assert (stats["size"], stats["connect_failures"]) == (0, 1)
+
+    assert pool.prefill() == 3
+    assert pool.stats()["idle"] == 3
@@ -0,0 +1,106 @@
+"""
+IR Simulator TimingModel のユニットテスト
+fixed / zero / realistic の各モードの処理時間（行数・DIU・プロファイルの優先順位・time_scale）を検証する
+"""
+
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "..", "docker", "ir-simulator"))
+
+from timing_model import TimingModel  # noqa: E402
+
+pytestmark = pytest.mark.unit
+
+PROFILE_PATH = os.path.join(
+    os.path.dirname(__file__), "..", "..", "docker", "ir-simulator", "config", "timing_profile.json"
+)
+
+# Copy: 8秒 + 行数 / 20000 rows/s（既定プロファイル）
+COPY_OVERHEAD = 8.0
+COPY_ROWS_PER_SECOND = 20000
+
+
+def test_zero_mode_never_waits():
+    """zeroモードはパイプライン・アクティビティとも0秒"""
+    model = TimingModel(mode="zero")
+
+    assert model.pipeline_overhead("pi_any") == 0.0
+    assert model.copy_duration("pi_any", "copy", rows=10_000_000) == 0.0
+    assert model.activity_duration("pi_any", "script", "Script", rows=10_000_000) == 0.0
+    assert model.uses_pipeline_definitions
+
+
+def test_fixed_mode_keeps_baseline_durations():
+    """fixedモードは従来どおりCopy 2秒・その他1秒で、行数やパイプライン定義を使わない"""
+    model = TimingModel()
+
+    assert model.mode == "fixed"
+    assert model.copy_duration("pi_any", "copy", rows=10_000_000) == 2.0
+    assert model.activity_duration("pi_any", "lookup", "Lookup") == 1.0
+    assert model.pipeline_overhead("pi_any") == 0.0
+    assert not model.uses_pipeline_definitions
+
+
+def test_realistic_copy_scales_with_rows_within_bounds():
+    """realisticモードのCopyは行数に比例して伸び、オーバーヘッド以上・上限（overhead + rows/rps）以下に収まる"""
+    model = TimingModel(mode="realistic")
+    rng = random.Random(20250101)
+    row_counts = sorted(rng.randint(0, 5_000_000) for _ in range(50))
+
+    durations = [model.copy_duration("pi_any", "copy", rows=rows) for rows in row_counts]
+
+    assert durations == sorted(durations)
+    for rows, duration in zip(row_counts, durations):
+        assert COPY_OVERHEAD <= duration <= COPY_OVERHEAD + 5_000_000 / COPY_ROWS_PER_SECOND
+        assert duration == pytest.approx(COPY_OVERHEAD + rows / COPY_ROWS_PER_SECOND)
+
+
+def test_realistic_copy_throughput_scales_with_diu_and_parallel_copies():
+    """パイプライン定義のDIU（4を基準）・並列コピー数に比例して転送時間が短くなる"""
+    specs = {"pi_x": {"copy": {"type": "Copy", "diu": 8, "parallel_copies": 2}}}
+    model = TimingModel(pipeline_specs=specs, mode="realistic")
+
+    transfer = model.copy_duration("pi_x", "copy", rows=80_000) - COPY_OVERHEAD
+
+    assert transfer == pytest.approx(80_000 / (COPY_ROWS_PER_SECOND * 2 * 2))
+
+
+def test_realistic_profile_precedence_and_time_scale():
+    """アクティビティ個別の設定がパイプライン定義の種別・activity_typesより優先され、time_scaleで全体を縮める"""
+    profile = {
+        "time_scale": 0.5,
+        "pipelines": {"pi_x": {
+            "overhead_seconds": 5.0,
+            "activity_types": {"Lookup": {"overhead_seconds": 3.0}},
+            "activities": {"lookup_slow": {"overhead_seconds": 9.0}},
+        }},
+    }
+    specs = {"pi_x": {"lookup_fast": {"type": "Lookup"}, "lookup_slow": {"type": "Lookup"}}}
+    model = TimingModel(profile, specs, mode="realistic")
+
+    assert model.pipeline_overhead("pi_x") == 2.5
+    assert model.pipeline_overhead("pi_other") == 1.5
+    assert model.activity_duration("pi_x", "lookup_fast") == 1.5
+    assert model.activity_duration("pi_x", "lookup_slow") == 4.5
+    assert model.activity_duration("pi_other", "unknown") == 0.5
+
+
+def test_unknown_mode_is_rejected():
+    """未知のモードはValueError"""
+    with pytest.raises(ValueError, match="Unknown timing mode"):
+        TimingModel(mode="fast")
+
+
+def test_from_files_loads_repository_profile():
+    """リポジトリの既定プロファイルを読み込み、modeの指定で上書きできる"""
+    model = TimingModel.from_files(PROFILE_PATH, mode="realistic")
+
+    assert model.mode == "realistic"
+    # pi_Copy_marketing_client_dm のCopyは 10秒 + 500000行 / 8000 rows/s
+    assert model.activity_duration(
+        "pi_Copy_marketing_client_dm", "at_Copy_marketing_ClientDM_temp", "Copy"
+    ) == pytest.approx(10.0 + 500_000 / 8000)